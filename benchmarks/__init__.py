@@ -0,0 +1 @@
+"""Benchmarks for the SleepIQ Custom integration."""
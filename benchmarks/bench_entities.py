@@ -0,0 +1,295 @@
+"""Benchmark what writing the per-side entities costs on a refresh.
+
+Run from the repository root with Home Assistant's requirements installed:
+
+    python -m benchmarks.bench_entities --beds 1 10 100
+
+A state write reads an entity's name, state and attributes. "before" reads
+them the way the sleep number sensor, in bed sensor and responsive air
+switch used to, branching on the side and walking the bed on every read;
+"after" builds the frozen side views of the sides a refresh replaced, once,
+and the entities read them. Beds are replaced on every refresh, as the
+coordinators do, rather than changed in place. Two kinds of refresh are
+timed: one where every entity writes, like the first refresh, a recovery or
+a profile update, and one where a single side of every bed changed its
+sleep number and only its sleep number sensor writes.
+"""
+import argparse
+import json
+from dataclasses import replace
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+from homeassistant.const import ATTR_ATTRIBUTION
+
+from custom_components.sleepiq_custom.const import (
+    ATTRIBUTION_TEXT,
+    LEFT,
+    RIGHT,
+    SIDES,
+)
+from custom_components.sleepiq_custom.models import (
+    Bed,
+    FootWarming,
+    ResponsiveAir,
+    Side,
+    Sleeper,
+    get_path,
+    updated,
+)
+from custom_components.sleepiq_custom.views import SideViews
+
+
+class Entity:
+    """The parts of a side entity a state write reads."""
+
+    def __init__(self, bed_id: str, side: str, coordinator):
+        """Initialize the entity."""
+        self._bed_id = bed_id
+        self._side = side
+        self._coordinator = coordinator
+        self._view_key = (bed_id, side)
+
+    @property
+    def bed(self) -> Bed:
+        return self._coordinator.data[self._bed_id]
+
+    @property
+    def view(self):
+        return self._coordinator.views[self._view_key]
+
+    def write(self) -> List[Any]:
+        return [self.name, self.state, self.device_state_attributes]
+
+
+class SleeperSensorBefore(Entity):
+    @property
+    def name(self):
+        if self._side is LEFT:
+            return self.bed.left_side.sleeper.firstName + " Sleep Number"
+        else:
+            return self.bed.right_side.sleeper.firstName + " Sleep Number"
+
+    @property
+    def state(self):
+        if self._side is LEFT:
+            return self.bed.left_side.sleepNumber
+        else:
+            return self.bed.right_side.sleepNumber
+
+    @property
+    def device_state_attributes(self):
+        side = self.bed.left_side if self._side is LEFT else self.bed.right_side
+        responsive_air = get_path(self.bed, f"responsive_air.{self._side}SideEnabled")
+        foot_warming = get_path(
+            self.bed, f"foot_warming.footWarmingStatus{self._side.capitalize()}"
+        )
+        return {
+            "sleeper": side.sleeper.firstName,
+            "isInBed": side.isInBed,
+            "favorite": side.sleeper.favorite,
+            "responsive_air": "on" if responsive_air else "off",
+            "foot_warming": "on" if foot_warming else "off",
+            ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+        }
+
+
+class IsInBedBefore(Entity):
+    @property
+    def side(self):
+        if self._side is LEFT:
+            return self.bed.left_side
+        return self.bed.right_side
+
+    @property
+    def name(self):
+        if self._side is LEFT:
+            if self.bed.left_side.sleeper.firstName is None:
+                return self._side + " side In Bed"
+            return self.bed.left_side.sleeper.firstName + " In Bed"
+        else:
+            if self.bed.right_side.sleeper.firstName is None:
+                return self._side + " side In Bed"
+            return self.bed.right_side.sleeper.firstName + " In Bed"
+
+    @property
+    def state(self):
+        if self.side.occupied is None:
+            return self.side.isInBed
+        return self.side.occupied
+
+    @property
+    def device_state_attributes(self):
+        return {
+            "sleeper": self.side.sleeper.firstName,
+            "last_transition": self.side.occupied_changed,
+            ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+        }
+
+
+class ResponsiveAirSwitchBefore(Entity):
+    @property
+    def name(self):
+        if self._side.lower() == "left":
+            return self.bed.left_side.sleeper.firstName + " responsive air"
+        return self.bed.right_side.sleeper.firstName + " responsive air"
+
+    @property
+    def state(self):
+        if self._side.lower() == "left":
+            return self.bed.responsive_air.leftSideEnabled
+        elif self._side.lower() == "right":
+            return self.bed.responsive_air.rightSideEnabled
+        return None
+
+    @property
+    def device_state_attributes(self):
+        return {
+            "adjustmentThreshold": self.bed.responsive_air.adjustmentThreshold,
+            "inBedTimeout": self.bed.responsive_air.inBedTimeout,
+            "leftSideEnabled": self.bed.responsive_air.leftSideEnabled,
+            "outOfBedTimeout": self.bed.responsive_air.outOfBedTimeout,
+            "pollFrequency": self.bed.responsive_air.pollFrequency,
+            "prefSyncState": self.bed.responsive_air.prefSyncState,
+            "rightSideEnabled": self.bed.responsive_air.rightSideEnabled,
+            ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+        }
+
+
+class SleeperSensorAfter(Entity):
+    @property
+    def name(self):
+        return self.view.name + " Sleep Number"
+
+    @property
+    def state(self):
+        return self.view.sleep_number
+
+    @property
+    def device_state_attributes(self):
+        return self.view.sleeper_attributes
+
+
+class IsInBedAfter(Entity):
+    @property
+    def name(self):
+        if self.view.sleeper is None:
+            return self._side + " side In Bed"
+        return self.view.sleeper + " In Bed"
+
+    @property
+    def state(self):
+        return self.view.occupied
+
+    @property
+    def device_state_attributes(self):
+        return self.view.presence_attributes
+
+
+class ResponsiveAirSwitchAfter(Entity):
+    @property
+    def name(self):
+        return self.view.name + " responsive air"
+
+    @property
+    def state(self):
+        return self.view.responsive_air
+
+    @property
+    def device_state_attributes(self):
+        return self.view.responsive_air_attributes
+
+
+def make_beds(count: int) -> Dict[str, Bed]:
+    """Return beds with sleepers, responsive air and foot warming."""
+    beds = {}
+    for index in range(count):
+        bed = Bed(bedId=f"bed{index}", sleeperLeftId="l", sleeperRightId="r")
+        bed.left_side = Side(
+            isInBed=True, sleepNumber=40, sleeper=Sleeper(firstName="Alex")
+        )
+        bed.right_side = Side(
+            isInBed=False, sleepNumber=55, sleeper=Sleeper(firstName="Sam")
+        )
+        bed.responsive_air = ResponsiveAir(leftSideEnabled=True)
+        bed.foot_warming = FootWarming(footWarmingStatusLeft=0)
+        beds[bed.bedId] = bed
+    return beds
+
+
+def time_refreshes(
+    bed_count: int, refreshes: int, classes, views: bool, everything: bool
+) -> float:
+    """Return the seconds the entities take per refresh, on average."""
+    beds = make_beds(bed_count)
+    coordinator = SimpleNamespace(data=beds, views=SideViews())
+    entities = {
+        (bed_id, side): [cls(bed_id, side, coordinator) for cls in classes]
+        for bed_id in beds
+        for side in SIDES
+    }
+    writes: Callable[[str], List[Entity]]
+    if everything:
+        writes = lambda bed_id: entities[(bed_id, LEFT)] + entities[(bed_id, RIGHT)]
+    else:
+        writes = lambda bed_id: entities[(bed_id, LEFT)][:1]
+
+    elapsed = 0.0
+    for poll in range(refreshes):
+        # The views hold the beds they were built from; keeping the replaced
+        # beds until the timer stops makes both ways free them untimed.
+        replaced = list(beds.values())
+        for bed_id, bed in list(beds.items()):
+            beds[bed_id] = replace(
+                bed,
+                left_side=updated(bed.left_side, {"sleepNumber": 40 + poll % 2 * 5}),
+            )
+        # Only what follows the refresh is timed.
+        start = time.perf_counter()
+        if views:
+            coordinator.views.update(beds)
+        for bed_id in beds:
+            for entity in writes(bed_id):
+                entity.write()
+        elapsed += time.perf_counter() - start
+        del replaced
+    return elapsed / refreshes
+
+
+def run(bed_count: int, refreshes: int) -> Dict[str, Any]:
+    """Time both ways of writing the entities."""
+    before = (SleeperSensorBefore, IsInBedBefore, ResponsiveAirSwitchBefore)
+    after = (SleeperSensorAfter, IsInBedAfter, ResponsiveAirSwitchAfter)
+    result: Dict[str, Any] = {"beds": bed_count}
+    for name, everything in (("all", True), ("one_side", False)):
+        for label, classes, views in (("before", before, False), ("after", after, True)):
+            seconds = time_refreshes(bed_count, refreshes, classes, views, everything)
+            result[f"{name}_{label}_us"] = round(seconds * 1e6, 1)
+    return result
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--beds", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--refreshes", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="print JSON results")
+    args = parser.parse_args()
+
+    results = [run(beds, args.refreshes) for beds in args.beds]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print("µs per refresh      every entity writes    one side changed")
+    print(f"{'beds':>6} {'before':>18} {'after':>8} {'before':>11} {'after':>8}")
+    for result in results:
+        print(
+            f"{result['beds']:>6} {result['all_before_us']:>18} "
+            f"{result['all_after_us']:>8} {result['one_side_before_us']:>11} "
+            f"{result['one_side_after_us']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Benchmark setup and polling against the fake SleepIQ server.
+
+Run from the repository root with Home Assistant's requirements installed:
+
+    python -m benchmarks.bench_polling --beds 1 10 100
+
+An entry's coordinators and the entities of every platform are polled the
+way Home Assistant runs them: a poll is a coordinator refresh, with its
+occupancy filter, diff and side views, followed by the state writes of the
+entities whose fields changed. A sleeper gets in or out of bed before every
+status poll so there is something to write. For every bed count this
+reports the setup time (login, the first refresh of every tier and adding
+the entities), the wall time of a poll of each tier, the requests and entity
+writes one poll makes and what the requests add up to per hour at the
+tier's base interval, and the CPU time the integration's event loop spends
+on a poll. Each bed count is run once per fetch concurrency, 1 being
+sequential; add some latency to see the difference:
+
+    python -m benchmarks.bench_polling --beds 1 10 --latency 0.05
+
+The server runs on its own thread and event loop, so its work does not
+count towards the loop time. Entity state writes read the name, state and
+attributes but stop short of the state machine.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+from aiohttp import ClientSession
+from homeassistant.core import HomeAssistant
+
+from custom_components.sleepiq_custom import create_coordinators
+from custom_components.sleepiq_custom.api import SleepIQClient, SleepIQSession
+from custom_components.sleepiq_custom.const import (
+    DOMAIN,
+    FETCH_CONCURRENCY,
+    LEFT,
+    TIER_INTERVALS,
+    TIER_STATUS,
+    TIERS,
+)
+from custom_components.sleepiq_custom.coordinator import SleepIQPollingEngine
+
+from .fake_sleepiq import FakeSleepIQServer
+from .replay_night import PLATFORMS
+
+
+class ServerThread:
+    """Run a fake server on a background event loop."""
+
+    def __init__(self, server: FakeSleepIQServer):
+        """Initialize the thread."""
+        self.server = server
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+
+    def __enter__(self) -> str:
+        self._thread.start()
+        return asyncio.run_coroutine_threadsafe(
+            self.server.start(), self.loop
+        ).result()
+
+    def __exit__(self, *exc) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    """Return the median and 95th percentile in milliseconds."""
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    return {
+        "median_ms": round(statistics.median(values) * 1000, 2),
+        "p95_ms": round(p95 * 1000, 2),
+    }
+
+
+class Entry:
+    """An entry's coordinators and entities, counting the state writes."""
+
+    def __init__(self, hass: HomeAssistant, client: SleepIQClient):
+        """Initialize the entry."""
+        self.hass = hass
+        self.coordinators = create_coordinators(
+            hass, client, SleepIQPollingEngine(hass)
+        )
+        self.entities: List[Any] = []
+        self.writes = 0
+
+    def _write(self, entity) -> None:
+        """Read what a state write reads."""
+        entity.name, entity.state, entity.device_state_attributes
+        self.writes += 1
+
+    async def async_setup(self) -> None:
+        """Refresh every tier and add the entities, as setting up an entry does."""
+        for tier in TIERS:
+            await self.coordinators[tier].async_refresh()
+        entry = SimpleNamespace(entry_id="bench")
+        self.hass.data.setdefault(DOMAIN, {})[entry.entry_id] = self.coordinators
+        for platform in PLATFORMS:
+            await platform.async_setup_entry(self.hass, entry, self.entities.extend)
+        for entity in self.entities:
+            entity.async_write_ha_state = lambda entity=entity: self._write(entity)
+            self._write(entity)
+
+    async def async_poll(self, tier: str) -> bool:
+        """Refresh a tier and write its entities; return False if it failed."""
+        coordinator = self.coordinators[tier]
+        await coordinator.async_refresh()
+        for entity in self.entities:
+            if (
+                entity.coordinator is coordinator
+                or coordinator in entity._extra_coordinators
+            ):
+                entity._handle_tier_update(coordinator)
+        return coordinator.last_update_success
+
+
+async def bench_beds(
+    url: str, server: FakeSleepIQServer, polls: int, concurrency: int
+) -> Dict:
+    """Measure one bed count at one fetch concurrency."""
+    async with ClientSession() as websession:
+        session = SleepIQSession(
+            server.username, server.password, websession, base_url=url
+        )
+        entry = Entry(HomeAssistant(), SleepIQClient(session, concurrency))
+
+        start = time.perf_counter()
+        await entry.async_setup()
+        result: Dict[str, Any] = {
+            "beds": len(server.beds),
+            "concurrency": concurrency,
+            "setup_ms": round((time.perf_counter() - start) * 1000, 2),
+            "entities": len(entry.entities),
+            "tiers": {},
+        }
+
+        for tier in TIERS:
+            wall, loop, requests, writes = [], [], [], []
+            failures = 0
+            for poll in range(polls):
+                if tier == TIER_STATUS:
+                    server.set_in_bed(next(iter(server.beds)), LEFT, poll % 2 == 0)
+                count = session.metrics.request_count
+                written = entry.writes
+                cpu = time.thread_time()
+                start = time.perf_counter()
+                if not await entry.async_poll(tier):
+                    failures += 1
+                wall.append(time.perf_counter() - start)
+                loop.append(time.thread_time() - cpu)
+                requests.append(session.metrics.request_count - count)
+                writes.append(entry.writes - written)
+            per_poll = statistics.mean(requests)
+            result["tiers"][tier] = {
+                "poll": _summary(wall),
+                "loop": _summary(loop),
+                "requests_per_poll": per_poll,
+                "writes_per_poll": statistics.mean(writes),
+                "failures": failures,
+                "requests_per_hour": round(
+                    per_poll * 3600 / TIER_INTERVALS[tier].total_seconds()
+                ),
+            }
+        result["requests_per_hour"] = sum(
+            tier["requests_per_hour"] for tier in result["tiers"].values()
+        )
+        result["logins"] = session.login_count
+    return result
+
+
+def _print(result: Dict) -> None:
+    """Print one bed count as a table."""
+    print(
+        f"\n{result['beds']} bed(s), concurrency {result['concurrency']}: "
+        f"setup {result['setup_ms']} ms, {result['entities']} entities, "
+        f"{result['requests_per_hour']} requests/hour, {result['logins']} login(s)"
+    )
+    print(
+        f"  {'tier':<10}{'poll p50':>10}{'poll p95':>10}{'loop p50':>10}"
+        f"{'req':>6}{'writes':>8}"
+    )
+    for tier, stats in result["tiers"].items():
+        print(
+            f"  {tier:<10}{stats['poll']['median_ms']:>10}"
+            f"{stats['poll']['p95_ms']:>10}{stats['loop']['median_ms']:>10}"
+            f"{stats['requests_per_poll']:>6g}{stats['writes_per_poll']:>8g}"
+        )
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--beds", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--polls", type=int, default=20)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, FETCH_CONCURRENCY],
+        help="fetch concurrency limits to compare, 1 is sequential",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="mean server latency in seconds"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="share of HTTP 500 answers"
+    )
+    parser.add_argument(
+        "--padding", type=int, default=0, help="filler bytes added to each payload"
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = []
+    for beds in args.beds:
+        for concurrency in args.concurrency:
+            server = FakeSleepIQServer(
+                beds=beds,
+                latency=args.latency,
+                error_rate=args.error_rate,
+                padding=args.padding,
+            )
+            with ServerThread(server) as url:
+                result = asyncio.run(bench_beds(url, server, args.polls, concurrency))
+            _print(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,327 @@
+"""A local stand-in for the SleepIQ REST API.
+
+Serves the endpoints the integration uses (login, beds, sleepers, family
+status, foundation, outlets, responsive air, foot warming, privacy mode
+and the sleep number commands) for any number of fake beds, with
+configurable latency, error rate and payload size.
+"""
+import asyncio
+import json
+import random
+from typing import Any, Dict, Optional
+import uuid
+
+from aiohttp import web
+
+SIDES = ("left", "right")
+
+
+def _make_sleeper(account_id: str, bed_id: str, index: int, side: int) -> Dict:
+    """Return a sleeper profile."""
+    return {
+        "sleeperId": f"sleeper-{index}-{side}",
+        "accountId": account_id,
+        "bedId": bed_id,
+        "firstName": f"Sleeper{index}{'LR'[side]}",
+        "active": True,
+        "emailValidated": True,
+        "gender": side,
+        "isChild": False,
+        "birthYear": "1980",
+        "birthMonth": 1,
+        "zipCode": "00000",
+        "timezone": "US/Central",
+        "privacyPolicyVersion": 1,
+        "duration": None,
+        "weight": 150,
+        "firstSessionRecorded": "2020-01-01T00:00:00Z",
+        "height": 70,
+        "licenseVersion": 1,
+        "username": f"sleeper{index}{side}@example.com",
+        "sleepGoal": 480,
+        "isAccountOwner": index == 0 and side == 0,
+        "email": f"sleeper{index}{side}@example.com",
+        "lastLogin": "2020-01-01 00:00:00 CST",
+        "side": side,
+        "favorite": 50,
+    }
+
+
+class FakeBed:
+    """The mutable state of one fake bed."""
+
+    def __init__(self, account_id: str, index: int):
+        """Initialize the bed."""
+        self.bed_id = f"bed-{index}"
+        self.account_id = account_id
+        self.index = index
+        self.sleepers = [
+            _make_sleeper(account_id, self.bed_id, index, side) for side in (0, 1)
+        ]
+        self.in_bed = {side: False for side in SIDES}
+        self.sleep_number = {side: 50 for side in SIDES}
+        self.outlets = {outlet: 0 for outlet in (1, 2, 3, 4)}
+        self.responsive_air = {side: False for side in SIDES}
+        self.pause_mode = "off"
+
+    def bed_payload(self) -> Dict[str, Any]:
+        """Return the bed registration."""
+        return {
+            "bedId": self.bed_id,
+            "accountId": self.account_id,
+            "name": f"Bed {self.index}",
+            "model": "P6",
+            "status": 1,
+            "registrationDate": "2020-01-01T00:00:00Z",
+            "macAddress": f"00:00:00:00:{self.index // 256:02x}:{self.index % 256:02x}",
+            "sleeperLeftId": self.sleepers[0]["sleeperId"],
+            "sleeperRightId": self.sleepers[1]["sleeperId"],
+        }
+
+    def status_payload(self) -> Dict[str, Any]:
+        """Return the family status entry."""
+        payload = {"bedId": self.bed_id, "status": 1}
+        for side in SIDES:
+            payload[f"{side}Side"] = {
+                "isInBed": self.in_bed[side],
+                "sleepNumber": self.sleep_number[side],
+                "alertId": 0,
+                "alertDetailedMessage": "No Alert",
+                "lastLink": "00:00:00",
+                "pressure": 1000,
+            }
+        return payload
+
+
+class FakeSleepIQServer:
+    """An aiohttp application that behaves like the SleepIQ cloud.
+
+    ``latency`` is the mean delay added to every response in seconds,
+    ``error_rate`` the share of requests answered with HTTP 500 and
+    ``padding`` the number of filler bytes added to every JSON payload.
+    """
+
+    def __init__(
+        self,
+        beds: int = 1,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        padding: int = 0,
+        username: str = "user@example.com",
+        password: str = "password",
+    ):
+        """Initialize the server."""
+        self.account_id = "account-0"
+        self.beds = {
+            bed.bed_id: bed for bed in (FakeBed(self.account_id, i) for i in range(beds))
+        }
+        self.latency = latency
+        self.error_rate = error_rate
+        self.padding = padding
+        self.username = username
+        self.password = password
+        self.keys = set()
+        self.request_count = 0
+        self.requests: Dict[str, int] = {}
+        self._runner: Optional[web.AppRunner] = None
+        self.url: Optional[str] = None
+
+    def expire_keys(self) -> None:
+        """Reject every login key issued so far."""
+        self.keys.clear()
+
+    def set_in_bed(self, bed_id: str, side: str, in_bed: bool) -> None:
+        """Put a sleeper in or out of bed."""
+        self.beds[bed_id].in_bed[side] = in_bed
+
+    def make_app(self) -> web.Application:
+        """Return the aiohttp application."""
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_put("/rest/login", self._login)
+        app.router.add_get("/rest/bed", self._beds)
+        app.router.add_get("/rest/sleeper", self._sleepers)
+        app.router.add_get("/rest/bed/familyStatus", self._family_status)
+        app.router.add_get("/rest/bed/{bed_id}/foundation/status", self._foundation)
+        app.router.add_get("/rest/bed/{bed_id}/foundation/outlet", self._outlet)
+        app.router.add_put("/rest/bed/{bed_id}/foundation/outlet", self._set_outlet)
+        app.router.add_get(
+            "/rest/bed/{bed_id}/foundation/footwarming", self._foot_warming
+        )
+        app.router.add_get("/rest/bed/{bed_id}/responsiveAir", self._responsive_air)
+        app.router.add_patch(
+            "/rest/bed/{bed_id}/responsiveAir", self._set_responsive_air
+        )
+        app.router.add_get("/rest/bed/{bed_id}/pauseMode", self._pause_mode)
+        app.router.add_put("/rest/bed/{bed_id}/pauseMode", self._set_pause_mode)
+        app.router.add_put("/rest/bed/{bed_id}/sleepNumber", self._set_sleep_number)
+        app.router.add_put("/rest/bed/{bed_id}/sleepNumberFavorite", self._set_favorite)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL to point the session at."""
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://{host}:{port}/rest"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _middleware(self, request: web.Request, handler):
+        """Count requests, add latency and errors and check the login key."""
+        self.request_count += 1
+        route = request.match_info.route.resource
+        name = route.canonical if route is not None else request.path
+        self.requests[name] = self.requests.get(name, 0) + 1
+        if self.latency:
+            await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"Error": "fake failure"}, status=500)
+        if request.path != "/rest/login" and request.query.get("_k") not in self.keys:
+            return web.json_response({"Error": "Session expired"}, status=401)
+        return await handler(request)
+
+    def _json(self, payload: Dict[str, Any]) -> web.Response:
+        """Return a JSON response, padded to the configured size."""
+        if self.padding:
+            payload = {**payload, "padding": "x" * self.padding}
+        return web.Response(text=json.dumps(payload), content_type="application/json")
+
+    def _bed(self, request: web.Request) -> FakeBed:
+        """Return the bed a request is for."""
+        bed = self.beds.get(request.match_info["bed_id"])
+        if bed is None:
+            raise web.HTTPNotFound()
+        return bed
+
+    async def _login(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if body.get("login") != self.username or body.get("password") != self.password:
+            return web.json_response({"Error": "Invalid credentials"}, status=401)
+        key = uuid.uuid4().hex
+        self.keys.add(key)
+        return self._json({"key": key, "userId": self.account_id})
+
+    async def _beds(self, request: web.Request) -> web.Response:
+        return self._json({"beds": [bed.bed_payload() for bed in self.beds.values()]})
+
+    async def _sleepers(self, request: web.Request) -> web.Response:
+        return self._json(
+            {
+                "sleepers": [
+                    sleeper for bed in self.beds.values() for sleeper in bed.sleepers
+                ]
+            }
+        )
+
+    async def _family_status(self, request: web.Request) -> web.Response:
+        return self._json(
+            {"beds": [bed.status_payload() for bed in self.beds.values()]}
+        )
+
+    async def _foundation(self, request: web.Request) -> web.Response:
+        self._bed(request)
+        return self._json(
+            {
+                "fsCurrentPositionPresetRight": "Flat",
+                "fsCurrentPositionPresetLeft": "Flat",
+                "fsNeedsHoming": False,
+                "fsRightHeadPosition": "0",
+                "fsLeftHeadPosition": "0",
+                "fsRightFootPosition": "0",
+                "fsLeftFootPosition": "0",
+                "fsIsMoving": False,
+                "fsLeftUnderbedLightPWM": 0,
+                "fsRightUnderbedLightPWM": 0,
+                "fsType": "splitKing",
+            }
+        )
+
+    async def _outlet(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        outlet = int(request.query["outletId"])
+        if outlet not in bed.outlets:
+            raise web.HTTPNotFound()
+        return self._json(
+            {
+                "bedId": bed.bed_id,
+                "outlet": outlet,
+                "setting": bed.outlets[outlet],
+                "timer": None,
+            }
+        )
+
+    async def _set_outlet(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        body = await request.json()
+        bed.outlets[int(body["outletId"])] = int(body["setting"])
+        return self._json({})
+
+    async def _foot_warming(self, request: web.Request) -> web.Response:
+        self._bed(request)
+        return self._json(
+            {
+                "footWarmingStatusLeft": 0,
+                "footWarmingStatusRight": 0,
+                "footWarmingTimerLeft": 0,
+                "footWarmingTimerRight": 0,
+            }
+        )
+
+    async def _responsive_air(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        return self._json(
+            {
+                "adjustmentThreshold": 5,
+                "inBedTimeout": 300,
+                "leftSideEnabled": bed.responsive_air["left"],
+                "outOfBedTimeout": 3600,
+                "pollFrequency": 60,
+                "prefSyncState": "Unsynced",
+                "rightSideEnabled": bed.responsive_air["right"],
+            }
+        )
+
+    async def _set_responsive_air(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        body = await request.json()
+        for side in SIDES:
+            if f"{side}SideEnabled" in body:
+                bed.responsive_air[side] = bool(body[f"{side}SideEnabled"])
+        return self._json({})
+
+    async def _pause_mode(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        return self._json(
+            {
+                "accountId": self.account_id,
+                "bedId": bed.bed_id,
+                "pauseMode": bed.pause_mode,
+            }
+        )
+
+    async def _set_pause_mode(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        bed.pause_mode = request.query["mode"]
+        return self._json({})
+
+    async def _set_sleep_number(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        body = await request.json()
+        side = SIDES[0] if body["side"] == "L" else SIDES[1]
+        bed.sleep_number[side] = int(body["sleepNumber"])
+        return self._json({})
+
+    async def _set_favorite(self, request: web.Request) -> web.Response:
+        bed = self._bed(request)
+        body = await request.json()
+        sleeper = bed.sleepers[0 if body["side"] == "L" else 1]
+        sleeper["favorite"] = int(body["sleepNumberFavorite"])
+        return self._json({})
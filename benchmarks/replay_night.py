@@ -0,0 +1,184 @@
+"""Replay a recorded night of SleepIQ traffic through the integration.
+
+Recordings come from the ``sleepiq_custom.record_traffic`` service. The
+replay runs an entry's coordinators on a virtual clock: every tier is
+refreshed at its base interval across the whole recording, as fast as the
+integration can go, through the same refresh, occupancy filter and entity
+state writes as in Home Assistant. The in-bed transitions and the entity
+writes are printed along with the time spent:
+
+    python -m benchmarks.replay_night sleepiq_custom_<entry>_<time>.jsonl.gz
+
+ReplayNight is also the harness the regression tests replay recordings
+with.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from functools import partial
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+
+from custom_components.sleepiq_custom import (
+    binary_sensor,
+    create_coordinators,
+    light,
+    sensor,
+    switch,
+)
+from custom_components.sleepiq_custom.api import SleepIQClient, SleepIQSession
+from custom_components.sleepiq_custom.const import (
+    DOMAIN,
+    EVENT_BED_TRANSITION,
+    TIER_CONTROLS,
+    TIER_INTERVALS,
+    TIER_PROFILE,
+    TIER_STATUS,
+    TIERS,
+)
+from custom_components.sleepiq_custom.coordinator import SleepIQPollingEngine
+from custom_components.sleepiq_custom.recording import ReplayWebSession
+
+PLATFORMS = (binary_sensor, light, sensor, switch)
+
+
+class ReplayNight:
+    """An entry's coordinators and entities, answered from a recording.
+
+    Home Assistant's clock follows the recording's virtual one, so the
+    occupancy filter and the nightly totals see the night as it happened.
+    Entity state writes are captured instead of reaching the state machine.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        websession: ReplayWebSession,
+        start: Optional[datetime] = None,
+        entry_id: str = "replay",
+    ):
+        """Initialize the replay."""
+        self.hass = hass
+        self.websession = websession
+        self.start = start or dt_util.utcnow()
+        self.entry_id = entry_id
+        client = SleepIQClient(SleepIQSession("replay", "replay", websession))
+        self.coordinators = create_coordinators(
+            hass, client, SleepIQPollingEngine(hass)
+        )
+        self.entities: List[Any] = []
+        # Per write: seconds into the recording, entity name, state, attributes.
+        self.writes: List[Tuple[float, str, Any, Dict[str, Any]]] = []
+        self.transitions: List[Dict[str, Any]] = []
+        self.polls = 0
+        self.failures = 0
+
+    def now(self) -> datetime:
+        """Return the wall-clock time the recording has reached."""
+        return self.start + timedelta(seconds=self.websession.now)
+
+    def states(self, name: str) -> List[Any]:
+        """Return the states an entity wrote, in order."""
+        return [state for _, written, state, _ in self.writes if written == name]
+
+    def _write(self, entity) -> None:
+        """Capture an entity's state write."""
+        self.writes.append(
+            (
+                self.websession.now,
+                entity.name,
+                entity.state,
+                dict(entity.device_state_attributes or {}),
+            )
+        )
+
+    async def _async_add_entities(self) -> None:
+        """Create the entities the way the platforms do at setup."""
+        entry = SimpleNamespace(entry_id=self.entry_id)
+        self.hass.data.setdefault(DOMAIN, {})[self.entry_id] = self.coordinators
+        for platform in PLATFORMS:
+            await platform.async_setup_entry(self.hass, entry, self.entities.extend)
+        for entity in self.entities:
+            entity.async_write_ha_state = partial(self._write, entity)
+            self._write(entity)
+
+    async def async_refresh(self, tier: str) -> None:
+        """Refresh a tier and let its entities write what changed."""
+        coordinator = self.coordinators[tier]
+        await coordinator.async_refresh()
+        self.polls += 1
+        if not coordinator.last_update_success:
+            self.failures += 1
+        for entity in self.entities:
+            if (
+                entity.coordinator is coordinator
+                or coordinator in entity._extra_coordinators
+            ):
+                entity._handle_tier_update(coordinator)
+        # Let the transition events reach their listener.
+        await asyncio.sleep(0)
+
+    async def async_run(self) -> None:
+        """Refresh every tier at its base interval across the recording."""
+        unsub = self.hass.bus.async_listen(
+            EVENT_BED_TRANSITION,
+            callback(lambda event: self.transitions.append(event.data)),
+        )
+        try:
+            with patch("homeassistant.util.dt.utcnow", self.now):
+                # Setup refreshes the profile tier first; it finds the beds.
+                await self.async_refresh(TIER_PROFILE)
+                await self.async_refresh(TIER_STATUS)
+                await self.async_refresh(TIER_CONTROLS)
+                await self._async_add_entities()
+                due = {tier: TIER_INTERVALS[tier].total_seconds() for tier in TIERS}
+                while min(due.values()) <= self.websession.duration:
+                    tier = min(due, key=due.get)
+                    self.websession.advance(due[tier] - self.websession.now)
+                    await self.async_refresh(tier)
+                    due[tier] += TIER_INTERVALS[tier].total_seconds()
+        finally:
+            unsub()
+            for coordinator in self.coordinators.values():
+                coordinator.cancel_commands()
+
+
+async def replay(path: str) -> None:
+    """Replay one recording and print what the integration did."""
+    hass = HomeAssistant()
+    night = ReplayNight(hass, ReplayWebSession.from_file(path, speed=0))
+    start = time.perf_counter()
+    cpu = time.process_time()
+    await night.async_run()
+    wall = time.perf_counter() - start
+
+    for transition in night.transitions:
+        print(
+            f"{transition['at']} {transition['bed_id']} {transition['side']}: "
+            f"{'in' if transition['in_bed'] else 'out of'} bed"
+        )
+    print(
+        f"\nReplayed {night.websession.duration / 3600:.1f} h in {wall:.2f} s: "
+        f"{night.polls} polls, {night.failures} failed, "
+        f"{night.websession.request_count} requests, "
+        f"{len(night.writes)} entity writes, "
+        f"{(time.process_time() - cpu) / max(night.polls, 1) * 1000:.3f} ms CPU "
+        "per poll"
+    )
+
+
+def main() -> None:
+    """Run the replay."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording")
+    args = parser.parse_args()
+    asyncio.run(replay(args.recording))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,108 @@
 """The SleepIQ Custom integration."""
 import asyncio
+from datetime import timedelta
 import logging
 import voluptuous as vol
-from typing import Any, Dict
-
-from sleepi.models import Bed
-from sleepi.sleepiq import SleepIQ
+from typing import Any, Dict, List, Optional
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
-from homeassistant.helpers.update_coordinator import (
-    CoordinatorEntity,
-    DataUpdateCoordinator,
-    UpdateFailed,
-)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 SERVICE_SET_SLEEP_NUMBER = "set_sleep_number"
 SERVICE_SET_FAVORITE = "set_favorite_sleep_number"
-SERVICE_SET_FAVORITE_ATTR_SIDE = "side"
-SERVICE_SET_FAVORITE_ATTR_NUMBER = "number"
-
+SERVICE_ATTR_BED_ID = "bed_id"
+SERVICE_ATTR_SIDE = "side"
+SERVICE_ATTR_SLEEP_NUMBER = "sleep_number"
+SERVICE_SIDE_BOTH = "both"
+SERVICE_RECORD_TRAFFIC = "record_traffic"
+SERVICE_RECORD_TRAFFIC_ATTR_DURATION = "duration"
+SERVICE_PROFILE = "profile"
+SERVICE_PROFILE_ATTR_REFRESHES = "refreshes"
+
+from .api import SleepIQClient, SleepIQSession
 from .const import (
+    COMMAND_FAVORITE,
+    COMMAND_DEBOUNCE,
+    COMMAND_SLEEP_NUMBER,
+    CONF_COMMAND_DEBOUNCE,
+    CONF_CONCURRENCY,
+    CONF_ENTER_DELAY,
+    CONF_EXIT_DELAY,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_NIGHT_START,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_TIER_INTERVALS,
+    DATA_ENGINE,
+    DATA_SCHEDULER,
+    DEFAULT_ENTER_DELAY,
+    DEFAULT_EXIT_DELAY,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_NIGHT_START,
     DEVICE_MANUFACTURER,
     DEVICE_NAME,
     DEVICE_SW_VERSION,
     DOMAIN,
-    SCAN_INTERVAL,
+    FETCH_CONCURRENCY,
+    HISTORY_INTERVAL,
+    OPTIMISTIC_TIMEOUT,
+    SIDES,
+    TIER_CONTROLS,
+    TIER_INTERVALS,
+    TIER_PROFILE,
+    TIER_STATUS,
+    TIERS,
 )
+from .coordinator import SleepIQDataUpdateCoordinator, SleepIQPollingEngine
+from .history import SleepIQHistoryImporter
+from .occupancy import NightlyOccupancyStats, OccupancyFilter
+from .overrides import LocalOverrides
+from .models import Bed, BedSnapshot
+from .profiling import SleepIQProfiler
+from .ratelimit import SleepIQRequestScheduler
+from .recording import SleepIQRecorder
+from .storage import SleepIQSnapshotStore
+from .views import SideView, SideViews
+
+
+def _sleep_number(value: Any) -> int:
+    """Validate a sleep number: a multiple of 5 between 5 and 100."""
+    number = vol.All(vol.Coerce(int), vol.Range(min=5, max=100))(value)
+    if number % 5:
+        raise vol.Invalid(f"Sleep number {number} is not a multiple of 5")
+    return number
+
 
 SERVICE_SET_NUMBER_SCHEMA = vol.Schema(
     {
-        vol.Required(SERVICE_SET_FAVORITE_ATTR_SIDE): str,
-        vol.Required(SERVICE_SET_FAVORITE_ATTR_NUMBER): int,
+        vol.Required(SERVICE_ATTR_SLEEP_NUMBER): _sleep_number,
+        vol.Optional(SERVICE_ATTR_SIDE, default=SERVICE_SIDE_BOTH): vol.All(
+            vol.Lower, vol.In(SIDES + [SERVICE_SIDE_BOTH])
+        ),
+        vol.Optional(SERVICE_ATTR_BED_ID): vol.All(cv.ensure_list, [cv.string]),
+    }
+)
+
+SERVICE_RECORD_TRAFFIC_SCHEMA = vol.Schema(
+    {
+        vol.Optional(SERVICE_RECORD_TRAFFIC_ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=24 * 60)
+        ),
+    }
+)
+
+SERVICE_PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(SERVICE_PROFILE_ATTR_REFRESHES, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=1000)
+        ),
     }
 )
 
@@ -44,70 +113,280 @@ PLATFORMS = ["light", "sensor", "binary_sensor", "switch"]
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the SleepIQ Custom component."""
+
+    async def handle_record_traffic(call):
+        """Record the API traffic of every account for a number of minutes."""
+        duration = call.data[SERVICE_RECORD_TRAFFIC_ATTR_DURATION]
+        for entry_id, coordinators in hass.data.get(DOMAIN, {}).items():
+            session = coordinators[TIER_STATUS].session
+            if session.recorder is not None:
+                _LOGGER.warning("Already recording SleepIQ traffic for %s", entry_id)
+                continue
+            recorder = session.recorder = SleepIQRecorder()
+            path = hass.config.path(
+                f"{DOMAIN}_{entry_id}_{dt_util.utcnow():%Y%m%d%H%M%S}.jsonl.gz"
+            )
+            _LOGGER.info("Recording SleepIQ traffic to %s for %s min", path, duration)
+
+            async def async_stop(_now, session=session, recorder=recorder, path=path):
+                """Stop recording and write the file."""
+                session.recorder = None
+                await hass.async_add_executor_job(recorder.save, path)
+                _LOGGER.info(
+                    "Saved %s SleepIQ requests to %s", len(recorder.records), path
+                )
+
+            async_call_later(hass, duration * 60, async_stop)
+
+    async def handle_profile(call):
+        """Profile the next refreshes of every account and save a report."""
+        coordinators = [
+            coordinator
+            for tiers in hass.data.get(DOMAIN, {}).values()
+            for coordinator in tiers.values()
+        ]
+        if not coordinators:
+            raise HomeAssistantError("No SleepIQ accounts to profile")
+        if any(coordinator.profiler is not None for coordinator in coordinators):
+            _LOGGER.warning("Already profiling SleepIQ refreshes")
+            return
+        refreshes = call.data[SERVICE_PROFILE_ATTR_REFRESHES]
+        profiler = SleepIQProfiler(refreshes)
+        for coordinator in coordinators:
+            coordinator.profiler = profiler
+        path = hass.config.path(f"{DOMAIN}_profile_{dt_util.utcnow():%Y%m%d%H%M%S}")
+        _LOGGER.info("Profiling the next %s SleepIQ refreshes to %s", refreshes, path)
+
+        async def async_finish():
+            """Detach the profiler once it is done and write the report."""
+            await profiler.finished.wait()
+            for coordinator in coordinators:
+                if coordinator.profiler is profiler:
+                    coordinator.profiler = None
+            await hass.async_add_executor_job(profiler.save, path)
+            _LOGGER.info("Saved the SleepIQ profile to %s.pstats and .txt", path)
+
+        hass.async_create_task(async_finish())
+
+    async def handle_set_number(call):
+        """Set the sleep number or favorite of every side the call targets.
+
+        Every target is validated before anything is sent. The commands then
+        go through each bed's queue, so beds are adjusted concurrently, and
+        the call returns once all of them have been sent.
+        """
+        number = call.data[SERVICE_ATTR_SLEEP_NUMBER]
+        side = call.data[SERVICE_ATTR_SIDE]
+        sides = SIDES if side == SERVICE_SIDE_BOTH else [side]
+        targets = _service_targets(hass, call.data.get(SERVICE_ATTR_BED_ID))
+        if call.service == SERVICE_SET_FAVORITE:
+            kind = COMMAND_FAVORITE
+        else:
+            kind = COMMAND_SLEEP_NUMBER
+
+        commands = []
+        for bed_id, coordinator in targets:
+            for side in sides:
+                # The favorite shows up straight away; the sleep number is
+                # followed by a burst poll while the bed inflates.
+                expected = {}
+                if kind == COMMAND_FAVORITE:
+                    expected = {f"{side}_side.sleeper.favorite": number}
+                commands.append(
+                    coordinator.async_send_command(
+                        bed_id,
+                        expected,
+                        coordinator.async_notify_changes,
+                        kind,
+                        side,
+                        number,
+                    )
+                )
+        results = await asyncio.gather(*commands, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise HomeAssistantError(
+                f"{len(errors)} of {len(results)} SleepIQ commands failed: {errors[0]}"
+            )
+
+    for service in (SERVICE_SET_SLEEP_NUMBER, SERVICE_SET_FAVORITE):
+        hass.services.async_register(
+            DOMAIN, service, handle_set_number, schema=SERVICE_SET_NUMBER_SCHEMA
+        )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_RECORD_TRAFFIC,
+        handle_record_traffic,
+        schema=SERVICE_RECORD_TRAFFIC_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_PROFILE, handle_profile, schema=SERVICE_PROFILE_SCHEMA
+    )
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry: ConfigEntry) -> bool:
     """Set up SleepIQ Custom from a config entry."""
 
-    coordinator = SleepIQDataUpdateCoordinator(hass, config_entry=config_entry)
-    await coordinator.async_refresh()
-
-    if not coordinator.last_update_success:
-        raise ConfigEntryNotReady
-
+    config = config_entry.data
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][config_entry.entry_id] = coordinator
+    # Every account's requests are paced by one scheduler for the process.
+    scheduler = hass.data.get(DATA_SCHEDULER)
+    if scheduler is None:
+        scheduler = hass.data[DATA_SCHEDULER] = SleepIQRequestScheduler()
+    # Each account gets its own cookie jar so logins don't clobber each other.
+    # Home Assistant only closes it at shutdown, so unloading closes it too.
+    websession = async_create_clientsession(hass)
+    session = SleepIQSession(
+        config["username"], config["password"], websession, scheduler=scheduler
+    )
+    client = SleepIQClient(session)
+    engine = hass.data.get(DATA_ENGINE)
+    if engine is None:
+        engine = hass.data[DATA_ENGINE] = SleepIQPollingEngine(hass)
+    store = SleepIQSnapshotStore(hass, config_entry.entry_id)
+    coordinators = create_coordinators(hass, client, engine, store)
+    nightly = coordinators[TIER_STATUS].nightly
+    _apply_options(coordinators, config_entry.options)
+    config_entry.async_on_unload(
+        config_entry.add_update_listener(_async_update_options)
+    )
+
+    async def async_initial_refresh():
+        """Refresh every tier, starting with the profile tier."""
+        # The profile tier discovers the beds the other tiers read from.
+        await coordinators[TIER_PROFILE].async_refresh()
+        if coordinators[TIER_PROFILE].last_update_success:
+            await asyncio.gather(
+                coordinators[TIER_STATUS].async_refresh(),
+                coordinators[TIER_CONTROLS].async_refresh(),
+            )
+
+    # With a stored snapshot the entities are created from it straight away
+    # and the live refresh runs in the background.
+    beds = await store.async_load()
+    if beds:
+        nightly.restore(store.restored_nightly)
+        client.beds = BedSnapshot(beds)
+        for coordinator in coordinators.values():
+            coordinator.async_set_stale_data(client.beds)
+        hass.async_create_task(async_initial_refresh())
+    else:
+        await async_initial_refresh()
+        if not all(
+            coordinator.last_update_success for coordinator in coordinators.values()
+        ):
+            await session.async_close()
+            raise ConfigEntryNotReady
+
+    hass.data[DOMAIN][config_entry.entry_id] = coordinators
+
+    # Finished nights go to long-term statistics, not entity states.
+    importer = SleepIQHistoryImporter(hass, client, config_entry.entry_id)
+    hass.async_create_task(importer.async_import())
+    config_entry.async_on_unload(
+        async_track_time_interval(hass, importer.async_import, HISTORY_INTERVAL)
+    )
 
     for component in PLATFORMS:
         hass.async_create_task(
             hass.config_entries.async_forward_entry_setup(config_entry, component)
         )
 
-    async def handle_set_sleep_number(call):
-        """ Handle the service call to set the Sleep Number for specific side """
-        side = call.data.get("side", "")
-        number_to_set = call.data.get("sleep_number", "")
-
-        set_sleep_number(side, number_to_set)
+    return True
 
-    async def handle_set_favorite_sleep_number(call):
-        """ Handle the service call to set the Sleep Number favorite for a specific side """
-        side = call.data.get("side", "")
-        number_to_set = call.data.get("number", "")
 
-        await set_favorite_sleep_number(side, number_to_set)
+def create_coordinators(
+    hass: HomeAssistant,
+    client: SleepIQClient,
+    engine: SleepIQPollingEngine,
+    store: Optional[SleepIQSnapshotStore] = None,
+) -> Dict[str, SleepIQDataUpdateCoordinator]:
+    """Create the tiers of an entry.
+
+    The tiers share the entry's side views, command overrides, burst polls
+    and occupancy filter, and the status tier keeps the nightly totals.
+    """
+    coordinators = {
+        tier: SleepIQDataUpdateCoordinator(hass, client, tier, engine, store=store)
+        for tier in TIERS
+    }
+    nightly = coordinators[TIER_STATUS].nightly = NightlyOccupancyStats()
+    if store is not None:
+        store.nightly = nightly
+    views = SideViews()
+    overrides = LocalOverrides()
+    bursts = {}
+    seen = {}
+    occupancy = OccupancyFilter()
+    for coordinator in coordinators.values():
+        coordinator.views = views
+        coordinator.overrides = overrides
+        coordinator.bursts = bursts
+        coordinator.seen = seen
+        coordinator.occupancy = occupancy
+    return coordinators
+
+
+def _seconds(options: Dict[str, Any], key: str, default: timedelta) -> timedelta:
+    """Return a duration option, stored in seconds."""
+    return timedelta(seconds=options.get(key, default.total_seconds()))
+
+
+@callback
+def _apply_options(coordinators: Dict[str, Any], options: Dict[str, Any]) -> None:
+    """Apply an entry's options to its running coordinators and client."""
+    min_interval = _seconds(options, CONF_MIN_INTERVAL, DEFAULT_MIN_INTERVAL)
+    max_interval = _seconds(options, CONF_MAX_INTERVAL, DEFAULT_MAX_INTERVAL)
+    debounce = timedelta(
+        milliseconds=options.get(
+            CONF_COMMAND_DEBOUNCE, COMMAND_DEBOUNCE.total_seconds() * 1000
+        )
+    )
+    optimistic_timeout = _seconds(options, CONF_OPTIMISTIC_TIMEOUT, OPTIMISTIC_TIMEOUT)
+    for tier, coordinator in coordinators.items():
+        coordinator.async_set_intervals(
+            _seconds(options, CONF_TIER_INTERVALS[tier], TIER_INTERVALS[tier]),
+            min_interval,
+            max_interval,
+        )
+        coordinator.set_command_debounce(debounce)
+        coordinator.optimistic_timeout = optimistic_timeout
 
-    async def set_favorite_sleep_number(side, number_to_set):
-        """ Set the favorite sleep number for a specific side"""
-        if side is None:
-            _LOGGER.error("You must specify a side when setting the sleep number")
-        else:
-            _LOGGER.error("This is were we set the favorite sleep number")
-            await coordinator.sleepiq.set_favorite_sleepnumber(side, number_to_set)
+    status = coordinators[TIER_STATUS]
+    status.sleepiq.set_concurrency(options.get(CONF_CONCURRENCY, FETCH_CONCURRENCY))
+    status.occupancy.enter_delay = _seconds(
+        options, CONF_ENTER_DELAY, DEFAULT_ENTER_DELAY
+    )
+    status.occupancy.exit_delay = _seconds(options, CONF_EXIT_DELAY, DEFAULT_EXIT_DELAY)
+    status.nightly.night_start = options.get(CONF_NIGHT_START, DEFAULT_NIGHT_START)
 
-    async def set_sleep_number(side, number_to_set):
-        """ Set the sleep number for a specific side"""
-        if side is None:
-            _LOGGER.error("You must specify a side when setting the sleep number")
 
-        if 0 < int(number_to_set) <= 100 and int(number_to_set) % 5 == 0:
-            _LOGGER.error("This is were we set the sleep number")
-            # await coordinator.sleepiq.set_sleepnumber(side, number_to_set)
-        else:
-            message = f"Invalid sleep number: {number_to_set}. The new sleep number must be a multiple of 5 between 5 and 100"
-            _LOGGER.error(message)
+async def _async_update_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to the running entry, without a reload or login."""
+    coordinators = hass.data[DOMAIN].get(entry.entry_id)
+    if coordinators is not None:
+        _LOGGER.debug("Applying new options for %s", entry.title)
+        _apply_options(coordinators, entry.options)
 
-    # hass.services.register(DOMAIN, SERVICE_SET_SLEEP_NUMBER, handle_set_sleep_number)
 
-    # hass.services.register(
-    #     DOMAIN,
-    #     SERVICE_SET_FAVORITE,
-    #     handle_set_favorite_sleep_number,
-    #     schema=SERVICE_SET_NUMBER_SCHEMA,
-    # )
+def _service_targets(hass: HomeAssistant, bed_ids: Optional[List[str]]):
+    """Return the beds a service call targets with their controls tier.
 
-    return True
+    Without bed ids every bed of every account is targeted. Unknown bed ids
+    fail the call before anything is sent.
+    """
+    targets = []
+    for coordinators in hass.data.get(DOMAIN, {}).values():
+        for bed_id in coordinators[TIER_STATUS].data or {}:
+            if bed_ids is None or bed_id in bed_ids:
+                targets.append((bed_id, coordinators[TIER_CONTROLS]))
+    unknown = set(bed_ids or []) - {bed_id for bed_id, _ in targets}
+    if unknown:
+        raise HomeAssistantError(f"Unknown SleepIQ bed: {', '.join(sorted(unknown))}")
+    if not targets:
+        raise HomeAssistantError("No SleepIQ beds to adjust")
+    return targets
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -122,64 +401,101 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     )
     username = entry.title
     if unload_ok:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinators = hass.data[DOMAIN].pop(entry.entry_id)
+        for coordinator in coordinators.values():
+            coordinator.cancel_commands()
+            coordinator.engine.async_cancel(coordinator)
+        await coordinators[TIER_STATUS].session.async_close()
+        if not hass.data[DOMAIN]:
+            # The last account is gone; a new one starts with fresh ones.
+            hass.data.pop(DATA_ENGINE, None)
+            hass.data.pop(DATA_SCHEDULER, None)
         _LOGGER.debug("Unloaded entry for %s", username)
 
     return unload_ok
 
 
-class SleepIQDataUpdateCoordinator(DataUpdateCoordinator):
-    """Class to manage fetching SleepIQ data."""
-
-    def __init__(self, hass: HomeAssistant, config_entry: ConfigEntry):
-        """Initialize global SleepIQ data updater."""
-
-        config = config_entry.data
-        username = config["username"]
-        password = config["password"]
-        websession = async_get_clientsession(hass)
-        self.sleepiq = SleepIQ(username, password, websession)
-
-        super().__init__(
-            hass,
-            _LOGGER,
-            name=DOMAIN,
-            update_interval=SCAN_INTERVAL,
-        )
-
-    def update_listeners(self) -> None:
-        """Call update on all listeners."""
-        for update_callback in self._listeners:
-            update_callback()
-
-    async def _async_update_data(self) -> Bed:
-        """Fetch data from API endpoint."""
-        try:
-            _LOGGER.debug("Fetching data")
-            await self.sleepiq.login()
-            return await self.sleepiq.fetch_homeassistant_data()
-        except Exception as e:
-            message = "SleepIQ failed to login, double check your username and password"
-            _LOGGER.error(message)
-            _LOGGER.error(e)
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored snapshot and history cursors of a deleted entry."""
+    await SleepIQSnapshotStore(hass, entry.entry_id).async_remove()
+    await SleepIQHistoryImporter(hass, None, entry.entry_id).async_remove()
 
 
 class SleepIQDevice(CoordinatorEntity):
+    # Dotted Bed paths the entity's state and attributes are built from; a
+    # refresh that changes none of them does not write the entity's state.
+    coordinator_fields = None
+    # The (bed id, side) of the entity's view, for entities of one side.
+    _view_key = None
+
     def __init__(
         self,
+        bed_id: str,
         coordinator: SleepIQDataUpdateCoordinator,
+        *extra_coordinators: SleepIQDataUpdateCoordinator,
     ):
-        """Initialize the SleepIQ entity."""
+        """Initialize the SleepIQ entity for one bed.
+
+        The entity is available while its primary coordinator is, and also
+        refreshes when any extra tier it reads from updates.
+        """
+        self._bed_id = bed_id
         self._coordinator = coordinator
+        self._extra_coordinators = extra_coordinators
         super().__init__(coordinator)
 
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to the extra tiers as well."""
+        await super().async_added_to_hass()
+        for coordinator in self._extra_coordinators:
+            self.async_on_remove(
+                coordinator.async_add_listener(
+                    lambda coordinator=coordinator: self._handle_tier_update(
+                        coordinator
+                    )
+                )
+            )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the primary coordinator."""
+        self._handle_tier_update(self._coordinator)
+
+    @callback
+    def _handle_tier_update(self, coordinator: SleepIQDataUpdateCoordinator) -> None:
+        """Write state only if a field this entity reads has changed."""
+        if not coordinator.fields_changed(self._bed_id, self.coordinator_fields):
+            return
+        if coordinator.profiler is None:
+            self.async_write_ha_state()
+            return
+        with coordinator.profiler.timer(self.entity_id):
+            self.async_write_ha_state()
+
+    @property
+    def assumed_state(self) -> bool:
+        """Return True while the state comes from the stored snapshot."""
+        return self._coordinator.stale
+
+    @property
+    def bed(self) -> Bed:
+        """Return the bed this entity belongs to."""
+        return self._coordinator.beds[self._bed_id]
+
+    @property
+    def view(self) -> SideView:
+        """Return the view of the side this entity belongs to."""
+        if self._view_key is None:
+            self._view_key = (self._bed_id, self._side)
+        return self._coordinator.views[self._view_key]
+
     @property
     def device_info(self) -> Dict[str, Any]:
         """Return device information about this Sleep IQ device."""
         return {
-            "identifiers": {(DOMAIN, "sleepiq-device")},
-            "name": DEVICE_NAME,
+            "identifiers": {(DOMAIN, self._bed_id)},
+            "name": self.bed.name or DEVICE_NAME,
             "manufacturer": DEVICE_MANUFACTURER,
-            "model": self._coordinator.data.model,
+            "model": self.bed.model,
             "sw_version": DEVICE_SW_VERSION,
         }
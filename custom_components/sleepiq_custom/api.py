@@ -0,0 +1,631 @@
+"""Client for the SleepIQ cloud API."""
+import asyncio
+from dataclasses import replace
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from aiohttp import ClientError, ClientSession
+
+from .const import (
+    API_URL,
+    CONTROL_RESOURCES,
+    FETCH_CONCURRENCY,
+    LEFT,
+    LIGHT_NAMES,
+    PRIORITY_POLL,
+    RATE_LIMIT_PAUSE,
+    SESSION_REFRESH_MARGIN,
+    SESSION_TTL,
+    TIER_CONTROLS,
+    TIER_PROFILE,
+    TIER_STATUS,
+)
+from .metrics import SleepIQMetrics
+from .models import (
+    Bed,
+    BedSnapshot,
+    FootWarming,
+    Foundation,
+    Light,
+    PrivacyMode,
+    ResponsiveAir,
+    Sleeper,
+    updated,
+)
+from .ratelimit import SleepIQRequestScheduler, current_priority
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SleepIQError(Exception):
+    """Base error for SleepIQ API failures."""
+
+
+class SleepIQAuthError(SleepIQError):
+    """Error to indicate the credentials were rejected."""
+
+
+class SleepIQRateLimitError(SleepIQError):
+    """Error to indicate SleepIQ is throttling us."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        """Initialize the error with the Retry-After delay, if any."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SleepIQNetworkError(SleepIQError):
+    """Error to indicate SleepIQ could not be reached."""
+
+
+class SleepIQParseError(SleepIQError):
+    """Error to indicate SleepIQ returned something we could not read."""
+
+
+class SleepIQResponseError(SleepIQError):
+    """Error to indicate SleepIQ answered with an unexpected status."""
+
+    def __init__(self, message: str, status: int):
+        """Initialize the error with the HTTP status."""
+        super().__init__(message)
+        self.status = status
+
+
+ERROR_AUTH = "auth"
+ERROR_NETWORK = "network"
+ERROR_PARSE = "parse"
+ERROR_RATE_LIMIT = "rate_limit"
+ERROR_UNKNOWN = "unknown"
+
+
+def classify_error(err: Exception) -> str:
+    """Return the failure class of an exception raised while polling."""
+    if isinstance(err, SleepIQAuthError):
+        return ERROR_AUTH
+    if isinstance(err, SleepIQRateLimitError):
+        return ERROR_RATE_LIMIT
+    if isinstance(err, SleepIQNetworkError):
+        return ERROR_NETWORK
+    if isinstance(err, SleepIQResponseError):
+        return ERROR_NETWORK if err.status >= 500 else ERROR_UNKNOWN
+    if isinstance(err, (SleepIQParseError, KeyError, TypeError, ValueError)):
+        return ERROR_PARSE
+    return ERROR_UNKNOWN
+
+
+def _retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Return the Retry-After delay in seconds, if the header has one."""
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class SleepIQSession:
+    """Cache the SleepIQ login and reuse it across requests.
+
+    The login key and cookies are kept until shortly before they expire or
+    until the API rejects them, at which point exactly one caller logs in
+    again while the others wait for it. With a scheduler, every request
+    waits for its turn first and a 429 pauses the account.
+    """
+
+    def __init__(
+        self,
+        username: str,
+        password: str,
+        websession: ClientSession,
+        base_url: str = API_URL,
+        scheduler: Optional[SleepIQRequestScheduler] = None,
+    ):
+        """Initialize the session."""
+        self.scheduler = scheduler
+        self._username = username
+        self._password = password
+        self._websession = websession
+        self._base_url = base_url
+        # Set to a SleepIQRecorder to capture the traffic of this session.
+        self.recorder = None
+        self._key: Optional[str] = None
+        self._expires: float = 0
+        self._lock = asyncio.Lock()
+        # Per GET path and params: the digest of the last body, what it
+        # parsed to and how long parsing took.
+        self._fingerprints: Dict[Tuple, Tuple[bytes, Any, float]] = {}
+        self.metrics = SleepIQMetrics()
+
+    @property
+    def login_count(self) -> int:
+        """Return how many times the session has logged in."""
+        return self.metrics.login_count
+
+    @property
+    def requests_per_hour(self) -> int:
+        """Return how many requests were made in the last hour."""
+        return self.metrics.requests_per_hour
+
+    @property
+    def is_valid(self) -> bool:
+        """Return True if the cached login can still be used."""
+        return self._key is not None and time.monotonic() < (
+            self._expires - SESSION_REFRESH_MARGIN.total_seconds()
+        )
+
+    async def async_close(self) -> None:
+        """Close the web session the requests go through."""
+        await self._websession.close()
+
+    def invalidate(self) -> None:
+        """Forget the cached login."""
+        self._key = None
+        self._expires = 0
+
+    async def async_login(self, stale_key: Optional[str] = None) -> None:
+        """Log in unless a valid login is already cached.
+
+        Passing the key a request was rejected with forces a new login, unless
+        another caller already replaced it while we waited for the lock.
+        """
+        async with self._lock:
+            if self.is_valid and (stale_key is None or self._key != stale_key):
+                return
+            _LOGGER.debug("Logging in to SleepIQ as %s", self._username)
+            self.metrics.login_count += 1
+            self.metrics.count_request()
+            with self.metrics.timer("login"):
+                status, headers, body = await self._async_send(
+                    "put",
+                    self._base_url + "/login",
+                    json={"login": self._username, "password": self._password},
+                )
+            if status in (401, 403):
+                self.invalidate()
+                raise SleepIQAuthError("SleepIQ rejected the username or password")
+            self._check_status(status, headers)
+            try:
+                self._key = json.loads(body)["key"]
+            except (ValueError, KeyError) as err:
+                raise SleepIQParseError("SleepIQ login returned no key") from err
+            self._expires = time.monotonic() + SESSION_TTL.total_seconds()
+
+    async def async_request(
+        self, method: str, path: str, bed_id: Optional[str] = None, **kwargs
+    ) -> Any:
+        """Make an authenticated request, logging in again once if rejected."""
+        params = kwargs.pop("params", None) or {}
+        await self.async_login()
+        for attempt in range(2):
+            key = self._key
+            self.metrics.count_request(bed_id)
+            status, headers, body = await self._async_send(
+                method, self._base_url + path, params={**params, "_k": key}, **kwargs
+            )
+            if status == 401 and attempt == 0:
+                _LOGGER.debug("SleepIQ session expired, logging in again")
+                self.metrics.retry_count += 1
+                await self.async_login(stale_key=key)
+                continue
+            if status in (401, 403):
+                self.invalidate()
+                raise SleepIQAuthError("SleepIQ rejected the session")
+            self._check_status(status, headers)
+            return self._parse(method, path, params, body)
+        return None
+
+    def _parse(
+        self, method: str, path: str, params: Mapping[str, Any], body: bytes
+    ) -> Any:
+        """Parse a response body, reusing the last result if it is unchanged.
+
+        GET bodies are fingerprinted, and a body identical to the previous
+        one for the same request returns the very object parsed then. Callers
+        must treat what they get back as read-only.
+        """
+        if not body:
+            return None
+        if method.lower() != "get":
+            return self._loads(path, body)
+        key = (path, tuple(sorted(params.items())))
+        digest = hashlib.blake2b(body, digest_size=16).digest()
+        cached = self._fingerprints.get(key)
+        if cached is not None and cached[0] == digest:
+            self.metrics.record_saved(cached[2])
+            return cached[1]
+        start = time.perf_counter()
+        parsed = self._loads(path, body)
+        self._fingerprints[key] = (digest, parsed, time.perf_counter() - start)
+        return parsed
+
+    @staticmethod
+    def _loads(path: str, body: bytes) -> Any:
+        """Decode a JSON response body."""
+        try:
+            return json.loads(body)
+        except ValueError as err:
+            raise SleepIQParseError(f"SleepIQ returned invalid JSON for {path}") from err
+
+    async def _async_send(
+        self, method: str, url: str, **kwargs
+    ) -> Tuple[int, Mapping[str, str], bytes]:
+        """Send one HTTP request and return its status, headers and body."""
+        if self.scheduler is not None:
+            await self._async_wait_turn()
+        try:
+            async with self._websession.request(method, url, **kwargs) as response:
+                body = await response.read()
+                status, headers = response.status, response.headers
+        except (ClientError, asyncio.TimeoutError) as err:
+            raise SleepIQNetworkError(f"Error talking to SleepIQ: {err}") from err
+        self.metrics.bytes_received += len(body)
+        if status == 429 and self.scheduler is not None:
+            self.scheduler.pause(
+                self._username,
+                _retry_after(headers) or RATE_LIMIT_PAUSE.total_seconds(),
+            )
+        if self.recorder is not None:
+            self.recorder.record(
+                method, url[len(self._base_url) :], kwargs, status, headers, body
+            )
+        return status, headers, body
+
+    async def _async_wait_turn(self) -> None:
+        """Wait until the scheduler lets the next request of the account go.
+
+        Polls of a throttled account fail straight away so the tier backs
+        off; commands wait for the pause to end.
+        """
+        priority = current_priority()
+        paused = self.scheduler.paused_for(self._username)
+        if paused > 0 and priority == PRIORITY_POLL:
+            raise SleepIQRateLimitError("SleepIQ is throttling this account", paused)
+        self.metrics.record_wait(
+            await self.scheduler.acquire(self._username, priority)
+        )
+
+    @staticmethod
+    def _check_status(status: int, headers: Mapping[str, str]) -> None:
+        """Raise the matching error for a failed response."""
+        if status == 429:
+            raise SleepIQRateLimitError(
+                "SleepIQ is rate limiting requests", _retry_after(headers)
+            )
+        if status >= 400:
+            raise SleepIQResponseError(f"SleepIQ answered with HTTP {status}", status)
+
+
+class SleepIQClient:
+    """Fetch bed data and send commands through a shared session.
+
+    Account-wide endpoints (beds, sleepers, family status) are fetched once
+    per refresh and fanned out to every bed on the account. Every change is
+    published as a new BedSnapshot in ``beds``; the beds in it are never
+    changed in place.
+    """
+
+    def __init__(self, session: SleepIQSession, concurrency: int = FETCH_CONCURRENCY):
+        """Initialize the client."""
+        self.session = session
+        self.metrics = session.metrics
+        # The beds as SleepIQ last reported them, replaced on every change.
+        self.beds = BedSnapshot()
+        self.concurrency = concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        # The last sleeper payloads and the sleepers built from them.
+        self._sleeper_payloads: Optional[List[Dict[str, Any]]] = None
+        self._sleepers: Dict[str, Sleeper] = {}
+        # Per (bed id, resource): the last payload, the model built from it
+        # and how long building it took.
+        self._resources: Dict[Tuple[str, str], Tuple[Any, Any, float]] = {}
+
+    def set_concurrency(self, concurrency: int) -> None:
+        """Change how many control resources are fetched at a time.
+
+        Fetches already running finish under the old limit.
+        """
+        if concurrency != self.concurrency:
+            self.concurrency = concurrency
+            self._semaphore = None
+
+    async def get_beds(self) -> List[Dict[str, Any]]:
+        """Return every bed on the account."""
+        return (await self.session.async_request("get", "/bed"))["beds"]
+
+    async def get_family_status(self) -> Dict[str, Dict[str, Any]]:
+        """Return occupancy and sleep numbers keyed by bed id."""
+        payload = await self.session.async_request("get", "/bed/familyStatus")
+        return {status["bedId"]: status for status in payload["beds"]}
+
+    async def get_sleepers(self) -> List[Dict[str, Any]]:
+        """Return the sleeper profiles on the account."""
+        return (await self.session.async_request("get", "/sleeper"))["sleepers"]
+
+    async def get_sleep_data(
+        self, sleeper_id: str, date: str, interval: str = "M1"
+    ) -> Dict[str, Any]:
+        """Return the nights of a sleeper in the interval starting at date."""
+        return await self.session.async_request(
+            "get",
+            "/sleepData",
+            params={"date": date, "interval": interval, "sleeper": sleeper_id},
+        )
+
+    async def get_foundation(self, bed_id: str) -> Optional[Dict[str, Any]]:
+        """Return the foundation status, or None without a foundation."""
+        return await self._get_optional(bed_id, f"/bed/{bed_id}/foundation/status")
+
+    async def get_outlet(self, bed_id: str, outlet_id: int) -> Optional[Dict[str, Any]]:
+        """Return one foundation outlet, or None if it does not exist."""
+        return await self._get_optional(
+            bed_id, f"/bed/{bed_id}/foundation/outlet", params={"outletId": outlet_id}
+        )
+
+    async def get_responsive_air(self, bed_id: str) -> Optional[Dict[str, Any]]:
+        """Return responsive air settings."""
+        return await self._get_optional(bed_id, f"/bed/{bed_id}/responsiveAir")
+
+    async def get_foot_warming(self, bed_id: str) -> Optional[Dict[str, Any]]:
+        """Return foot warming status."""
+        return await self._get_optional(
+            bed_id, f"/bed/{bed_id}/foundation/footwarming"
+        )
+
+    async def get_privacy_mode(self, bed_id: str) -> Optional[Dict[str, Any]]:
+        """Return privacy mode."""
+        return await self._get_optional(bed_id, f"/bed/{bed_id}/pauseMode")
+
+    async def _get_optional(
+        self, bed_id: str, path: str, **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        """GET a resource the bed may not support."""
+        try:
+            return await self.session.async_request(
+                "get", path, bed_id=bed_id, **kwargs
+            )
+        except SleepIQResponseError as err:
+            if err.status == 404:
+                return None
+            raise
+
+    async def fetch_profile(self) -> BedSnapshot:
+        """Fetch the bed registrations and sleeper profiles."""
+        with self.metrics.timer("fetch_bed_sleeper"):
+            bed_payloads, sleeper_payloads = await asyncio.gather(
+                self.get_beds(), self.get_sleepers()
+            )
+
+        with self.metrics.timer("parse"):
+            if sleeper_payloads is not self._sleeper_payloads:
+                sleepers = {}
+                for payload in sleeper_payloads:
+                    sleeper = Sleeper.from_json(payload)
+                    # An unchanged profile keeps the object built last time.
+                    last = self._sleepers.get(sleeper.sleeperId)
+                    sleepers[sleeper.sleeperId] = last if last == sleeper else sleeper
+                self._sleeper_payloads = sleeper_payloads
+                self._sleepers = sleepers
+            beds = {}
+            for bed_payload in bed_payloads:
+                bed = self.beds.get(bed_payload["bedId"])
+                if bed is None:
+                    bed = Bed.from_json(bed_payload)
+                else:
+                    bed = updated(bed, bed_payload)
+                for name, sleeper_id in (
+                    ("left_side", bed.sleeperLeftId),
+                    ("right_side", bed.sleeperRightId),
+                ):
+                    side = getattr(bed, name)
+                    sleeper = self._sleepers.get(sleeper_id) or Sleeper()
+                    if side.sleeper != sleeper:
+                        bed = replace(bed, **{name: replace(side, sleeper=sleeper)})
+                beds[bed.bedId] = bed
+            self.beds = self.beds.with_beds(beds, replace_all=True)
+        return self.beds
+
+    async def fetch_status(self) -> BedSnapshot:
+        """Fetch occupancy and sleep numbers for every bed in one request."""
+        with self.metrics.timer("fetch_family_status"):
+            statuses = await self.get_family_status()
+        with self.metrics.timer("parse"):
+            beds = {}
+            for bed_id, bed in self.beds.items():
+                status = statuses.get(bed_id)
+                if status is None:
+                    continue
+                value = status.get("status", bed.status)
+                left_side = updated(bed.left_side, status.get("leftSide"))
+                right_side = updated(bed.right_side, status.get("rightSide"))
+                if (
+                    value != bed.status
+                    or left_side is not bed.left_side
+                    or right_side is not bed.right_side
+                ):
+                    beds[bed_id] = replace(
+                        bed, status=value, left_side=left_side, right_side=right_side
+                    )
+            self.beds = self.beds.with_beds(beds)
+        return self.beds
+
+    async def fetch_resource(self, bed_id: str, resource: str) -> Bed:
+        """Refresh a single control resource of one bed from its own endpoint."""
+        model = await self._fetch_model(bed_id, resource)
+        self._publish_resources({(bed_id, resource): model})
+        return self.beds[bed_id]
+
+    async def _fetch_model(self, bed_id: str, resource: str) -> Any:
+        """Fetch a control resource and return its model, without publishing it."""
+        bed = self.beds[bed_id]
+        with self.metrics.timer(f"fetch_{resource}"):
+            payload = await self._get_resource(bed_id, resource)
+        with self.metrics.timer("parse"):
+            current = getattr(self.beds.get(bed_id, bed), resource)
+            last = self._resources.get((bed_id, resource))
+            if last is not None and last[0] is payload and current is last[1]:
+                # The session handed back last poll's payload, and the bed
+                # still holds what was built from it.
+                self.metrics.record_saved(last[2])
+                return current
+            start = time.perf_counter()
+            model = self._build_resource(resource, payload, current)
+            self._resources[(bed_id, resource)] = (
+                payload,
+                model,
+                time.perf_counter() - start,
+            )
+        return model
+
+    def _publish_resources(self, models: Dict[Tuple[str, str], Any]) -> None:
+        """Replace the beds whose control resources changed, in one snapshot."""
+        changes: Dict[str, Dict[str, Any]] = {}
+        for (bed_id, resource), model in models.items():
+            bed = self.beds.get(bed_id)
+            if bed is not None and getattr(bed, resource) is not model:
+                changes.setdefault(bed_id, {})[resource] = model
+        self.beds = self.beds.with_beds(
+            {
+                bed_id: replace(self.beds[bed_id], **values)
+                for bed_id, values in changes.items()
+            }
+        )
+
+    async def _get_resource(
+        self, bed_id: str, resource: str
+    ) -> Optional[Dict[str, Any]]:
+        """Return the payload of a control resource."""
+        if resource.startswith("light"):
+            return await self.get_outlet(bed_id, int(resource[len("light") :]))
+        if resource == "foundation":
+            return await self.get_foundation(bed_id)
+        if resource == "responsive_air":
+            return await self.get_responsive_air(bed_id)
+        if resource == "foot_warming":
+            return await self.get_foot_warming(bed_id)
+        if resource == "privacy_mode":
+            return await self.get_privacy_mode(bed_id)
+        raise ValueError(f"Unknown SleepIQ resource: {resource}")
+
+    @staticmethod
+    def _build_resource(
+        resource: str, payload: Optional[Dict[str, Any]], current: Any
+    ) -> Any:
+        """Build the model for a control resource payload."""
+        if resource.startswith("light"):
+            if payload is None:
+                return None
+            model = Light.from_json(payload)
+            model.name = LIGHT_NAMES[int(resource[len("light") :])]
+        elif resource == "foundation":
+            if not payload:
+                return None
+            model = Foundation.from_json(payload)
+        elif payload is None:
+            return current
+        else:
+            model = {
+                "responsive_air": ResponsiveAir,
+                "foot_warming": FootWarming,
+                "privacy_mode": PrivacyMode,
+            }[resource].from_json(payload)
+        # An unchanged resource keeps the object the bed already has.
+        return current if model == current else model
+
+    async def _fetch_model_bounded(self, bed_id: str, resource: str) -> Any:
+        """Fetch a control resource once a concurrency slot is free."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            return await self._fetch_model(bed_id, resource)
+
+    async def fetch_controls(self) -> BedSnapshot:
+        """Fetch the foundation, outlets, responsive air, foot warming and privacy mode.
+
+        The resources of every bed are fetched concurrently, at most
+        ``concurrency`` at a time, and published together in one snapshot.
+        A resource that fails keeps its last good value; the poll only fails
+        if every resource did, or if the session was rejected.
+        """
+        jobs = [
+            (bed_id, resource) for bed_id in self.beds for resource in CONTROL_RESOURCES
+        ]
+        results = await asyncio.gather(
+            *(
+                self._fetch_model_bounded(bed_id, resource)
+                for bed_id, resource in jobs
+            ),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        for error in errors:
+            if not isinstance(error, Exception) or isinstance(error, SleepIQAuthError):
+                raise error
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        models = {}
+        for (bed_id, resource), result in zip(jobs, results):
+            if isinstance(result, Exception):
+                self.metrics.count_error("partial")
+                _LOGGER.debug(
+                    "Keeping the last %s of bed %s: %s", resource, bed_id, result
+                )
+            else:
+                models[(bed_id, resource)] = result
+        self._publish_resources(models)
+        return self.beds
+
+    async def fetch_tier(self, tier: str) -> BedSnapshot:
+        """Fetch the resources belonging to one polling tier."""
+        if tier == TIER_PROFILE or not self.beds:
+            await self.fetch_profile()
+        if tier == TIER_STATUS:
+            return await self.fetch_status()
+        if tier == TIER_CONTROLS:
+            return await self.fetch_controls()
+        return self.beds
+
+    async def set_outlet(self, bed_id: str, outlet_id: int, setting: int) -> None:
+        """Switch a foundation outlet on (1) or off (0)."""
+        await self.session.async_request(
+            "put",
+            f"/bed/{bed_id}/foundation/outlet",
+            bed_id=bed_id,
+            json={"outletId": outlet_id, "setting": setting},
+        )
+
+    async def set_privacy_mode(self, bed_id: str, mode: str) -> None:
+        """Set privacy mode to "on" or "off"."""
+        await self.session.async_request(
+            "put", f"/bed/{bed_id}/pauseMode", bed_id=bed_id, params={"mode": mode}
+        )
+
+    async def set_responsive_air(self, bed_id: str, sides: Dict[str, bool]) -> None:
+        """Enable or disable responsive air for one or both sides in one request."""
+        payload = {
+            ("leftSideEnabled" if side.lower() == LEFT else "rightSideEnabled"): enabled
+            for side, enabled in sides.items()
+        }
+        await self.session.async_request(
+            "patch", f"/bed/{bed_id}/responsiveAir", bed_id=bed_id, json=payload
+        )
+
+    async def set_sleepnumber(self, bed_id: str, side: str, number: int) -> None:
+        """Set the sleep number for one side."""
+        await self.session.async_request(
+            "put",
+            f"/bed/{bed_id}/sleepNumber",
+            bed_id=bed_id,
+            json={"bed": bed_id, "side": side[0].upper(), "sleepNumber": number},
+        )
+
+    async def set_favorite_sleepnumber(
+        self, bed_id: str, side: str, number: int
+    ) -> None:
+        """Set the favorite sleep number for one side."""
+        await self.session.async_request(
+            "put",
+            f"/bed/{bed_id}/sleepNumberFavorite",
+            bed_id=bed_id,
+            json={"bed": bed_id, "side": side[0].upper(), "sleepNumberFavorite": number},
+        )
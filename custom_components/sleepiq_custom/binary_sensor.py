@@ -9,45 +9,63 @@ from homeassistant.components.binary_sensor import (
 from homeassistant.const import ATTR_ATTRIBUTION
 
 from . import SleepIQDataUpdateCoordinator, SleepIQDevice
-from .const import ATTRIBUTION_TEXT, DOMAIN, ICON, IS_IN_BED, LEFT, RIGHT
+from .const import (
+    ATTRIBUTION_TEXT,
+    DOMAIN,
+    ICON,
+    IS_IN_BED,
+    LEFT,
+    RIGHT,
+    TIER_PROFILE,
+    TIER_STATUS,
+)
 
 
 async def async_setup_entry(
     hass, config_entry: config_entries.ConfigEntry, async_add_entities
 ):
-    coordinator: SleepIQDataUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    coordinators = hass.data[DOMAIN][config_entry.entry_id]
+    status = coordinators[TIER_STATUS]
+    profile = coordinators[TIER_PROFILE]
 
     """Set up the binary sensors"""
     binary_sensors = []
-    binary_sensors.append(IsInBedBinarySensor(LEFT, coordinator))
-    binary_sensors.append(IsInBedBinarySensor(RIGHT, coordinator))
-    binary_sensors.append(SleepNumberConnectivityBinarySensor(coordinator))
+    for bed_id in status.data:
+        binary_sensors.append(IsInBedBinarySensor(bed_id, LEFT, status, profile))
+        binary_sensors.append(IsInBedBinarySensor(bed_id, RIGHT, status, profile))
+        binary_sensors.append(SleepNumberConnectivityBinarySensor(bed_id, status))
     async_add_entities(binary_sensors)
 
 
 class IsInBedBinarySensor(SleepIQDevice, BinarySensorEntity):
     """Implementation of a SleepIQ presence sensor."""
 
-    def __init__(self, side, coordinator: SleepIQDataUpdateCoordinator):
+    def __init__(
+        self,
+        bed_id: str,
+        side,
+        coordinator: SleepIQDataUpdateCoordinator,
+        profile_coordinator: SleepIQDataUpdateCoordinator,
+    ):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(bed_id, coordinator, profile_coordinator)
         self._coordinator = coordinator
         self._side = side
+        self.coordinator_fields = [
+            f"{side}_side.occupied",
+            f"{side}_side.occupied_changed",
+            f"{side}_side.sleeper.firstName",
+        ]
         self._unique_id = (
-            DOMAIN + "_" + self._coordinator.data.bedId + "_" + self._side + "is_in_bed"
+            DOMAIN + "_" + self.bed.bedId + "_" + self._side + "is_in_bed"
         )
 
     @property
     def name(self):
         """ Name """
-        if self._side is LEFT:
-            if self._coordinator.data.left_side.sleeper.firstName is None:
-                return self._side + " side " + IS_IN_BED
-            return self._coordinator.data.left_side.sleeper.firstName + " " + IS_IN_BED
-        else:
-            if self._coordinator.data.right_side.sleeper.firstName is None:
-                return self._side + " side " + IS_IN_BED
-            return self._coordinator.data.right_side.sleeper.firstName + " " + IS_IN_BED
+        if self.view.sleeper is None:
+            return self._side + " side " + IS_IN_BED
+        return self.view.sleeper + " " + IS_IN_BED
 
     @property
     def unique_id(self):
@@ -56,11 +74,8 @@ class IsInBedBinarySensor(SleepIQDevice, BinarySensorEntity):
 
     @property
     def is_on(self):
-        """Return the status of the sensor."""
-        if self._side is LEFT:
-            return self._coordinator.data.left_side.isInBed
-        else:
-            return self._coordinator.data.right_side.isInBed
+        """Return the filtered status of the sensor."""
+        return self.view.occupied
 
     @property
     def device_class(self):
@@ -74,79 +89,25 @@ class IsInBedBinarySensor(SleepIQDevice, BinarySensorEntity):
 
     @property
     def device_state_attributes(self):
-        """Return the state attributes of the device."""
-        if self._side is LEFT:
-            thisdict = {
-                "bedId": self._coordinator.data.left_side.sleeper.bedId,
-                "firstName": self._coordinator.data.left_side.sleeper.firstName,
-                "active": self._coordinator.data.left_side.sleeper.active,
-                "emailValidated": self._coordinator.data.left_side.sleeper.emailValidated,
-                "gender": self._coordinator.data.left_side.sleeper.gender,
-                "isChild": self._coordinator.data.left_side.sleeper.isChild,
-                "birthYear": self._coordinator.data.left_side.sleeper.birthYear,
-                "zipCode": self._coordinator.data.left_side.sleeper.zipCode,
-                "timezone": self._coordinator.data.left_side.sleeper.timezone,
-                "privacyPolicyVersion": self._coordinator.data.left_side.sleeper.privacyPolicyVersion,
-                "duration": self._coordinator.data.left_side.sleeper.duration,
-                "weight": self._coordinator.data.left_side.sleeper.weight,
-                "sleeperId": self._coordinator.data.left_side.sleeper.sleeperId,
-                "firstSessionRecorded": self._coordinator.data.left_side.sleeper.firstSessionRecorded,
-                "height": self._coordinator.data.left_side.sleeper.height,
-                "licenseVersion": self._coordinator.data.left_side.sleeper.licenseVersion,
-                "username": self._coordinator.data.left_side.sleeper.username,
-                "birthMonth": self._coordinator.data.left_side.sleeper.birthMonth,
-                "sleepGoal": self._coordinator.data.left_side.sleeper.sleepGoal,
-                "accountId": self._coordinator.data.left_side.sleeper.accountId,
-                "isAccountOwner": self._coordinator.data.left_side.sleeper.isAccountOwner,
-                "email": self._coordinator.data.left_side.sleeper.email,
-                "lastLogin": self._coordinator.data.left_side.sleeper.lastLogin,
-                "side": self._coordinator.data.left_side.sleeper.side,
-                "favorite": self._coordinator.data.left_side.sleeper.favorite,
-                ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
-            }
-        else:
-            thisdict = {
-                "bedId": self._coordinator.data.right_side.sleeper.bedId,
-                "firstName": self._coordinator.data.right_side.sleeper.firstName,
-                "active": self._coordinator.data.right_side.sleeper.active,
-                "emailValidated": self._coordinator.data.right_side.sleeper.emailValidated,
-                "gender": self._coordinator.data.right_side.sleeper.gender,
-                "isChild": self._coordinator.data.right_side.sleeper.isChild,
-                "birthYear": self._coordinator.data.right_side.sleeper.birthYear,
-                "zipCode": self._coordinator.data.right_side.sleeper.zipCode,
-                "timezone": self._coordinator.data.right_side.sleeper.timezone,
-                "privacyPolicyVersion": self._coordinator.data.right_side.sleeper.privacyPolicyVersion,
-                "duration": self._coordinator.data.right_side.sleeper.duration,
-                "weight": self._coordinator.data.right_side.sleeper.weight,
-                "sleeperId": self._coordinator.data.right_side.sleeper.sleeperId,
-                "firstSessionRecorded": self._coordinator.data.right_side.sleeper.firstSessionRecorded,
-                "height": self._coordinator.data.right_side.sleeper.height,
-                "licenseVersion": self._coordinator.data.right_side.sleeper.licenseVersion,
-                "username": self._coordinator.data.right_side.sleeper.username,
-                "birthMonth": self._coordinator.data.right_side.sleeper.birthMonth,
-                "sleepGoal": self._coordinator.data.right_side.sleeper.sleepGoal,
-                "accountId": self._coordinator.data.right_side.sleeper.accountId,
-                "isAccountOwner": self._coordinator.data.right_side.sleeper.isAccountOwner,
-                "email": self._coordinator.data.right_side.sleeper.email,
-                "lastLogin": self._coordinator.data.right_side.sleeper.lastLogin,
-                "side": self._coordinator.data.right_side.sleeper.side,
-                "favorite": self._coordinator.data.right_side.sleeper.favorite,
-                ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
-            }
-
-        return thisdict
+        """Return the state attributes of the device.
+
+        The sleeper profile lives on the profile sensor, so occupancy changes
+        don't write it to the recorder every time.
+        """
+        return self.view.presence_attributes
 
 
 class SleepNumberConnectivityBinarySensor(SleepIQDevice, BinarySensorEntity):
     """Implementation of a SleepIQ presence sensor."""
 
-    def __init__(self, coordinator):
+    def __init__(self, bed_id: str, coordinator):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(bed_id, coordinator)
         self._coordinator = coordinator
         self._name = "Sleep Number online sensor"
+        self.coordinator_fields = ["status", "registrationDate", "bedId", "macAddress"]
         self._unique_id = (
-            DOMAIN + "_" + self._coordinator.data.bedId + "_connectivity_binary_sensor"
+            DOMAIN + "_" + self.bed.bedId + "_connectivity_binary_sensor"
         )
 
     @property
@@ -162,7 +123,7 @@ class SleepNumberConnectivityBinarySensor(SleepIQDevice, BinarySensorEntity):
     @property
     def is_on(self):
         """Return the status of the sensor."""
-        return self._coordinator.data.status
+        return self.bed.status
 
     @property
     def device_class(self):
@@ -173,8 +134,8 @@ class SleepNumberConnectivityBinarySensor(SleepIQDevice, BinarySensorEntity):
     def device_state_attributes(self):
         """Return the state attributes of the device."""
         return {
-            "registrationDate": self._coordinator.data.registrationDate,
-            "bedId": self._coordinator.data.bedId,
-            "macAddress": self._coordinator.data.macAddress,
+            "registrationDate": self.bed.registrationDate,
+            "bedId": self.bed.bedId,
+            "macAddress": self.bed.macAddress,
             ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
         }
@@ -0,0 +1,171 @@
+"""Coalescing command queue for SleepIQ beds."""
+import asyncio
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple
+
+from .api import SleepIQClient
+from .const import (
+    COMMAND_DEBOUNCE,
+    COMMAND_FAVORITE,
+    COMMAND_OUTLET,
+    COMMAND_PRIVACY_MODE,
+    COMMAND_RESPONSIVE_AIR,
+    COMMAND_SLEEP_NUMBER,
+    COMMAND_SPACING,
+    LEFT,
+    PRIORITY_COMMAND,
+    RIGHT,
+)
+from .ratelimit import request_priority
+
+_LOGGER = logging.getLogger(__name__)
+
+Target = Tuple[str, Any]
+
+# The result of a command that a newer one for the same target replaced
+# before it was sent.
+SUPERSEDED = "superseded"
+
+
+class SleepIQCommandQueue:
+    """Send the commands for one bed in coalesced, rate-limited batches.
+
+    Commands are keyed by target, such as an outlet or one side's sleep
+    number. A newer command for a target that has not been sent yet
+    replaces the older one. When the surviving command lands its caller's
+    future resolves to None and the replaced callers' to SUPERSEDED, so
+    only the last caller follows up on it. Responsive air for both sides
+    goes out as one request. The queue waits a short debounce window for a
+    burst to finish and spaces the requests it sends.
+    """
+
+    def __init__(
+        self,
+        client: SleepIQClient,
+        bed_id: str,
+        debounce: timedelta = COMMAND_DEBOUNCE,
+        spacing: timedelta = COMMAND_SPACING,
+    ):
+        """Initialize the queue."""
+        self._client = client
+        self._bed_id = bed_id
+        self.debounce = debounce
+        self.spacing = spacing
+        self._pending: Dict[Target, Tuple[Any, List[asyncio.Future]]] = {}
+        # The futures of the batch being sent, with their results.
+        self._in_flight: List[Tuple[asyncio.Future, Any]] = []
+        self._worker = None
+        self._last_sent = 0.0
+        self.submitted_count = 0
+        self.sent_count = 0
+
+    def submit(self, kind: str, key: Any, value: Any) -> asyncio.Future:
+        """Queue a command and return a future for when it lands.
+
+        The future resolves to None, or to SUPERSEDED if a newer command for
+        the same target was sent in its place.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        target = (kind, key)
+        futures = []
+        if target in self._pending:
+            _LOGGER.debug(
+                "Superseding queued %s command for bed %s", target, self._bed_id
+            )
+            futures = self._pending.pop(target)[1]
+        futures.append(future)
+        self._pending[target] = (value, futures)
+        self.submitted_count += 1
+
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._async_run())
+        return future
+
+    def cancel(self) -> None:
+        """Drop queued commands and stop the worker.
+
+        The futures of queued commands and of a batch being sent are
+        cancelled, so no caller waits forever.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for _, futures in self._pending.values():
+            for future in futures:
+                future.cancel()
+        self._pending.clear()
+        for future, _ in self._in_flight:
+            future.cancel()
+        self._in_flight = []
+
+    async def _async_run(self) -> None:
+        """Send queued commands until the queue is empty."""
+        await asyncio.sleep(self.debounce.total_seconds())
+        while self._pending:
+            batch, self._in_flight = self._take_batch()
+            wait = self._last_sent + self.spacing.total_seconds() - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_sent = time.monotonic()
+            try:
+                await self._async_send(batch)
+            except Exception as err:  # pylint: disable=broad-except
+                for future, _ in self._in_flight:
+                    if not future.done():
+                        future.set_exception(err)
+                self._in_flight = []
+                continue
+            self.sent_count += 1
+            for future, result in self._in_flight:
+                if not future.done():
+                    future.set_result(result)
+            self._in_flight = []
+
+    def _take_batch(
+        self,
+    ) -> Tuple[Dict[Target, Any], List[Tuple[asyncio.Future, Any]]]:
+        """Pop the oldest command and any command it can share a request with.
+
+        Returns the batch and every caller's future with the result it gets
+        once the batch lands.
+        """
+        target = next(iter(self._pending))
+        targets = [target]
+        if target[0] == COMMAND_RESPONSIVE_AIR:
+            other = (COMMAND_RESPONSIVE_AIR, RIGHT if target[1] == LEFT else LEFT)
+            if other in self._pending:
+                targets.append(other)
+        batch = {}
+        futures = []
+        for target in targets:
+            batch[target], target_futures = self._pending.pop(target)
+            # Only the last caller's command is sent; the others were replaced.
+            futures.extend((future, SUPERSEDED) for future in target_futures[:-1])
+            futures.append((target_futures[-1], None))
+        return batch, futures
+
+    async def _async_send(self, batch: Dict[Target, Any]) -> None:
+        """Send one batch to the API, ahead of any queued polls."""
+        with request_priority(PRIORITY_COMMAND):
+            await self._async_send_batch(batch)
+
+    async def _async_send_batch(self, batch: Dict[Target, Any]) -> None:
+        """Send the request for one batch."""
+        (kind, key), value = next(iter(batch.items()))
+        if kind == COMMAND_RESPONSIVE_AIR:
+            await self._client.set_responsive_air(
+                self._bed_id, {side: enabled for (_, side), enabled in batch.items()}
+            )
+        elif kind == COMMAND_OUTLET:
+            await self._client.set_outlet(self._bed_id, key, value)
+        elif kind == COMMAND_PRIVACY_MODE:
+            await self._client.set_privacy_mode(self._bed_id, value)
+        elif kind == COMMAND_SLEEP_NUMBER:
+            await self._client.set_sleepnumber(self._bed_id, key, value)
+        elif kind == COMMAND_FAVORITE:
+            await self._client.set_favorite_sleepnumber(self._bed_id, key, value)
+        else:
+            raise ValueError(f"Unknown SleepIQ command: {kind}")
@@ -1,19 +1,71 @@
 """Config flow for SleepIQ Custom integration."""
+from datetime import timedelta
 import logging
 
 from aiohttp.client import ClientSession
-from sleepi.sleepiq import SleepIQ
 import voluptuous as vol
 
 from homeassistant import config_entries, core, exceptions
 from homeassistant.components import sleepiq
 
-from .const import DOMAIN  # pylint:disable=unused-import
+from .api import SleepIQAuthError, SleepIQError, SleepIQSession
+from .const import (  # pylint:disable=unused-import
+    COMMAND_DEBOUNCE,
+    CONF_COMMAND_DEBOUNCE,
+    CONF_CONCURRENCY,
+    CONF_ENTER_DELAY,
+    CONF_EXIT_DELAY,
+    CONF_MAX_INTERVAL,
+    CONF_MIN_INTERVAL,
+    CONF_NIGHT_START,
+    CONF_OPTIMISTIC_TIMEOUT,
+    CONF_TIER_INTERVALS,
+    DEFAULT_ENTER_DELAY,
+    DEFAULT_EXIT_DELAY,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DEFAULT_NIGHT_START,
+    DOMAIN,
+    FETCH_CONCURRENCY,
+    OPTIMISTIC_TIMEOUT,
+    TIER_CONTROLS,
+    TIER_INTERVALS,
+    TIER_PROFILE,
+    TIER_STATUS,
+)
 
 __LOGGER = logging.getLogger(__name__)
 
 STEP_USER_DATA_SCHEMA = vol.Schema({"username": str, "password": str})
 
+# Per option: its default and the range it may be set to. Durations are in
+# whole seconds, the debounce window in milliseconds.
+OPTIONS = {
+    CONF_TIER_INTERVALS[TIER_STATUS]: (TIER_INTERVALS[TIER_STATUS], 1, 300),
+    CONF_TIER_INTERVALS[TIER_CONTROLS]: (TIER_INTERVALS[TIER_CONTROLS], 5, 3600),
+    CONF_TIER_INTERVALS[TIER_PROFILE]: (TIER_INTERVALS[TIER_PROFILE], 60, 86400),
+    CONF_MIN_INTERVAL: (DEFAULT_MIN_INTERVAL, 1, 300),
+    CONF_MAX_INTERVAL: (DEFAULT_MAX_INTERVAL, 10, 3600),
+    CONF_CONCURRENCY: (FETCH_CONCURRENCY, 1, 16),
+    CONF_COMMAND_DEBOUNCE: (COMMAND_DEBOUNCE.total_seconds() * 1000, 0, 5000),
+    CONF_OPTIMISTIC_TIMEOUT: (OPTIMISTIC_TIMEOUT, 5, 300),
+    CONF_ENTER_DELAY: (DEFAULT_ENTER_DELAY, 0, 600),
+    CONF_EXIT_DELAY: (DEFAULT_EXIT_DELAY, 0, 600),
+    CONF_NIGHT_START: (DEFAULT_NIGHT_START, 0, 23),
+}
+
+
+def options_schema(options) -> vol.Schema:
+    """Return the options form, filled in with the current options."""
+    schema = {}
+    for key, (default, minimum, maximum) in OPTIONS.items():
+        if isinstance(default, timedelta):
+            default = default.total_seconds()
+        schema[vol.Optional(key, default=int(options.get(key, default)))] = vol.All(
+            vol.Coerce(int), vol.Range(min=minimum, max=maximum)
+        )
+    return vol.Schema(schema)
+
 
 async def validate_input(hass: core.HomeAssistant, data):
     """Validate the user input allows us to connect.
@@ -24,11 +76,15 @@ async def validate_input(hass: core.HomeAssistant, data):
     password = data["password"]
 
     async with ClientSession() as websession:
-        api = SleepIQ(username, password, websession)
-        login = await api.login()
+        session = SleepIQSession(username, password, websession)
+        try:
+            await session.async_login()
+        except SleepIQAuthError as err:
+            raise InvalidAuth(str(err)) from err
+        except SleepIQError as err:
+            raise CannotConnect(str(err)) from err
 
-    if login:
-        return {"title": username}
+    return {"title": username}
 
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -37,6 +93,12 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     VERSION = 1
     CONNECTION_CLASS = config_entries.CONN_CLASS_CLOUD_POLL
 
+    @staticmethod
+    @core.callback
+    def async_get_options_flow(config_entry):
+        """Return the options flow for an entry."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step."""
         if user_input is None:
@@ -71,6 +133,29 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         )
 
 
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Tune the polling and command settings of an entry while it runs."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry):
+        """Initialize the options flow."""
+        self.config_entry = config_entry
+
+    async def async_step_init(self, user_input=None):
+        """Show the settings and save them."""
+        errors = {}
+        if user_input is not None:
+            if user_input[CONF_MIN_INTERVAL] > user_input[CONF_MAX_INTERVAL]:
+                errors["base"] = "invalid_interval"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=options_schema(user_input or self.config_entry.options),
+            errors=errors,
+        )
+
+
 class CannotConnect(exceptions.HomeAssistantError):
     """Error to indicate we cannot connect."""
 
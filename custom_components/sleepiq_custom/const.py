@@ -3,15 +3,188 @@
 from datetime import timedelta
 
 
+API_URL = "https://prod-api.sleepiq.sleepnumber.com/rest"
 ATTRIBUTION_TEXT = "Data provided by SleepIQ"
 DEVICE_MANUFACTURER = "Sleep Number"
 DEVICE_NAME = "Smart Bed 360"
 DEVICE_SW_VERSION = "1.0"
+# The polling engine and request scheduler shared by every entry are kept in
+# hass.data beside the domain's entries, which map entry id to coordinators.
+DATA_ENGINE = "sleepiq_custom_engine"
+DATA_SCHEDULER = "sleepiq_custom_scheduler"
+DIAGNOSTIC_BYTES = "bytes"
+DIAGNOSTIC_ERRORS = "errors"
+DIAGNOSTIC_LAST_SUCCESS = "last_success"
+DIAGNOSTIC_LATENCY = "latency"
+DIAGNOSTIC_REQUESTS = "requests"
+# Diagnostic sensors move on every poll, so their state is written at most
+# this often unless the error count changes.
+DIAGNOSTIC_WRITE_INTERVAL = timedelta(minutes=5)
 DOMAIN = "sleepiq_custom"
+ENGINE_SPACING = timedelta(milliseconds=500)
 ICON = "mdi:bed"
 IS_IN_BED = "is in bed"
 LEFT = "left"
+LIGHT_NAMES = {
+    1: "Right night stand",
+    2: "Left night stand",
+    3: "Right night light",
+    4: "Left night light",
+}
 RIGHT = "right"
 SCAN_INTERVAL = timedelta(seconds=30)
+SESSION_REFRESH_MARGIN = timedelta(minutes=5)
+SESSION_TTL = timedelta(hours=1)
 SIDES = [LEFT, RIGHT]
-SLEEP_NUMBER = "Sleep Number"
\ No newline at end of file
+SLEEP_NUMBER = "Sleep Number"
+STORAGE_SAVE_DELAY = 60
+STORAGE_VERSION = 1
+
+# Polling tiers: occupancy changes by the second, controls when someone uses
+# them, and the registration and sleeper profiles almost never.
+TIER_STATUS = "status"
+TIER_CONTROLS = "controls"
+TIER_PROFILE = "profile"
+TIERS = [TIER_PROFILE, TIER_STATUS, TIER_CONTROLS]
+TIER_INTERVALS = {
+    TIER_STATUS: timedelta(seconds=5),
+    TIER_CONTROLS: SCAN_INTERVAL,
+    TIER_PROFILE: timedelta(hours=1),
+}
+
+# Control resources of all beds are fetched concurrently, at most this many
+# requests at a time.
+FETCH_CONCURRENCY = 4
+
+# Requests of all accounts go through one scheduler: a token bucket per
+# account and one shared by all, in requests per second and burst size.
+# Commands go ahead of polls, and an account SleepIQ throttled without a
+# Retry-After is paused for RATE_LIMIT_PAUSE.
+PRIORITY_COMMAND = 0
+PRIORITY_POLL = 1
+RATE_LIMIT_ACCOUNT_BURST = 10
+RATE_LIMIT_ACCOUNT_RATE = 2.0
+RATE_LIMIT_GLOBAL_BURST = 20
+RATE_LIMIT_GLOBAL_RATE = 5.0
+RATE_LIMIT_PAUSE = timedelta(seconds=30)
+
+# Bed resources refreshed by the controls tier, each from its own endpoint.
+CONTROL_RESOURCES = [
+    "foundation",
+    "light1",
+    "light2",
+    "light3",
+    "light4",
+    "responsive_air",
+    "foot_warming",
+    "privacy_mode",
+]
+
+# Commands are queued per bed, coalesced over a short debounce window and
+# sent no closer together than the spacing.
+COMMAND_DEBOUNCE = timedelta(milliseconds=300)
+COMMAND_FAVORITE = "favorite"
+COMMAND_OUTLET = "outlet"
+COMMAND_PRIVACY_MODE = "privacy_mode"
+COMMAND_RESPONSIVE_AIR = "responsive_air"
+COMMAND_SLEEP_NUMBER = "sleep_number"
+COMMAND_SPACING = timedelta(seconds=1)
+
+# Optimistic commands are confirmed with a targeted read after a short
+# delay, and the expected value is held over stale polls until the timeout.
+OPTIMISTIC_CONFIRM_DELAY = timedelta(seconds=2)
+OPTIMISTIC_TIMEOUT = timedelta(seconds=30)
+
+# Adaptive polling for the tiers whose data follows what people do.
+ADAPTIVE_TIERS = [TIER_STATUS, TIER_CONTROLS]
+COMMAND_BOOST_WINDOW = timedelta(seconds=30)
+CONF_MAX_INTERVAL = "max_interval"
+CONF_MIN_INTERVAL = "min_interval"
+DEFAULT_MAX_INTERVAL = timedelta(minutes=2)
+DEFAULT_MIN_INTERVAL = timedelta(seconds=3)
+IDLE_BACKOFF_FACTOR = 1.5
+TRANSITION_BOOST_WINDOW = timedelta(minutes=5)
+
+# Failed polls back off exponentially with jitter; after enough failures in
+# a row, or a rejected login, the circuit opens and only probes now and then.
+BACKOFF_INITIAL = timedelta(seconds=10)
+BACKOFF_JITTER = 0.2
+BACKOFF_MAX = timedelta(minutes=10)
+CIRCUIT_PROBE_INTERVAL = timedelta(minutes=15)
+CIRCUIT_THRESHOLD = 5
+
+# Nightly sleep history imported into long-term statistics, keyed by the
+# statistic's suffix: (sleepData session field, name, unit, scale).
+HISTORY_BACKFILL = timedelta(days=180)
+HISTORY_INTERVAL = timedelta(hours=6)
+HISTORY_METRICS = {
+    "sleep_score": ("sleepIQScore", "SleepIQ score", None, 1),
+    "time_in_bed": ("inBed", "time in bed", "min", 1 / 60),
+    "restful": ("restful", "restful time", "min", 1 / 60),
+    "restless": ("restless", "restless time", "min", 1 / 60),
+    "heart_rate": ("avgHeartRate", "heart rate", "bpm", 1),
+    "hrv": ("avgHeartRateVariability", "heart rate variability", "ms", 1),
+    "breath_rate": ("avgRespirationRate", "breath rate", "br/min", 1),
+}
+
+# Occupancy hysteresis: a side only counts as entered or left once the new
+# in-bed reading has held for the delay.
+CONF_ENTER_DELAY = "enter_delay"
+CONF_EXIT_DELAY = "exit_delay"
+DEFAULT_ENTER_DELAY = timedelta(seconds=30)
+DEFAULT_EXIT_DELAY = timedelta(seconds=60)
+EVENT_BED_TRANSITION = f"{DOMAIN}_bed_transition"
+
+# Nightly occupancy statistics reset when the night starts, at this local
+# hour. Gaps between polls longer than the maximum are not counted.
+CONF_NIGHT_START = "night_start"
+DEFAULT_NIGHT_START = 12
+NIGHTLY_MAX_GAP = timedelta(minutes=10)
+NIGHTLY_BED_EXITS = "bed_exits"
+NIGHTLY_LONGEST_SLEEP = "longest_sleep"
+NIGHTLY_TIME_IN_BED = "time_in_bed"
+
+# While the bed inflates or the foundation moves, only the endpoint that
+# shows the adjustment is polled, at the burst interval until it settles.
+BURST_INTERVAL = timedelta(seconds=2)
+BURST_STATUS = "status"
+BURST_TIMEOUT = timedelta(seconds=90)
+
+# Settings of the options flow that are applied to a running entry without a
+# reload, alongside the adaptive, occupancy and nightly options above.
+# Intervals and timeouts are in seconds, the debounce window in milliseconds.
+CONF_COMMAND_DEBOUNCE = "command_debounce"
+CONF_CONCURRENCY = "concurrency"
+CONF_OPTIMISTIC_TIMEOUT = "optimistic_timeout"
+CONF_TIER_INTERVALS = {
+    TIER_STATUS: "status_interval",
+    TIER_CONTROLS: "controls_interval",
+    TIER_PROFILE: "profile_interval",
+}
+
+# Credentials and personal values that diagnostics and traffic recordings
+# never show. Recordings replace the ids and names among them with aliases.
+REDACTED = "**REDACTED**"
+REDACTED_KEYS = {
+    "accountId",
+    "birthMonth",
+    "birthYear",
+    "email",
+    "firstName",
+    "gender",
+    "height",
+    "key",
+    "lastName",
+    "login",
+    "macAddress",
+    "password",
+    "sleepGoal",
+    "sleeperId",
+    "sleeperLeftId",
+    "sleeperRightId",
+    "timezone",
+    "userId",
+    "username",
+    "weight",
+    "zipCode",
+}
@@ -0,0 +1,755 @@
+"""Data update coordinators for the SleepIQ Custom integration."""
+import asyncio
+from collections import deque
+from dataclasses import fields, is_dataclass
+from datetime import timedelta
+import logging
+import random
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
+
+from .api import (
+    ERROR_AUTH,
+    SleepIQClient,
+    SleepIQRateLimitError,
+    classify_error,
+)
+from .commands import SUPERSEDED, SleepIQCommandQueue
+from .const import (
+    ADAPTIVE_TIERS,
+    BACKOFF_INITIAL,
+    BACKOFF_JITTER,
+    BACKOFF_MAX,
+    BURST_INTERVAL,
+    BURST_STATUS,
+    BURST_TIMEOUT,
+    CIRCUIT_PROBE_INTERVAL,
+    CIRCUIT_THRESHOLD,
+    COMMAND_BOOST_WINDOW,
+    COMMAND_DEBOUNCE,
+    COMMAND_SLEEP_NUMBER,
+    CONTROL_RESOURCES,
+    DEFAULT_MAX_INTERVAL,
+    DEFAULT_MIN_INTERVAL,
+    DOMAIN,
+    ENGINE_SPACING,
+    EVENT_BED_TRANSITION,
+    IDLE_BACKOFF_FACTOR,
+    OPTIMISTIC_CONFIRM_DELAY,
+    OPTIMISTIC_TIMEOUT,
+    PRIORITY_COMMAND,
+    SIDES,
+    TIER_CONTROLS,
+    TIER_INTERVALS,
+    TIER_PROFILE,
+    TIER_STATUS,
+    TRANSITION_BOOST_WINDOW,
+)
+from .models import Bed, BedSnapshot, flatten, get_path
+from .occupancy import NightlyOccupancyStats, OccupancyFilter
+from .overrides import LocalOverrides
+from .profiling import SleepIQProfiler
+from .ratelimit import request_priority
+from .storage import SleepIQSnapshotStore
+from .views import SideViews
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _flatten_value(value: Any, path: str) -> Dict[str, Any]:
+    """Return the leaves of a bed field keyed by their dotted paths."""
+    if is_dataclass(value):
+        return flatten(value, path + ".")
+    return {path: value}
+
+
+def _read_back_source(path: str) -> str:
+    """Return the control resource or tier that reports a dotted bed path.
+
+    Control resources have their own endpoints. The sleepers, favorites
+    included, come with the profile tier and the rest of a side with the
+    family status.
+    """
+    parts = path.split(".")
+    if parts[0] in CONTROL_RESOURCES:
+        return parts[0]
+    if parts[0] in ("left_side", "right_side"):
+        if len(parts) > 2 and parts[1] == "sleeper":
+            return TIER_PROFILE
+        return TIER_STATUS
+    raise ValueError(f"No SleepIQ endpoint reports {path}")
+
+
+class AdaptiveScheduler:
+    """Pick the next poll interval from what the bed is doing.
+
+    Polls run at the minimum interval around in-bed transitions and right
+    after commands, at the tier's base interval while someone is in bed,
+    and back off towards the maximum while the bed is empty or paused.
+    """
+
+    def __init__(
+        self,
+        base_interval: timedelta,
+        min_interval: timedelta,
+        max_interval: timedelta,
+    ):
+        """Initialize the scheduler."""
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = base_interval
+        self._boost_until = 0.0
+        self._occupancy = None
+
+    def note_command(self) -> None:
+        """Poll quickly for a while after a command."""
+        self._boost(COMMAND_BOOST_WINDOW)
+
+    def _boost(self, window: timedelta) -> None:
+        self._boost_until = max(
+            self._boost_until, time.monotonic() + window.total_seconds()
+        )
+
+    def next_interval(self, beds: Optional[Dict[str, Bed]]) -> timedelta:
+        """Return the interval until the next poll of the account's beds."""
+        if not beds:
+            self.interval = self.base_interval
+            return self.interval
+
+        occupancy = tuple(
+            (bed_id, bed.left_side.isInBed, bed.right_side.isInBed)
+            for bed_id, bed in beds.items()
+        )
+        if self._occupancy is not None and occupancy != self._occupancy:
+            self._boost(TRANSITION_BOOST_WINDOW)
+        self._occupancy = occupancy
+
+        paused = all(
+            bed.privacy_mode is not None and bed.privacy_mode.pauseMode == "on"
+            for bed in beds.values()
+        )
+        if time.monotonic() < self._boost_until:
+            interval = self.min_interval
+        elif paused:
+            interval = self.max_interval
+        elif not any(left or right for _, left, right in occupancy):
+            interval = max(self.interval, self.base_interval) * IDLE_BACKOFF_FACTOR
+        else:
+            interval = self.base_interval
+
+        self.interval = max(self.min_interval, min(interval, self.max_interval))
+        return self.interval
+
+
+class FailurePolicy:
+    """Space out polls while the SleepIQ cloud keeps failing.
+
+    Each failure doubles the delay until the next poll, with some jitter so
+    accounts don't retry in lockstep. After enough failures in a row, or as
+    soon as the credentials are rejected, the circuit opens and the tier
+    only probes the cloud every few minutes until a poll succeeds.
+    """
+
+    def __init__(self, name: str):
+        """Initialize the policy."""
+        self.name = name
+        self.failures = 0
+        self.is_open = False
+        self.last_error: Optional[str] = None
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful poll."""
+        if self.is_open:
+            _LOGGER.info("SleepIQ %s is reachable again", self.name)
+        self.failures = 0
+        self.is_open = False
+        self.last_error = None
+
+    def record_failure(
+        self, kind: str, retry_after: Optional[float] = None
+    ) -> timedelta:
+        """Count a failed poll and return the delay until the next one."""
+        self.failures += 1
+        self.last_error = kind
+        if not self.is_open and (
+            kind == ERROR_AUTH or self.failures >= CIRCUIT_THRESHOLD
+        ):
+            self.is_open = True
+            _LOGGER.warning(
+                "SleepIQ %s failed %s times in a row (%s), polling every %s",
+                self.name,
+                self.failures,
+                kind,
+                CIRCUIT_PROBE_INTERVAL,
+            )
+        if self.is_open:
+            delay = CIRCUIT_PROBE_INTERVAL.total_seconds()
+        else:
+            delay = min(
+                BACKOFF_INITIAL.total_seconds() * 2 ** (self.failures - 1),
+                BACKOFF_MAX.total_seconds(),
+            )
+        delay *= random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return timedelta(seconds=delay)
+
+
+class SleepIQPollingEngine:
+    """Run the refreshes of every SleepIQ coordinator from one timer.
+
+    Coordinators hand their next due time to the engine instead of arming
+    their own timers. The engine starts at most one refresh per spacing
+    slot, so accounts that come due together are staggered rather than
+    hitting the cloud at the same moment.
+    """
+
+    def __init__(self, hass: HomeAssistant, spacing: timedelta = ENGINE_SPACING):
+        """Initialize the engine."""
+        self.hass = hass
+        self.spacing = spacing.total_seconds()
+        self._due: Dict["SleepIQDataUpdateCoordinator", float] = {}
+        self._last_start = 0.0
+        self._unsub_timer = None
+
+    @callback
+    def async_schedule(self, coordinator: "SleepIQDataUpdateCoordinator") -> None:
+        """Schedule the coordinator's next refresh after its update interval."""
+        self._due[coordinator] = (
+            time.monotonic() + coordinator.update_interval.total_seconds()
+        )
+        self._async_arm()
+
+    @callback
+    def async_cancel(self, coordinator: "SleepIQDataUpdateCoordinator") -> None:
+        """Stop refreshing the coordinator."""
+        if self._due.pop(coordinator, None) is not None:
+            self._async_arm()
+
+    @callback
+    def _async_arm(self) -> None:
+        """Arm the timer for the earliest due refresh."""
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        if not self._due:
+            return
+        start = max(min(self._due.values()), self._last_start + self.spacing)
+        self._unsub_timer = async_call_later(
+            self.hass, max(0, start - time.monotonic()), self._async_run
+        )
+
+    @callback
+    def _async_run(self, _now) -> None:
+        """Start the most overdue refresh and re-arm for the next one."""
+        self._unsub_timer = None
+        now = time.monotonic()
+        coordinator = min(self._due, key=self._due.get, default=None)
+        if coordinator is not None and self._due[coordinator] <= now:
+            del self._due[coordinator]
+            self._last_start = now
+            self.hass.async_create_task(coordinator.async_engine_refresh())
+        self._async_arm()
+
+
+class SleepIQDataUpdateCoordinator(DataUpdateCoordinator):
+    """Class to manage fetching one polling tier of a SleepIQ account.
+
+    Every tier of an entry shares the same client and the same beds, so each
+    coordinator only refreshes its own part of them. The data is a dict of
+    beds keyed by bed id.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        client: SleepIQClient,
+        tier: str,
+        engine: SleepIQPollingEngine,
+        min_interval: timedelta = DEFAULT_MIN_INTERVAL,
+        max_interval: timedelta = DEFAULT_MAX_INTERVAL,
+        store: Optional[SleepIQSnapshotStore] = None,
+    ):
+        """Initialize the SleepIQ data updater for a tier."""
+        self.engine = engine
+        self.store = store
+        # True while the data comes from the stored snapshot, not the cloud.
+        self.stale = False
+        self.sleepiq = client
+        self.session = client.session
+        self.metrics = client.metrics
+        self.tier = tier
+        # Options that can change while the entry runs.
+        self.base_interval = TIER_INTERVALS[tier]
+        self.command_debounce = COMMAND_DEBOUNCE
+        self.optimistic_timeout = OPTIMISTIC_TIMEOUT
+        self.poll_count = 0
+        self._poll_times = deque()
+        # The beds as of the last diff.
+        self._snapshot: Optional[BedSnapshot] = None
+        # Dotted Bed paths that changed in the last refresh, None for all.
+        self.changed_fields: Optional[Set[str]] = None
+        self._command_queues: Dict[str, SleepIQCommandQueue] = {}
+        # Expected results of commands, shared by the tiers of an entry.
+        self.overrides = LocalOverrides()
+        self.failures = FailurePolicy(f"{tier} tier")
+        # Filters the in-bed readings of every status fetch, shared by the
+        # tiers of an entry since any of them can burst poll the status.
+        self.occupancy: Optional[OccupancyFilter] = None
+        self.nightly: Optional[NightlyOccupancyStats] = None
+        # Shared by the tiers of an entry, rebuilt after every change.
+        self.views: Optional[SideViews] = None
+        # Set by the profile service for the refreshes it profiles.
+        self.profiler: Optional[SleepIQProfiler] = None
+        # Burst polls in progress, keyed by (bed id, resource), shared by
+        # the tiers of an entry so a resource is never burst polled twice.
+        self.bursts: Dict[Tuple[str, str], asyncio.Task] = {}
+        # The beds as of the last refresh of any tier, shared by the tiers of
+        # an entry so an adjustment is only noticed once.
+        self.seen: Dict[str, Bed] = {}
+        self.scheduler = None
+        if tier in ADAPTIVE_TIERS:
+            self.scheduler = AdaptiveScheduler(
+                TIER_INTERVALS[tier],
+                min(min_interval, TIER_INTERVALS[tier]),
+                max(max_interval, TIER_INTERVALS[tier]),
+            )
+
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN} {tier}",
+            update_interval=TIER_INTERVALS[tier],
+        )
+
+    def update_listeners(self) -> None:
+        """Call update on all listeners."""
+        for update_callback in self._listeners:
+            update_callback()
+
+    @property
+    def login_count(self) -> int:
+        """Return how many times the session has logged in."""
+        return self.session.login_count
+
+    @property
+    def polls_per_hour(self) -> int:
+        """Return how many polls this tier made in the last hour."""
+        cutoff = time.monotonic() - 3600
+        while self._poll_times and self._poll_times[0] < cutoff:
+            self._poll_times.popleft()
+        return len(self._poll_times)
+
+    @callback
+    def _schedule_refresh(self) -> None:
+        """Let the shared engine schedule the next refresh."""
+        if self.update_interval is None:
+            return
+        self.engine.async_schedule(self)
+        self._unsub_refresh = lambda: self.engine.async_cancel(self)
+
+    @property
+    def beds(self) -> BedSnapshot:
+        """Return the entry's latest beds with the command overrides applied.
+
+        Every tier reads the same snapshot, so entities always see one
+        consistent state of a bed whichever tier refreshed last.
+        """
+        return self.overrides.apply(self.sleepiq.beds)
+
+    @callback
+    def async_set_stale_data(self, beds: BedSnapshot) -> None:
+        """Start from a stored snapshot until the first live refresh."""
+        self.data = beds
+        self.stale = True
+        if self.views is not None:
+            self.views.update(beds)
+
+    async def async_refresh(self) -> None:
+        """Refresh the tier, under the profiler while one is attached."""
+        if self.profiler is None:
+            await super().async_refresh()
+            return
+        with self.profiler.refresh(self.tier, self.metrics):
+            await super().async_refresh()
+
+    async def async_engine_refresh(self) -> None:
+        """Refresh on behalf of the engine."""
+        self._unsub_refresh = None
+        await self.async_refresh()
+
+    def fields_changed(self, bed_id: str, paths: Optional[Iterable[str]]) -> bool:
+        """Return True if any of a bed's paths changed in the last refresh.
+
+        A path matches itself and everything below it, so "left_side.sleeper"
+        covers every sleeper field. Entities without paths always update.
+        """
+        if self.changed_fields is None or paths is None:
+            return True
+        prefixes = [f"{bed_id}.{path}" for path in paths]
+        for changed in self.changed_fields:
+            for prefix in prefixes:
+                if changed == prefix or changed.startswith(prefix + "."):
+                    return True
+        return False
+
+    def _diff(self, data: Optional[BedSnapshot]) -> None:
+        """Record which bed fields differ from the previous refresh.
+
+        Snapshots share every bed and part that did not change, so the same
+        version means nothing changed and a bed or part that is the same
+        object is skipped without flattening or comparing it. The side views
+        are brought up to date as well.
+        """
+        if self.views is not None:
+            self.views.update(data)
+        if data is not None:
+            self.seen.update(data)
+        previous, self._snapshot = self._snapshot, data
+        if data is None or previous is None or not self.last_update_success:
+            self.changed_fields = None
+            return
+        self.changed_fields = set()
+        if data.version == previous.version:
+            return
+        for bed_id in data.keys() | previous.keys():
+            new, old = data.get(bed_id), previous.get(bed_id)
+            if new is old:
+                continue
+            if new is None or old is None:
+                self.changed_fields.update(flatten(new or old, f"{bed_id}."))
+                continue
+            for bed_field in fields(new):
+                new_value = getattr(new, bed_field.name)
+                old_value = getattr(old, bed_field.name)
+                if new_value is old_value:
+                    continue
+                path = f"{bed_id}.{bed_field.name}"
+                new_flat = _flatten_value(new_value, path)
+                old_flat = _flatten_value(old_value, path)
+                self.changed_fields.update(
+                    leaf
+                    for leaf in new_flat.keys() | old_flat.keys()
+                    if new_flat.get(leaf) != old_flat.get(leaf)
+                )
+
+    @callback
+    def async_notify_changes(self) -> None:
+        """Write the entities whose fields changed outside a scheduled poll."""
+        self.data = self.beds
+        self._diff(self.data)
+        self.update_listeners()
+
+    def command_queue(self, bed_id: str) -> SleepIQCommandQueue:
+        """Return the command queue for a bed."""
+        queue = self._command_queues.get(bed_id)
+        if queue is None:
+            queue = self._command_queues[bed_id] = SleepIQCommandQueue(
+                self.sleepiq, bed_id, debounce=self.command_debounce
+            )
+        return queue
+
+    def set_command_debounce(self, debounce: timedelta) -> None:
+        """Change the debounce window of every bed's command queue."""
+        self.command_debounce = debounce
+        for queue in self._command_queues.values():
+            queue.debounce = debounce
+
+    @callback
+    def async_set_intervals(
+        self,
+        base_interval: timedelta,
+        min_interval: timedelta,
+        max_interval: timedelta,
+    ) -> None:
+        """Poll at new intervals, rescheduling the next poll straight away.
+
+        A tier that is backing off after failures keeps its backoff until it
+        recovers.
+        """
+        self.base_interval = base_interval
+        if self.scheduler is not None:
+            self.scheduler.base_interval = base_interval
+            self.scheduler.min_interval = min(min_interval, base_interval)
+            self.scheduler.max_interval = max(max_interval, base_interval)
+            self.scheduler.interval = base_interval
+        if self.failures.failures:
+            return
+        self.update_interval = base_interval
+        if self._listeners:
+            self._schedule_refresh()
+
+    def cancel_commands(self) -> None:
+        """Drop every queued command and stop any burst polls."""
+        for queue in self._command_queues.values():
+            queue.cancel()
+        for task in self.bursts.values():
+            task.cancel()
+
+    @callback
+    def async_start_burst(
+        self, bed_id: str, resource: str, done: Callable[[Bed], bool]
+    ) -> None:
+        """Poll one resource of a bed quickly until done returns True."""
+        if (bed_id, resource) in self.bursts:
+            return
+        self.bursts[(bed_id, resource)] = self.hass.async_create_task(
+            self._async_burst(bed_id, resource, done)
+        )
+
+    async def _async_burst(
+        self, bed_id: str, resource: str, done: Callable[[Bed], bool]
+    ) -> None:
+        """Poll only the endpoint showing an adjustment until it settles.
+
+        The scheduled polls carry on as usual; a burst just refreshes the one
+        resource in between and writes the entities that read it.
+        """
+        _LOGGER.debug("Burst polling %s of bed %s", resource, bed_id)
+        deadline = time.monotonic() + BURST_TIMEOUT.total_seconds()
+        try:
+            while time.monotonic() < deadline:
+                await asyncio.sleep(BURST_INTERVAL.total_seconds())
+                try:
+                    if resource == BURST_STATUS:
+                        await self.sleepiq.fetch_status()
+                        self._filter_occupancy()
+                    else:
+                        await self.sleepiq.fetch_resource(bed_id, resource)
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.debug("Stopping burst poll of %s: %s", resource, err)
+                    return
+                self.async_notify_changes()
+                if done(self.beds[bed_id]):
+                    return
+            _LOGGER.debug("Burst poll of %s timed out for bed %s", resource, bed_id)
+        finally:
+            self.bursts.pop((bed_id, resource), None)
+
+    def _start_settle_burst(self, bed_id: str, resource: str, paths: List[str]):
+        """Burst poll until the values at paths stop changing."""
+        last = {}
+
+        def settled(bed: Bed) -> bool:
+            values = {path: get_path(bed, path) for path in paths}
+            if values == last:
+                return True
+            last.clear()
+            last.update(values)
+            return False
+
+        self.async_start_burst(bed_id, resource, settled)
+
+    def _detect_adjustments(self, beds: Dict[str, Bed]) -> None:
+        """Start burst polls for adjustments the last poll caught in progress.
+
+        Each tier only looks at the resources it polls itself. Sleep numbers
+        are compared with the beds any tier saw last, so a change a burst or
+        a command confirmation already followed does not start another burst.
+        """
+        for bed_id, bed in beds.items():
+            if (
+                self.tier == TIER_CONTROLS
+                and bed.foundation is not None
+                and bed.foundation.fsIsMoving
+            ):
+                self.async_start_burst(
+                    bed_id,
+                    "foundation",
+                    lambda bed: bed.foundation is None or not bed.foundation.fsIsMoving,
+                )
+            seen = self.seen.get(bed_id)
+            if (
+                self.tier == TIER_STATUS
+                and self.last_update_success
+                and seen is not None
+                and any(
+                    get_path(bed, f"{side}_side.sleepNumber")
+                    != get_path(seen, f"{side}_side.sleepNumber")
+                    for side in SIDES
+                )
+            ):
+                # Changed without a command of ours, so wait until it settles.
+                self._start_settle_burst(
+                    bed_id,
+                    BURST_STATUS,
+                    [f"{side}_side.sleepNumber" for side in SIDES],
+                )
+
+    async def async_send_command(
+        self,
+        bed_id: str,
+        expected: Dict[str, Any],
+        write_state: Callable[[], None],
+        kind: str,
+        key: Any,
+        value: Any,
+    ) -> None:
+        """Queue a command and show its expected result straight away.
+
+        The expected values are laid over the beds as overrides and only the
+        calling entity's state is written. Once the bed's command queue has
+        sent the command, a targeted read of the endpoints that report the
+        expected paths confirms it, rolling the entity back if the bed
+        disagrees; until then scheduled polls keep the expected values.
+        """
+        sources = {_read_back_source(path) for path in expected}
+        deadline = time.monotonic() + self.optimistic_timeout.total_seconds()
+        for path, expected_value in expected.items():
+            self.overrides.hold(bed_id, path, expected_value, deadline)
+        self._show_overrides()
+        write_state()
+
+        try:
+            result = await self.command_queue(bed_id).submit(kind, key, value)
+        except BaseException:
+            # Cancelled as well as failed: nothing will confirm the values.
+            self.overrides.release(bed_id, expected)
+            self._show_overrides()
+            write_state()
+            raise
+        if result == SUPERSEDED:
+            # The newer command's caller holds the override and confirms it.
+            return
+
+        self.note_command()
+        if kind == COMMAND_SLEEP_NUMBER:
+            # The bed takes a while to inflate; follow it until it gets there.
+            side, number = key, value
+            self.async_start_burst(
+                bed_id,
+                BURST_STATUS,
+                lambda bed: get_path(bed, f"{side}_side.sleepNumber") == number,
+            )
+        self.hass.async_create_task(
+            self._async_confirm_command(bed_id, expected, sources, write_state)
+        )
+
+    async def _async_confirm_command(
+        self,
+        bed_id: str,
+        expected: Dict[str, Any],
+        sources: Set[str],
+        write_state: Callable[[], None],
+    ) -> None:
+        """Read back what a command touched, ahead of the polls."""
+        await asyncio.sleep(OPTIMISTIC_CONFIRM_DELAY.total_seconds())
+        try:
+            with request_priority(PRIORITY_COMMAND):
+                for source in sources:
+                    if source in (TIER_PROFILE, TIER_STATUS):
+                        await self.sleepiq.fetch_tier(source)
+                        if source == TIER_STATUS:
+                            self._filter_occupancy()
+                    else:
+                        await self.sleepiq.fetch_resource(bed_id, source)
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.debug("Leaving command confirmation to the next poll: %s", err)
+            return
+
+        self.overrides.release(bed_id, expected)
+        bed = self.sleepiq.beds[bed_id]
+        for path, value in expected.items():
+            if get_path(bed, path) != value:
+                _LOGGER.warning(
+                    "SleepIQ bed %s reports %s=%s after a command, expected %s",
+                    bed_id,
+                    path,
+                    get_path(bed, path),
+                    value,
+                )
+        self.data = self.beds
+        self._diff(self.data)
+        write_state()
+
+    def _filter_occupancy(self) -> None:
+        """Filter the in-bed readings a status fetch brought in."""
+        if self.occupancy is None:
+            return
+        self.sleepiq.beds, transitions = self.occupancy.update(self.sleepiq.beds)
+        for transition in transitions:
+            self.hass.bus.async_fire(EVENT_BED_TRANSITION, transition)
+
+    def _show_overrides(self) -> None:
+        """Make a change of the overrides visible to the entities."""
+        self.data = self.beds
+        if self.views is not None:
+            self.views.update(self.data)
+
+    def note_command(self) -> None:
+        """Poll sooner because a command was just sent to the bed."""
+        if self.scheduler is None:
+            return
+        self.scheduler.note_command()
+        if self.update_interval > self.scheduler.min_interval:
+            self.update_interval = self.scheduler.min_interval
+            if self._listeners:
+                self._schedule_refresh()
+
+    async def _async_update_data(self) -> BedSnapshot:
+        """Fetch data from API endpoint."""
+        _LOGGER.debug("Fetching %s data", self.tier)
+        self.poll_count += 1
+        self._poll_times.append(time.monotonic())
+        try:
+            with self.metrics.poll(self.tier):
+                # The session logs in only when it has no valid key cached.
+                data = await self.sleepiq.fetch_tier(self.tier)
+        except Exception as err:  # pylint: disable=broad-except
+            raise self._handle_failure(err) from err
+
+        self.metrics.mark_success()
+        self.failures.record_success()
+        if self.tier == TIER_STATUS:
+            self._filter_occupancy()
+        data = self.beds
+        if self.nightly is not None:
+            self.nightly.update(data)
+        if self.stale:
+            # Write every entity so they all leave the assumed state.
+            self.stale = False
+            self._snapshot = None
+        self._detect_adjustments(data)
+        self._diff(data)
+        if self.store is not None:
+            self.store.async_schedule_save(self.sleepiq.beds)
+        if self.scheduler is not None:
+            self.update_interval = self.scheduler.next_interval(data)
+        else:
+            self.update_interval = self.base_interval
+        _LOGGER.debug(
+            "SleepIQ %s poll %s done, %s logins so far, next poll in %s",
+            self.tier,
+            self.poll_count,
+            self.login_count,
+            self.update_interval,
+        )
+        return data
+
+    def _handle_failure(self, err: Exception) -> UpdateFailed:
+        """Back off after a failed poll and return the error to raise.
+
+        The coordinator keeps the last data, and every entity writes its
+        state once to show it is unavailable.
+        """
+        kind = classify_error(err)
+        self.metrics.count_error(kind)
+        retry_after = None
+        if isinstance(err, SleepIQRateLimitError):
+            retry_after = err.retry_after
+        self.update_interval = self.failures.record_failure(kind, retry_after)
+        self.changed_fields = None
+        if kind == ERROR_AUTH:
+            message = "SleepIQ failed to login, double check your username and password"
+        else:
+            message = f"SleepIQ {self.tier} poll failed ({kind}): {err}"
+        _LOGGER.debug("%s, next poll in %s", message, self.update_interval)
+        return UpdateFailed(message)
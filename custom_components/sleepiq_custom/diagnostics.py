@@ -0,0 +1,48 @@
+"""Diagnostics support for SleepIQ Custom."""
+from typing import Any, Dict
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DATA_SCHEDULER, DOMAIN, REDACTED, REDACTED_KEYS, TIER_STATUS
+from .models import to_dict
+
+
+def _redact(data: Any) -> Any:
+    """Replace personal values in nested dicts."""
+    if isinstance(data, dict):
+        return {
+            key: REDACTED if key in REDACTED_KEYS else _redact(value)
+            for key, value in data.items()
+        }
+    if isinstance(data, list):
+        return [_redact(item) for item in data]
+    return data
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> Dict[str, Any]:
+    """Return counters, poll timings and the current beds of an entry."""
+    coordinators = hass.data[DOMAIN][entry.entry_id]
+    status = coordinators[TIER_STATUS]
+    return {
+        "entry": _redact(dict(entry.data)),
+        "metrics": status.metrics.as_dict(),
+        "scheduler": hass.data[DATA_SCHEDULER].as_dict(),
+        "tiers": {
+            tier: {
+                "update_interval": coordinator.update_interval.total_seconds(),
+                "poll_count": coordinator.poll_count,
+                "polls_per_hour": coordinator.polls_per_hour,
+                "last_update_success": coordinator.last_update_success,
+                "consecutive_failures": coordinator.failures.failures,
+                "circuit_open": coordinator.failures.is_open,
+                "last_error": coordinator.failures.last_error,
+            }
+            for tier, coordinator in coordinators.items()
+        },
+        "beds": {
+            bed_id: _redact(to_dict(bed)) for bed_id, bed in (status.data or {}).items()
+        },
+    }
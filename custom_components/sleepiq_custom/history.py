@@ -0,0 +1,192 @@
+"""Nightly sleep history for the SleepIQ Custom integration."""
+import asyncio
+from datetime import date, timedelta
+import logging
+from typing import Any, Dict, List, Optional
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .api import SleepIQClient, SleepIQError
+from .const import (
+    DOMAIN,
+    HISTORY_BACKFILL,
+    HISTORY_METRICS,
+    STORAGE_SAVE_DELAY,
+    STORAGE_VERSION,
+)
+from .models import Sleeper
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _main_session(day: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the night's main session, if the sleeper slept at all."""
+    sessions = day.get("sessions") or []
+    for session in sessions:
+        if session.get("longest"):
+            return session
+    return max(
+        sessions,
+        key=lambda session: session.get("totalSleepSessionTime") or 0,
+        default=None,
+    )
+
+
+def _statistic_id(sleeper_id: str, key: str) -> str:
+    """Return the statistic id of one of a sleeper's metrics.
+
+    Sleeper ids can be negative, and a statistic id may only hold a slug.
+    """
+    return f"{DOMAIN}:{slugify(f'{sleeper_id}_{key}')}"
+
+
+class SleepIQHistoryImporter:
+    """Import finished nights into Home Assistant's long-term statistics.
+
+    Each sleeper has a cursor, the last night already imported. A run fetches
+    the months from the cursor up to yesterday, one request per month, and
+    adds the new nights to the statistics in one batch per metric, so a
+    backfill of months of history takes a handful of requests and writes.
+    """
+
+    def __init__(self, hass: HomeAssistant, client: SleepIQClient, entry_id: str):
+        """Initialize the importer."""
+        self.hass = hass
+        self.client = client
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}.history")
+        self._cursors: Optional[Dict[str, str]] = None
+        self._lock = asyncio.Lock()
+
+    def _sleepers(self) -> List[Sleeper]:
+        """Return every sleeper on the account once."""
+        sleepers = {}
+        for bed in self.client.beds.values():
+            for side in (bed.left_side, bed.right_side):
+                if side.sleeper.sleeperId:
+                    sleepers[side.sleeper.sleeperId] = side.sleeper
+        return list(sleepers.values())
+
+    async def async_import(self, _now=None) -> None:
+        """Import the nights every sleeper has finished since the last run."""
+        if "recorder" not in self.hass.config.components:
+            _LOGGER.debug("Recorder not loaded, skipping SleepIQ history")
+            return
+        async with self._lock:
+            if self._cursors is None:
+                data = await self._store.async_load() or {}
+                self._cursors = data.get("cursors", {})
+            today = dt_util.now().date()
+            try:
+                for sleeper in self._sleepers():
+                    try:
+                        await self._async_import_sleeper(sleeper, today)
+                    except SleepIQError as err:
+                        _LOGGER.warning(
+                            "Could not fetch the sleep history of %s: %s",
+                            sleeper.firstName,
+                            err,
+                        )
+                    except HomeAssistantError as err:
+                        _LOGGER.warning(
+                            "Could not import the sleep history of %s: %s",
+                            sleeper.firstName,
+                            err,
+                        )
+            finally:
+                # Keep the cursors the other sleepers moved.
+                self._store.async_delay_save(
+                    lambda: {"cursors": self._cursors}, STORAGE_SAVE_DELAY
+                )
+
+    async def _async_fetch_nights(
+        self, sleeper_id: str, start: date, today: date
+    ) -> Dict[date, Dict[str, Any]]:
+        """Return the nights from start up to yesterday, one month per request."""
+        nights = {}
+        month = start.replace(day=1)
+        while month < today:
+            payload = await self.client.get_sleep_data(sleeper_id, month.isoformat())
+            for day in (payload or {}).get("sleepDataDays") or []:
+                night = date.fromisoformat(day["date"][:10])
+                if start <= night < today:
+                    nights[night] = day
+            month = (month + timedelta(days=32)).replace(day=1)
+        return nights
+
+    async def _async_import_sleeper(self, sleeper: Sleeper, today: date) -> None:
+        """Import the new nights of one sleeper and move its cursor."""
+        # Imported lazily, the recorder is only needed once there is history.
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+            valid_statistic_id,
+        )
+
+        statistic_ids = {
+            key: _statistic_id(sleeper.sleeperId, key) for key in HISTORY_METRICS
+        }
+        if not all(map(valid_statistic_id, statistic_ids.values())):
+            _LOGGER.warning(
+                "Skipping the sleep history of %s, whose id %s is not usable",
+                sleeper.firstName,
+                sleeper.sleeperId,
+            )
+            return
+
+        cursor = self._cursors.get(sleeper.sleeperId)
+        if cursor is None:
+            start = today - HISTORY_BACKFILL
+        else:
+            start = date.fromisoformat(cursor) + timedelta(days=1)
+        if start >= today:
+            return
+
+        nights = await self._async_fetch_nights(sleeper.sleeperId, start, today)
+        rows = {key: [] for key in HISTORY_METRICS}
+        last = today - timedelta(days=1)
+        for night in sorted(nights):
+            session = _main_session(nights[night])
+            if session is None:
+                continue
+            if session.get("isFinalized") is False:
+                # Pick this night up again once SleepIQ has finished it.
+                last = night - timedelta(days=1)
+                break
+            start_of_night = dt_util.start_of_local_day(night)
+            for key, (field, _, _, scale) in HISTORY_METRICS.items():
+                value = session.get(field)
+                if value is None:
+                    continue
+                value *= scale
+                rows[key].append(
+                    {"start": start_of_night, "mean": value, "min": value, "max": value}
+                )
+
+        for key, statistics in rows.items():
+            if not statistics:
+                continue
+            _, name, unit, _ = HISTORY_METRICS[key]
+            metadata = {
+                "source": DOMAIN,
+                "statistic_id": statistic_ids[key],
+                "name": f"{sleeper.firstName} {name}",
+                "unit_of_measurement": unit,
+                "has_mean": True,
+                "has_sum": False,
+            }
+            async_add_external_statistics(self.hass, metadata, statistics)
+
+        if last >= start:
+            self._cursors[sleeper.sleeperId] = last.isoformat()
+        _LOGGER.debug(
+            "Imported %s nights of %s up to %s",
+            len(nights),
+            sleeper.firstName,
+            self._cursors.get(sleeper.sleeperId),
+        )
+
+    async def async_remove(self) -> None:
+        """Delete the stored cursors."""
+        await self._store.async_remove()
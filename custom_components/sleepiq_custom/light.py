@@ -6,7 +6,7 @@ from homeassistant.components.light import LightEntity, SUPPORT_BRIGHTNESS
 from homeassistant.const import ATTR_ATTRIBUTION
 
 from . import SleepIQDataUpdateCoordinator, SleepIQDevice
-from .const import ATTRIBUTION_TEXT, DOMAIN
+from .const import ATTRIBUTION_TEXT, COMMAND_OUTLET, DOMAIN, TIER_CONTROLS
 
 RIGHT_NIGHT_STAND = 1
 LEFT_NIGHT_STAND = 2
@@ -22,20 +22,23 @@ async def async_setup_entry(
     hass, config_entry: config_entries.ConfigEntry, async_add_entities
 ):
     """Set up a bed from a config entry."""
-    coordinator: SleepIQDataUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator: SleepIQDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ][TIER_CONTROLS]
 
     lights = []
-    if coordinator.data.light1 is not None:
-        lights.append(SleepIQNightLight(coordinator, 1))
+    for bed_id, bed in coordinator.data.items():
+        if bed.light1 is not None:
+            lights.append(SleepIQNightLight(bed_id, coordinator, 1))
 
-    if coordinator.data.light2 is not None:
-        lights.append(SleepIQNightLight(coordinator, 2))
+        if bed.light2 is not None:
+            lights.append(SleepIQNightLight(bed_id, coordinator, 2))
 
-    if coordinator.data.light3 is not None:
-        lights.append(SleepIQNightLight(coordinator, 3))
+        if bed.light3 is not None:
+            lights.append(SleepIQNightLight(bed_id, coordinator, 3))
 
-    if coordinator.data.light4 is not None:
-        lights.append(SleepIQNightLight(coordinator, 4))
+        if bed.light4 is not None:
+            lights.append(SleepIQNightLight(bed_id, coordinator, 4))
 
     async_add_entities(lights)
 
@@ -45,33 +48,35 @@ class SleepIQNightLight(LightEntity, SleepIQDevice):
 
     def __init__(
         self,
+        bed_id: str,
         coordinator: SleepIQDataUpdateCoordinator,
         outletID: int,
     ):
-        super().__init__(coordinator)
+        super().__init__(bed_id, coordinator)
         self._coordinator = coordinator
         self._outletid = outletID
+        self.coordinator_fields = [f"light{outletID}"]
         self._name = None
-        self._brightness = self._coordinator.data.foundation.fsLeftUnderbedLightPWM
+        # Outlets can be fitted without a foundation to report the PWM.
+        foundation = self.bed.foundation
+        self._brightness = (
+            foundation.fsLeftUnderbedLightPWM if foundation is not None else None
+        )
         self._unique_id = (
-            DOMAIN + "_" + self._coordinator.data.bedId + "_light_" + str(outletID)
+            DOMAIN + "_" + self.bed.bedId + "_light_" + str(outletID)
         )
 
         if self._outletid == 1:
-            self._is_on = bool(self._coordinator.data.light1.setting)
-            self._name = self._coordinator.data.light1.name
+            self._name = self.bed.light1.name
             # __LOGGER.debug("Found a light: " + str(outletID))
         elif self._outletid == 2:
-            self._is_on = bool(self._coordinator.data.light2.setting)
-            self._name = self._coordinator.data.light2.name
+            self._name = self.bed.light2.name
             # __LOGGER.debug("Found a light: " + str(outletID))
         elif self._outletid == 3:
-            self._is_on = bool(self._coordinator.data.light3.setting)
-            self._name = self._coordinator.data.light3.name
+            self._name = self.bed.light3.name
             # __LOGGER.debug("Found a light: " + str(outletID))
         elif self._outletid == 4:
-            self._is_on = bool(self._coordinator.data.light4.setting)
-            self._name = self._coordinator.data.light4.name
+            self._name = self.bed.light4.name
             # __LOGGER.debug("Found a light: " + str(outletID))
         else:
             self._name = ""
@@ -91,23 +96,19 @@ class SleepIQNightLight(LightEntity, SleepIQDevice):
         """Return a unique ID."""
         return self._unique_id
 
-    @property
-    def available(self) -> bool:
-        """Return True if entity is available."""
-        return True
-
     @property
     def device_state_attributes(self):
         """Return the state attributes of the device."""
         return {
-            "bedId": self._coordinator.data.bedId,
+            "bedId": self.bed.bedId,
             ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
         }
 
     @property
     def is_on(self):
         """Return True if device is on."""
-        return self._is_on
+        light = getattr(self.bed, f"light{self._outletid}")
+        return light is not None and bool(light.setting)
 
     @property
     def brightness(self):
@@ -122,19 +123,25 @@ class SleepIQNightLight(LightEntity, SleepIQDevice):
 
     async def async_turn_on(self, **kwargs):
         """Turn device on."""
-        await self._coordinator.sleepiq.turn_on_light(self._outletid)
-        # self._coordinator.data.light3.setting = 1
-        await self._coordinator.async_request_refresh()
-        self._is_on = True
-        # self._state = True
+        await self._coordinator.async_send_command(
+            self._bed_id,
+            {f"light{self._outletid}.setting": 1},
+            self.async_write_ha_state,
+            COMMAND_OUTLET,
+            self._outletid,
+            1,
+        )
 
     async def async_turn_off(self, **kwargs):
         """Turn device off."""
-        await self._coordinator.sleepiq.turn_off_light(self._outletid)
-        # self._coordinator.data.light3.setting = 0
-        await self._coordinator.async_request_refresh()
-        # self._state = False
-        self._is_on = False
+        await self._coordinator.async_send_command(
+            self._bed_id,
+            {f"light{self._outletid}.setting": 0},
+            self.async_write_ha_state,
+            COMMAND_OUTLET,
+            self._outletid,
+            0,
+        )
 
     # async def async_update(self):
     #     """Call when forcing a refresh of the device."""
@@ -0,0 +1,149 @@
+"""Request and poll instrumentation for the SleepIQ Custom integration."""
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import time
+from typing import Any, Dict, Optional
+
+from homeassistant.util import dt as dt_util
+
+# Timings of the poll running in the current task, so concurrent tiers
+# don't mix their breakdowns.
+_CURRENT_POLL: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "sleepiq_current_poll", default=None
+)
+
+LATENCY_HISTORY = 100
+
+
+class SleepIQMetrics:
+    """Counters and timings for one SleepIQ account."""
+
+    def __init__(self):
+        """Initialize the metrics."""
+        self.login_count = 0
+        self.request_count = 0
+        self.bytes_received = 0
+        self.error_count = 0
+        self.retry_count = 0
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.bed_requests: Dict[str, int] = defaultdict(int)
+        self.last_poll: Dict[str, Dict[str, float]] = {}
+        self.latency: Dict[str, deque] = defaultdict(
+            lambda: deque(maxlen=LATENCY_HISTORY)
+        )
+        self.last_success = None
+        # Parses skipped because a response or model was unchanged, and the
+        # time they took the last time they did run.
+        self.parse_skipped = 0
+        self.parse_time_saved = 0.0
+        # Requests the shared scheduler held back, and for how long in all.
+        self.queue_waits = 0
+        self.queue_wait_time = 0.0
+        self._request_times = deque()
+
+    @property
+    def requests_per_hour(self) -> int:
+        """Return how many requests were made in the last hour."""
+        cutoff = time.monotonic() - 3600
+        while self._request_times and self._request_times[0] < cutoff:
+            self._request_times.popleft()
+        return len(self._request_times)
+
+    @property
+    def seconds_since_success(self) -> Optional[float]:
+        """Return the seconds since the last successful poll."""
+        if self.last_success is None:
+            return None
+        return (dt_util.utcnow() - self.last_success).total_seconds()
+
+    def count_request(self, bed_id: Optional[str] = None) -> None:
+        """Count one request to the API."""
+        self.request_count += 1
+        self._request_times.append(time.monotonic())
+        if bed_id is not None:
+            self.bed_requests[bed_id] += 1
+
+    def count_error(self, kind: str) -> None:
+        """Count one failed request or poll."""
+        self.error_count += 1
+        self.errors[kind] += 1
+
+    def record_saved(self, seconds: float) -> None:
+        """Count a skipped parse and the time it would have taken."""
+        self.parse_skipped += 1
+        self.parse_time_saved += seconds
+        breakdown = _CURRENT_POLL.get()
+        if breakdown is not None:
+            breakdown["parse_saved"] = breakdown.get("parse_saved", 0.0) + seconds
+
+    def record_wait(self, seconds: float) -> None:
+        """Count the time a request waited for its turn."""
+        if seconds <= 0:
+            return
+        self.queue_waits += 1
+        self.queue_wait_time += seconds
+        breakdown = _CURRENT_POLL.get()
+        if breakdown is not None:
+            breakdown["queue"] = breakdown.get("queue", 0.0) + seconds
+
+    @contextmanager
+    def timer(self, name: str):
+        """Add the time spent in the block to the current poll's breakdown."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            breakdown = _CURRENT_POLL.get()
+            if breakdown is not None:
+                breakdown[name] = (
+                    breakdown.get(name, 0.0) + time.perf_counter() - start
+                )
+
+    @contextmanager
+    def poll(self, tier: str):
+        """Record the total time and breakdown of one poll of a tier."""
+        breakdown: Dict[str, float] = {}
+        token = _CURRENT_POLL.set(breakdown)
+        start = time.perf_counter()
+        try:
+            yield breakdown
+        finally:
+            breakdown["total"] = time.perf_counter() - start
+            _CURRENT_POLL.reset(token)
+            self.last_poll[tier] = breakdown
+            self.latency[tier].append(breakdown["total"])
+
+    def mark_success(self) -> None:
+        """Record a successful poll."""
+        self.last_success = dt_util.utcnow()
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {
+            "login_count": self.login_count,
+            "request_count": self.request_count,
+            "requests_per_hour": self.requests_per_hour,
+            "bytes_received": self.bytes_received,
+            "error_count": self.error_count,
+            "errors": dict(self.errors),
+            "retry_count": self.retry_count,
+            "bed_requests": dict(self.bed_requests),
+            "parse_skipped": self.parse_skipped,
+            "parse_time_saved_ms": round(self.parse_time_saved * 1000, 1),
+            "queue_waits": self.queue_waits,
+            "queue_wait_ms": round(self.queue_wait_time * 1000, 1),
+            "last_success": self.last_success.isoformat()
+            if self.last_success
+            else None,
+            "seconds_since_success": self.seconds_since_success,
+            "last_poll": {
+                tier: {name: round(value * 1000, 1) for name, value in timings.items()}
+                for tier, timings in self.last_poll.items()
+            },
+            "average_poll_ms": {
+                tier: round(sum(values) / len(values) * 1000, 1)
+                for tier, values in self.latency.items()
+                if values
+            },
+        }
@@ -0,0 +1,326 @@
+"""Data models for the SleepIQ Custom integration."""
+from dataclasses import asdict, dataclass, field, fields, is_dataclass, replace
+from itertools import count
+from typing import Any, Dict, Iterator, Mapping, Optional
+
+# Snapshot versions only ever grow, across every snapshot of the process.
+_VERSIONS = count(1)
+
+
+def _from_json(cls, data: Optional[Dict[str, Any]]):
+    """Build a model from an API payload, ignoring unknown keys."""
+    data = data or {}
+    names = {f.name for f in fields(cls)}
+    return cls(**{key: value for key, value in data.items() if key in names})
+
+
+def updated(model, data: Optional[Dict[str, Any]]):
+    """Return the model with the known keys of a payload applied.
+
+    The model is copied only if a value actually changes, so an unchanged
+    part keeps its identity.
+    """
+    names = {f.name for f in fields(model)}
+    changes = {
+        key: value
+        for key, value in (data or {}).items()
+        if key in names and getattr(model, key) != value
+    }
+    return replace(model, **changes) if changes else model
+
+
+def flatten(model, prefix: str = "") -> Dict[str, Any]:
+    """Return every leaf value of a model keyed by its dotted path."""
+    flat = {}
+    for f in fields(model):
+        value = getattr(model, f.name)
+        path = prefix + f.name
+        if is_dataclass(value):
+            flat.update(flatten(value, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+def to_dict(model) -> Dict[str, Any]:
+    """Return a model as nested dicts, leaving out empty values."""
+    return asdict(
+        model, dict_factory=lambda items: {k: v for k, v in items if v is not None}
+    )
+
+
+def get_path(model, path: str) -> Any:
+    """Return the value at a dotted path, or None if part of it is missing."""
+    for name in path.split("."):
+        if model is None:
+            return None
+        model = getattr(model, name)
+    return model
+
+
+def with_path(model, path: str, value: Any):
+    """Return the model with the value at a dotted path replaced.
+
+    Only the parts along the path are copied and everything else is shared,
+    so anyone holding the old model still sees the old values. The model
+    itself is returned if the value is unchanged or part of the path is
+    missing.
+    """
+    name, _, rest = path.partition(".")
+    current = getattr(model, name)
+    if rest:
+        if current is None:
+            return model
+        value = with_path(current, rest, value)
+        if value is current:
+            return model
+    elif current == value:
+        return model
+    return replace(model, **{name: value})
+
+
+@dataclass
+class Sleeper:
+    """A sleeper profile as returned by the sleeper endpoint."""
+
+    bedId: Optional[str] = None
+    firstName: Optional[str] = None
+    active: Optional[bool] = None
+    emailValidated: Optional[bool] = None
+    gender: Optional[int] = None
+    isChild: Optional[bool] = None
+    birthYear: Optional[str] = None
+    zipCode: Optional[str] = None
+    timezone: Optional[str] = None
+    privacyPolicyVersion: Optional[int] = None
+    duration: Optional[int] = None
+    weight: Optional[int] = None
+    sleeperId: Optional[str] = None
+    firstSessionRecorded: Optional[str] = None
+    height: Optional[int] = None
+    licenseVersion: Optional[int] = None
+    username: Optional[str] = None
+    birthMonth: Optional[int] = None
+    sleepGoal: Optional[int] = None
+    accountId: Optional[str] = None
+    isAccountOwner: Optional[bool] = None
+    email: Optional[str] = None
+    lastLogin: Optional[str] = None
+    side: Optional[int] = None
+    favorite: Optional[int] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create a sleeper from an API payload."""
+        return _from_json(cls, data)
+
+
+@dataclass
+class Side:
+    """One side of a bed, combining family status and the sleeper."""
+
+    isInBed: Optional[bool] = None
+    sleepNumber: Optional[int] = None
+    alertId: Optional[int] = None
+    alertDetailedMessage: Optional[str] = None
+    lastLink: Optional[str] = None
+    pressure: Optional[int] = None
+    sleeper: Sleeper = field(default_factory=Sleeper)
+    # isInBed after the occupancy filter, and when it last changed.
+    occupied: Optional[bool] = None
+    occupied_changed: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create a side from a family status payload."""
+        return _from_json(cls, data)
+
+
+@dataclass
+class Foundation:
+    """Foundation status."""
+
+    fsCurrentPositionPresetRight: Optional[str] = None
+    fsCurrentPositionPresetLeft: Optional[str] = None
+    fsNeedsHoming: Optional[bool] = None
+    fsRightHeadPosition: Optional[str] = None
+    fsLeftHeadPosition: Optional[str] = None
+    fsRightFootPosition: Optional[str] = None
+    fsLeftFootPosition: Optional[str] = None
+    fsIsMoving: Optional[bool] = None
+    fsLeftUnderbedLightPWM: Optional[int] = None
+    fsRightUnderbedLightPWM: Optional[int] = None
+    fsType: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create a foundation status from an API payload."""
+        return _from_json(cls, data)
+
+
+@dataclass
+class Light:
+    """A foundation outlet."""
+
+    bedId: Optional[str] = None
+    outlet: Optional[int] = None
+    setting: Optional[int] = None
+    timer: Optional[str] = None
+    name: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create an outlet from an API payload."""
+        return _from_json(cls, data)
+
+
+@dataclass
+class ResponsiveAir:
+    """Responsive air settings."""
+
+    adjustmentThreshold: Optional[int] = None
+    inBedTimeout: Optional[int] = None
+    leftSideEnabled: Optional[bool] = None
+    outOfBedTimeout: Optional[int] = None
+    pollFrequency: Optional[int] = None
+    prefSyncState: Optional[str] = None
+    rightSideEnabled: Optional[bool] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create responsive air settings from an API payload."""
+        return _from_json(cls, data)
+
+
+@dataclass
+class FootWarming:
+    """Foot warming status."""
+
+    footWarmingStatusLeft: Optional[int] = None
+    footWarmingStatusRight: Optional[int] = None
+    footWarmingTimerLeft: Optional[int] = None
+    footWarmingTimerRight: Optional[int] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create a foot warming status from an API payload."""
+        return _from_json(cls, data)
+
+
+@dataclass
+class PrivacyMode:
+    """Privacy (pause) mode."""
+
+    accountId: Optional[str] = None
+    bedId: Optional[str] = None
+    pauseMode: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create a privacy mode from an API payload."""
+        return _from_json(cls, data)
+
+
+@dataclass
+class Bed:
+    """Everything the integration knows about one bed."""
+
+    bedId: Optional[str] = None
+    accountId: Optional[str] = None
+    name: Optional[str] = None
+    model: Optional[str] = None
+    status: Optional[int] = None
+    registrationDate: Optional[str] = None
+    macAddress: Optional[str] = None
+    sleeperLeftId: Optional[str] = None
+    sleeperRightId: Optional[str] = None
+    left_side: Side = field(default_factory=Side)
+    right_side: Side = field(default_factory=Side)
+    foundation: Optional[Foundation] = None
+    light1: Optional[Light] = None
+    light2: Optional[Light] = None
+    light3: Optional[Light] = None
+    light4: Optional[Light] = None
+    responsive_air: Optional[ResponsiveAir] = None
+    foot_warming: Optional[FootWarming] = None
+    privacy_mode: Optional[PrivacyMode] = None
+
+    @classmethod
+    def from_json(cls, data):
+        """Create a bed from a bed endpoint payload."""
+        return _from_json(cls, data)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Bed":
+        """Create a bed, including its parts, from the output of to_dict."""
+        bed = _from_json(cls, data)
+        for name in ("left_side", "right_side"):
+            side_data = data.get(name) or {}
+            side = Side.from_json(side_data)
+            side.sleeper = Sleeper.from_json(side_data.get("sleeper"))
+            setattr(bed, name, side)
+        for name, model in (
+            ("foundation", Foundation),
+            ("light1", Light),
+            ("light2", Light),
+            ("light3", Light),
+            ("light4", Light),
+            ("responsive_air", ResponsiveAir),
+            ("foot_warming", FootWarming),
+            ("privacy_mode", PrivacyMode),
+        ):
+            part = data.get(name)
+            setattr(bed, name, model.from_json(part) if part is not None else None)
+        return bed
+
+
+class BedSnapshot(Mapping):
+    """An immutable, versioned set of beds keyed by bed id.
+
+    Beds and their parts are never changed in place. Changing a bed gives a
+    new snapshot with a higher version that shares every other bed, and
+    every unchanged part, with the old one, so old snapshots stay valid and
+    cheap to keep, and two snapshots with the same version are the same.
+    """
+
+    __slots__ = ("_beds", "_version")
+
+    def __init__(self, beds: Optional[Mapping[str, Bed]] = None):
+        """Initialize the snapshot."""
+        self._beds = dict(beds or {})
+        self._version = next(_VERSIONS)
+
+    @property
+    def version(self) -> int:
+        """Return the version of the snapshot."""
+        return self._version
+
+    def __getitem__(self, bed_id: str) -> Bed:
+        return self._beds[bed_id]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._beds)
+
+    def __len__(self) -> int:
+        return len(self._beds)
+
+    def __repr__(self) -> str:
+        return f"BedSnapshot(version={self._version}, beds={list(self._beds)})"
+
+    def with_beds(
+        self, beds: Mapping[str, Bed], replace_all: bool = False
+    ) -> "BedSnapshot":
+        """Return a snapshot with some beds replaced or added.
+
+        With replace_all the beds given are the new set and any others are
+        dropped. The snapshot itself is returned if nothing changes.
+        """
+        if replace_all:
+            if beds.keys() == self._beds.keys() and all(
+                bed is self._beds[bed_id] for bed_id, bed in beds.items()
+            ):
+                return self
+            return BedSnapshot(beds)
+        if all(self._beds.get(bed_id) is bed for bed_id, bed in beds.items()):
+            return self
+        return BedSnapshot({**self._beds, **beds})
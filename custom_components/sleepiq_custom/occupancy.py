@@ -0,0 +1,198 @@
+"""Occupancy hysteresis for the SleepIQ Custom integration."""
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    DEFAULT_ENTER_DELAY,
+    DEFAULT_EXIT_DELAY,
+    DEFAULT_NIGHT_START,
+    NIGHTLY_BED_EXITS,
+    NIGHTLY_LONGEST_SLEEP,
+    NIGHTLY_MAX_GAP,
+    NIGHTLY_TIME_IN_BED,
+    SIDES,
+)
+from .models import Bed, BedSnapshot
+
+
+class OccupancyFilter:
+    """Turn raw isInBed readings into clean in-bed transitions.
+
+    A side only changes its filtered ``occupied`` state once a new reading
+    has held for the enter or exit delay, so brief flaps never reach the
+    entities. The transition is dated halfway between the last reading that
+    agreed with the old state and the first one that didn't. Changed beds
+    are replaced in a new snapshot, never changed in place.
+    """
+
+    def __init__(
+        self,
+        enter_delay: timedelta = DEFAULT_ENTER_DELAY,
+        exit_delay: timedelta = DEFAULT_EXIT_DELAY,
+    ):
+        """Initialize the filter."""
+        self.enter_delay = enter_delay
+        self.exit_delay = exit_delay
+        # Per (bed id, side): when the reading last agreed with the state.
+        self._last_agreed: Dict[Tuple[str, str], datetime] = {}
+        # Per (bed id, side): the differing reading, when it was first seen
+        # and the estimated transition time.
+        self._pending: Dict[Tuple[str, str], Tuple[bool, datetime, datetime]] = {}
+
+    def update(
+        self, beds: BedSnapshot, now: Optional[datetime] = None
+    ) -> Tuple[BedSnapshot, List[Dict[str, Any]]]:
+        """Filter the latest readings.
+
+        Returns the beds with the filtered state applied and the transitions
+        the readings complete.
+        """
+        now = now or dt_util.utcnow()
+        transitions = []
+        changed = {}
+        for bed_id, bed in beds.items():
+            for side_name in SIDES:
+                side = getattr(bed, f"{side_name}_side")
+                key = (bed_id, side_name)
+                reading = side.isInBed
+                if reading is None:
+                    continue
+                if side.occupied is None:
+                    side = replace(side, occupied=reading)
+                    bed = replace(bed, **{f"{side_name}_side": side})
+                if reading == side.occupied:
+                    self._pending.pop(key, None)
+                    self._last_agreed[key] = now
+                    continue
+
+                pending = self._pending.get(key)
+                if pending is None or pending[0] != reading:
+                    last_agreed = self._last_agreed.get(key, now)
+                    pending = (reading, now, last_agreed + (now - last_agreed) / 2)
+                    self._pending[key] = pending
+                delay = self.enter_delay if reading else self.exit_delay
+                if now - pending[1] < delay:
+                    continue
+
+                del self._pending[key]
+                self._last_agreed[key] = now
+                side = replace(
+                    side, occupied=reading, occupied_changed=pending[2].isoformat()
+                )
+                bed = replace(bed, **{f"{side_name}_side": side})
+                transitions.append(
+                    {
+                        "bed_id": bed_id,
+                        "side": side_name,
+                        "sleeper_id": side.sleeper.sleeperId,
+                        "sleeper": side.sleeper.firstName,
+                        "in_bed": reading,
+                        "at": side.occupied_changed,
+                    }
+                )
+            if bed is not beds[bed_id]:
+                changed[bed_id] = bed
+        return beds.with_beds(changed), transitions
+
+
+class NightlyOccupancyStats:
+    """Keep tonight's time in bed, bed exits and longest stretch per side.
+
+    The totals grow a little on every status poll from the filtered
+    occupancy, so no history has to be read back. A night runs from the
+    night start hour to the same hour the next day. Gaps between polls
+    longer than NIGHTLY_MAX_GAP, such as a restart, are not counted.
+    """
+
+    def __init__(self, night_start: int = DEFAULT_NIGHT_START):
+        """Initialize the statistics."""
+        self.night_start = night_start
+        self.night: Optional[str] = None
+        # Per "bed_id.side": in_bed, last and stretch_start as timestamps,
+        # and the running totals in seconds.
+        self.sides: Dict[str, Dict[str, Any]] = {}
+
+    def _night_of(self, now: datetime) -> date:
+        """Return the day the night containing a moment started on."""
+        return (dt_util.as_local(now) - timedelta(hours=self.night_start)).date()
+
+    def _start_of(self, night: date) -> float:
+        """Return when a night started, as a timestamp."""
+        start = dt_util.start_of_local_day(night) + timedelta(hours=self.night_start)
+        return start.timestamp()
+
+    def _start_night(self, night: date) -> None:
+        """Reset the totals; people still in bed carry on from the start."""
+        start = self._start_of(night)
+        for stats in self.sides.values():
+            stats[NIGHTLY_TIME_IN_BED] = 0.0
+            stats[NIGHTLY_BED_EXITS] = 0
+            stats[NIGHTLY_LONGEST_SLEEP] = 0.0
+            if stats["in_bed"]:
+                stats["stretch_start"] = max(stats["stretch_start"] or start, start)
+                stats["last"] = max(stats["last"] or start, start)
+        self.night = night.isoformat()
+
+    def update(self, beds: Dict[str, Bed], now: Optional[datetime] = None) -> None:
+        """Add the time since the previous poll to every side's totals."""
+        now = now or dt_util.utcnow()
+        night = self._night_of(now)
+        if self.night != night.isoformat():
+            self._start_night(night)
+        timestamp = now.timestamp()
+        for bed_id, bed in beds.items():
+            for side_name in SIDES:
+                side = getattr(bed, f"{side_name}_side")
+                occupied = side.isInBed if side.occupied is None else side.occupied
+                if occupied is None:
+                    continue
+                stats = self.sides.setdefault(
+                    f"{bed_id}.{side_name}",
+                    {
+                        "in_bed": occupied,
+                        "last": timestamp,
+                        "stretch_start": timestamp if occupied else None,
+                        NIGHTLY_TIME_IN_BED: 0.0,
+                        NIGHTLY_BED_EXITS: 0,
+                        NIGHTLY_LONGEST_SLEEP: 0.0,
+                    },
+                )
+                elapsed = timestamp - stats["last"]
+                if elapsed > NIGHTLY_MAX_GAP.total_seconds():
+                    elapsed = 0.0
+                    stats["stretch_start"] = timestamp if occupied else None
+                if stats["in_bed"]:
+                    stats[NIGHTLY_TIME_IN_BED] += elapsed
+                    stats[NIGHTLY_LONGEST_SLEEP] = max(
+                        stats[NIGHTLY_LONGEST_SLEEP],
+                        timestamp - (stats["stretch_start"] or timestamp),
+                    )
+                    if not occupied:
+                        stats[NIGHTLY_BED_EXITS] += 1
+                        stats["stretch_start"] = None
+                elif occupied:
+                    stats["stretch_start"] = timestamp
+                stats["in_bed"] = occupied
+                stats["last"] = timestamp
+
+    def value(self, bed_id: str, side: str, kind: str) -> Optional[float]:
+        """Return a total, with durations in whole minutes."""
+        stats = self.sides.get(f"{bed_id}.{side}")
+        if stats is None:
+            return None
+        if kind == NIGHTLY_BED_EXITS:
+            return stats[kind]
+        return round(stats[kind] / 60)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the statistics in a form that can be stored."""
+        return {"night": self.night, "sides": self.sides}
+
+    def restore(self, data: Optional[Dict[str, Any]]) -> None:
+        """Continue from stored statistics."""
+        if data:
+            self.night = data.get("night")
+            self.sides = data.get("sides", {})
@@ -0,0 +1,58 @@
+"""Optimistic values shown on top of the SleepIQ beds."""
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from .models import BedSnapshot, get_path, with_path
+
+
+class LocalOverrides:
+    """Hold the expected results of commands until the bed confirms them.
+
+    Overrides are never written into the beds the client fetched. They are
+    laid over a snapshot as a small overlay that copies only the parts
+    along each overridden path, and the result is kept until the beds or
+    the overrides change. An override is dropped once the bed reports the
+    same value or its deadline passes, and polls that predate the command
+    keep showing the expected value until then.
+    """
+
+    def __init__(self):
+        """Initialize the overrides."""
+        # Per (bed id, dotted path): the expected value and its deadline.
+        self._values: Dict[Tuple[str, str], Tuple[Any, float]] = {}
+        self._base: Optional[BedSnapshot] = None
+        self._result: Optional[BedSnapshot] = None
+        self._expires = float("inf")
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def hold(self, bed_id: str, path: str, value: Any, deadline: float) -> None:
+        """Show a value at a path of a bed until the deadline."""
+        self._values[(bed_id, path)] = (value, deadline)
+        self._result = None
+
+    def release(self, bed_id: str, paths: Iterable[str]) -> None:
+        """Stop overriding paths of a bed, showing what the bed reports."""
+        for path in paths:
+            if self._values.pop((bed_id, path), None) is not None:
+                self._result = None
+
+    def apply(self, base: BedSnapshot) -> BedSnapshot:
+        """Return the beds with the overrides laid over them."""
+        now = time.monotonic()
+        if self._result is not None and self._base is base and now <= self._expires:
+            return self._result
+
+        beds = {}
+        self._expires = float("inf")
+        for (bed_id, path), (value, deadline) in list(self._values.items()):
+            bed = base.get(bed_id)
+            if bed is None or now > deadline or get_path(bed, path) == value:
+                del self._values[(bed_id, path)]
+                continue
+            beds[bed_id] = with_path(beds.get(bed_id, bed), path, value)
+            self._expires = min(self._expires, deadline)
+        self._base = base
+        self._result = base.with_beds(beds) if beds else base
+        return self._result
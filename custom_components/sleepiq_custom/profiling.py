@@ -0,0 +1,150 @@
+"""Profile the refreshes of the SleepIQ Custom coordinators on demand.
+
+A profiler attached to coordinators runs their next refreshes under
+cProfile and records the wall-clock time of each step of every refresh:
+the login, each fetch, building the models, waiting for the request
+scheduler and every entity state write. Coordinators without a profiler
+skip all of this.
+"""
+import asyncio
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+import cProfile
+import io
+import pstats
+import time
+from typing import Any, Dict, List, Optional
+
+from homeassistant.util import dt as dt_util
+
+from .metrics import SleepIQMetrics
+
+# The record of the refresh running in the current task.
+_CURRENT_REFRESH: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "sleepiq_current_refresh", default=None
+)
+
+# How many functions and entity writes the summary lists.
+SUMMARY_FUNCTIONS = 40
+SUMMARY_WRITES = 20
+
+
+class SleepIQProfiler:
+    """Profile the next refreshes of the coordinators it is attached to."""
+
+    def __init__(self, refreshes: int):
+        """Initialize the profiler."""
+        self.refreshes = refreshes
+        self.records: List[Dict[str, Any]] = []
+        self.started = dt_util.utcnow()
+        # Set once the last profiled refresh has finished.
+        self.finished = asyncio.Event()
+        self._profile = cProfile.Profile()
+        self._claimed = 0
+        self._active = 0
+
+    @contextmanager
+    def refresh(self, tier: str, metrics: SleepIQMetrics):
+        """Profile one refresh of a tier, unless enough have been claimed.
+
+        cProfile runs while any profiled refresh is in progress, so it also
+        sees whatever else the event loop runs in the meantime.
+        """
+        if self._claimed >= self.refreshes:
+            yield
+            return
+        self._claimed += 1
+        record: Dict[str, Any] = {"tier": tier, "steps": {}, "writes": {}}
+        last_poll = metrics.last_poll.get(tier)
+        token = _CURRENT_REFRESH.set(record)
+        if not self._active:
+            self._profile.enable()
+        self._active += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record["total"] = time.perf_counter() - start
+            self._active -= 1
+            if not self._active:
+                self._profile.disable()
+            _CURRENT_REFRESH.reset(token)
+            poll = metrics.last_poll.get(tier)
+            if poll is not None and poll is not last_poll:
+                record["steps"] = {
+                    "poll" if name == "total" else name: value
+                    for name, value in poll.items()
+                }
+            self.records.append(record)
+            if len(self.records) >= self.refreshes:
+                self.finished.set()
+
+    @staticmethod
+    @contextmanager
+    def timer(name: str):
+        """Time an entity's state write as part of the current refresh."""
+        record = _CURRENT_REFRESH.get()
+        if record is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            writes = record["writes"]
+            writes[name] = writes.get(name, 0.0) + time.perf_counter() - start
+
+    def save(self, path: str) -> None:
+        """Write the cProfile statistics and a summary next to each other."""
+        self._profile.dump_stats(f"{path}.pstats")
+        with open(f"{path}.txt", "w", encoding="utf-8") as summary:
+            summary.write(self.summary())
+
+    def summary(self) -> str:
+        """Return the timings of every refresh and the busiest functions."""
+        lines = [
+            f"SleepIQ profile of {len(self.records)} refreshes started "
+            f"{self.started.isoformat()}",
+            "Wall-clock times in ms. poll is the whole fetch, parse building the",
+            "models, queue waiting for the request scheduler.",
+            "",
+        ]
+        steps: Dict[str, List[float]] = defaultdict(list)
+        writes: Dict[str, List[float]] = defaultdict(list)
+        for number, record in enumerate(self.records, 1):
+            parts = [
+                f"{name} {value * 1000:.1f}" for name, value in record["steps"].items()
+            ]
+            write_time = sum(record["writes"].values())
+            parts.append(
+                f"{len(record['writes'])} entity writes {write_time * 1000:.1f}"
+            )
+            lines.append(
+                f"#{number} {record['tier']}: {record['total'] * 1000:.1f} "
+                f"({', '.join(parts)})"
+            )
+            steps["refresh"].append(record["total"])
+            for name, value in record["steps"].items():
+                steps[name].append(value)
+            steps["entity writes"].append(write_time)
+            for name, value in record["writes"].items():
+                writes[name].append(value)
+
+        lines += ["", f"{'step':<30} {'count':>6} {'total':>10} {'mean':>8} {'max':>8}"]
+        for name, values in sorted(steps.items(), key=lambda item: -sum(item[1])):
+            lines.append(
+                f"{name:<30} {len(values):>6} {sum(values) * 1000:>10.1f} "
+                f"{sum(values) / len(values) * 1000:>8.2f} {max(values) * 1000:>8.2f}"
+            )
+
+        lines += ["", f"{'slowest entity writes':<50} {'count':>6} {'total':>10}"]
+        slowest = sorted(writes.items(), key=lambda item: -sum(item[1]))
+        for name, values in slowest[:SUMMARY_WRITES]:
+            lines.append(f"{name:<50} {len(values):>6} {sum(values) * 1000:>10.2f}")
+
+        stats = io.StringIO()
+        profile = pstats.Stats(self._profile, stream=stats)
+        profile.sort_stats("cumulative").print_stats(SUMMARY_FUNCTIONS)
+        lines += ["", stats.getvalue()]
+        return "\n".join(lines)
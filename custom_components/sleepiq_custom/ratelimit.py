@@ -0,0 +1,226 @@
+"""Process-wide request scheduling for the SleepIQ Custom integration."""
+import asyncio
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import heapq
+from itertools import count
+import time
+from typing import Any, Dict, List, Tuple
+
+from .const import (
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+    RATE_LIMIT_ACCOUNT_BURST,
+    RATE_LIMIT_ACCOUNT_RATE,
+    RATE_LIMIT_GLOBAL_BURST,
+    RATE_LIMIT_GLOBAL_RATE,
+)
+
+# The priority of the requests made by the current task. Polls are the
+# default; command senders raise it for the requests they make.
+_PRIORITY: ContextVar[int] = ContextVar("sleepiq_priority", default=PRIORITY_POLL)
+
+WAIT_HISTORY = 100
+
+
+@contextmanager
+def request_priority(priority: int):
+    """Make the requests sent in the block with the given priority."""
+    token = _PRIORITY.set(priority)
+    try:
+        yield
+    finally:
+        _PRIORITY.reset(token)
+
+
+def current_priority() -> int:
+    """Return the priority of requests made by the current task."""
+    return _PRIORITY.get()
+
+
+class TokenBucket:
+    """Allow a steady rate of requests with bursts up to a capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        """Initialize a full bucket."""
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        """Add the tokens earned since the last refill."""
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Return the seconds until a token is available."""
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Use one token."""
+        self._refill(now)
+        self._tokens -= 1
+
+
+class SleepIQRequestScheduler:
+    """Pace the requests of every SleepIQ account through shared buckets.
+
+    A request needs a token from its account's bucket and from the global
+    one. Requests that have to wait are queued by priority, so commands go
+    ahead of polls, and in order of arrival within a priority. An account
+    that SleepIQ throttled is paused until its Retry-After passes. A queued
+    request of one account never holds up another account whose bucket
+    still has tokens.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT_GLOBAL_RATE,
+        burst: float = RATE_LIMIT_GLOBAL_BURST,
+        account_rate: float = RATE_LIMIT_ACCOUNT_RATE,
+        account_burst: float = RATE_LIMIT_ACCOUNT_BURST,
+    ):
+        """Initialize the scheduler."""
+        self.account_rate = account_rate
+        self.account_burst = account_burst
+        self._global = TokenBucket(rate, burst)
+        self._accounts: Dict[str, TokenBucket] = {}
+        # Per account: when SleepIQ allows requests again.
+        self._paused: Dict[str, float] = {}
+        # Queued requests: (priority, arrival, account, future).
+        self._queue: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._arrivals = count()
+        self._timer = None
+        self.queued: Dict[int, int] = defaultdict(int)
+        self.max_queue_depth = 0
+        self.granted: Dict[int, int] = defaultdict(int)
+        self.delayed: Dict[int, int] = defaultdict(int)
+        self.wait_time: Dict[int, float] = defaultdict(float)
+        self.waits: Dict[int, deque] = defaultdict(lambda: deque(maxlen=WAIT_HISTORY))
+        self.pause_count = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Return how many requests are waiting for a token."""
+        return sum(self.queued.values())
+
+    def paused_for(self, account: str) -> float:
+        """Return the seconds until a throttled account may send again."""
+        return max(0.0, self._paused.get(account, 0.0) - time.monotonic())
+
+    def pause(self, account: str, seconds: float) -> None:
+        """Hold back an account's requests after SleepIQ throttled it."""
+        until = time.monotonic() + seconds
+        if until > self._paused.get(account, 0.0):
+            self._paused[account] = until
+            self.pause_count += 1
+        if self._queue:
+            self._dispatch()
+
+    async def acquire(self, account: str, priority: int) -> float:
+        """Wait until a request of the account may be sent.
+
+        Returns the seconds the request waited.
+        """
+        now = time.monotonic()
+        if not self._queue and self._wait_for(account, now) <= 0:
+            self._take(account, now)
+            self.granted[priority] += 1
+            self.waits[priority].append(0.0)
+            return 0.0
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._arrivals), account, future))
+        self.queued[priority] += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        self.delayed[priority] += 1
+        try:
+            self._dispatch()
+            await future
+        finally:
+            if not future.done():
+                future.cancel()
+            self.queued[priority] -= 1
+        waited = time.monotonic() - now
+        self.granted[priority] += 1
+        self.wait_time[priority] += waited
+        self.waits[priority].append(waited)
+        return waited
+
+    def _bucket(self, account: str) -> TokenBucket:
+        """Return the bucket of an account."""
+        bucket = self._accounts.get(account)
+        if bucket is None:
+            bucket = self._accounts[account] = TokenBucket(
+                self.account_rate, self.account_burst
+            )
+        return bucket
+
+    def _wait_for(self, account: str, now: float) -> float:
+        """Return the seconds until a request of the account may be sent."""
+        return max(
+            self._paused.get(account, 0.0) - now,
+            self._bucket(account).wait_time(now),
+            self._global.wait_time(now),
+        )
+
+    def _take(self, account: str, now: float) -> None:
+        """Use a token of the account and a global one."""
+        self._bucket(account).take(now)
+        self._global.take(now)
+
+    def _dispatch(self) -> None:
+        """Let queued requests go in priority order and re-arm the timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        now = time.monotonic()
+        delay = None
+        waiting = []
+        while self._queue:
+            entry = heapq.heappop(self._queue)
+            account, future = entry[2], entry[3]
+            if future.done():
+                continue
+            wait = self._wait_for(account, now)
+            if wait <= 0:
+                self._take(account, now)
+                future.set_result(None)
+                continue
+            waiting.append(entry)
+            delay = wait if delay is None else min(delay, wait)
+        for entry in waiting:
+            heapq.heappush(self._queue, entry)
+        if delay is not None:
+            self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the queue and wait metrics for diagnostics."""
+        names = {PRIORITY_COMMAND: "command", PRIORITY_POLL: "poll"}
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "pauses": self.pause_count,
+            "paused_accounts": sum(
+                1 for account in self._paused if self.paused_for(account) > 0
+            ),
+            "priorities": {
+                name: {
+                    "queued": self.queued[priority],
+                    "granted": self.granted[priority],
+                    "delayed": self.delayed[priority],
+                    "total_wait_ms": round(self.wait_time[priority] * 1000, 1),
+                    "max_recent_wait_ms": round(
+                        max(self.waits[priority], default=0.0) * 1000, 1
+                    ),
+                }
+                for priority, name in names.items()
+            },
+        }
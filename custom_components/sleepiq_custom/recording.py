@@ -0,0 +1,269 @@
+"""Record SleepIQ API traffic and replay it later.
+
+A recorder attached to a session keeps every request and response with
+credentials dropped and personal values replaced by stable aliases, so a
+bed keeps the same made-up id throughout a recording. Recordings are gzipped
+JSON lines and every distinct response body is stored only once.
+
+ReplayWebSession stands in for aiohttp's ClientSession and answers from a
+recording, either in order or on a virtual clock that can run at any speed.
+"""
+import gzip
+import json
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from multidict import CIMultiDict
+
+from .const import API_URL, REDACTED, REDACTED_KEYS
+
+RECORDING_VERSION = 1
+
+# Values that identify a bed, account or person, with the prefix of the
+# aliases they are replaced by. Replays need them to stay consistent, so
+# they are aliased rather than redacted like the rest of REDACTED_KEYS.
+ALIASED_KEYS = {
+    "accountId": "account",
+    "bed": "bed",
+    "bedId": "bed",
+    "firstName": "Sleeper",
+    "sleeper": "sleeper",
+    "sleeperId": "sleeper",
+    "sleeperLeftId": "sleeper",
+    "sleeperRightId": "sleeper",
+    "userId": "account",
+}
+
+
+class SleepIQRecorder:
+    """Collect the requests a session makes, scrubbed of personal data."""
+
+    def __init__(self):
+        """Initialize the recorder."""
+        self.records: List[Dict[str, Any]] = []
+        self.bodies: List[str] = []
+        self._body_index: Dict[str, int] = {}
+        self._aliases: Dict[str, str] = {}
+        self._alias_counts: Dict[str, int] = {}
+        self._start = time.monotonic()
+
+    def _alias(self, value: Any, prefix: str) -> Any:
+        """Return the stable alias of an identifying value."""
+        if value is None:
+            return None
+        value = str(value)
+        alias = self._aliases.get(value)
+        if alias is None:
+            count = self._alias_counts.get(prefix, 0)
+            self._alias_counts[prefix] = count + 1
+            alias = self._aliases[value] = f"{prefix}{count}"
+        return alias
+
+    def scrub(self, data: Any) -> Any:
+        """Return a payload with personal values aliased or redacted."""
+        if isinstance(data, dict):
+            scrubbed = {}
+            for key, value in data.items():
+                if key in ALIASED_KEYS and not isinstance(value, (dict, list)):
+                    scrubbed[key] = self._alias(value, ALIASED_KEYS[key])
+                elif key in REDACTED_KEYS:
+                    scrubbed[key] = REDACTED
+                else:
+                    scrubbed[key] = self.scrub(value)
+            return scrubbed
+        if isinstance(data, list):
+            return [self.scrub(item) for item in data]
+        return data
+
+    def _scrub_path(self, path: str) -> str:
+        """Alias the bed id in a request path."""
+        parts = path.split("/")
+        if len(parts) > 2 and parts[1] == "bed" and parts[2] != "familyStatus":
+            parts[2] = self._alias(parts[2], "bed")
+        return "/".join(parts)
+
+    def _scrub_body(self, body: bytes) -> str:
+        """Return a response body with personal values scrubbed."""
+        if not body:
+            return ""
+        try:
+            return json.dumps(self.scrub(json.loads(body)), separators=(",", ":"))
+        except ValueError:
+            return body.decode(errors="replace")
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        request: Mapping[str, Any],
+        status: int,
+        headers: Mapping[str, str],
+        body: bytes,
+    ) -> None:
+        """Add one request and its response to the recording."""
+        # Responses are scrubbed first so ids are aliased in the order the
+        # integration discovers them.
+        text = self._scrub_body(body)
+        index = self._body_index.get(text)
+        if index is None:
+            index = self._body_index[text] = len(self.bodies)
+            self.bodies.append(text)
+        record = {
+            "t": round(time.monotonic() - self._start, 3),
+            "m": method.lower(),
+            "p": self._scrub_path(path),
+            "s": status,
+            "b": index,
+        }
+        params = {
+            key: value
+            for key, value in (request.get("params") or {}).items()
+            if key != "_k"
+        }
+        if params:
+            # Query values identify sleepers too, as in /sleepData?sleeper=.
+            record["q"] = {key: str(value) for key, value in self.scrub(params).items()}
+        if request.get("json") is not None:
+            record["j"] = self.scrub(request["json"])
+        if "Retry-After" in headers:
+            record["h"] = {"Retry-After": headers["Retry-After"]}
+        self.records.append(record)
+
+    def save(self, path: str) -> None:
+        """Write the recording to a gzipped JSON lines file."""
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            file.write(json.dumps({"version": RECORDING_VERSION}) + "\n")
+            written = 0
+            for record in self.records:
+                # Bodies are written just before the first record using them.
+                while written <= record["b"]:
+                    file.write(
+                        json.dumps({"body": written, "text": self.bodies[written]})
+                        + "\n"
+                    )
+                    written += 1
+                file.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def load_recording(path: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """Read the records and bodies of a recording."""
+    records, bodies = [], []
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        header = json.loads(file.readline())
+        if header.get("version") != RECORDING_VERSION:
+            raise ValueError(f"Unsupported recording version: {header}")
+        for line in file:
+            entry = json.loads(line)
+            if "body" in entry:
+                bodies.append(entry["text"])
+            else:
+                records.append(entry)
+    return records, bodies
+
+
+def _request_key(method: str, path: str, params: Optional[Mapping[str, Any]]) -> Tuple:
+    """Return what identifies a request for replay."""
+    query = tuple(
+        sorted(
+            (key, str(value)) for key, value in (params or {}).items() if key != "_k"
+        )
+    )
+    return method.lower(), path, query
+
+
+class _ReplayResponse:
+    """The parts of an aiohttp response the session reads."""
+
+    def __init__(self, status: int, headers: Mapping[str, str], body: str):
+        self.status = status
+        self.headers = CIMultiDict(headers)
+        self._body = body.encode()
+
+    async def __aenter__(self) -> "_ReplayResponse":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        return None
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class ReplayWebSession:
+    """Answer SleepIQ requests from a recording instead of the network.
+
+    Without a speed, every request gets the next recorded response for the
+    same endpoint. With a speed, a virtual clock runs that many times faster
+    than real time and every request gets the latest response recorded by
+    then, so a full night of polls can be replayed in seconds. ``advance``
+    moves the clock by hand, which with a speed of 0 gives full control.
+    Requests that were never recorded get a 404 for reads and an empty 200
+    for writes.
+    """
+
+    def __init__(
+        self,
+        records: List[Dict[str, Any]],
+        bodies: List[str],
+        speed: Optional[float] = None,
+        base_url: str = API_URL,
+    ):
+        """Initialize the replay."""
+        self._bodies = bodies
+        self._base_url = base_url
+        self._speed = speed
+        self._offset = 0.0
+        self._start = time.monotonic()
+        self._cursors: Dict[Tuple, int] = {}
+        self._responses: Dict[Tuple, List[Dict[str, Any]]] = {}
+        for record in records:
+            key = _request_key(record["m"], record["p"], record.get("q"))
+            self._responses.setdefault(key, []).append(record)
+        self.duration = records[-1]["t"] if records else 0.0
+        self.request_count = 0
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayWebSession":
+        """Create a replay from a recording file."""
+        records, bodies = load_recording(path)
+        return cls(records, bodies, **kwargs)
+
+    @property
+    def now(self) -> float:
+        """Return the virtual time into the recording in seconds."""
+        if self._speed is None:
+            return self._offset
+        return self._offset + (time.monotonic() - self._start) * self._speed
+
+    def advance(self, seconds: float) -> None:
+        """Move the virtual clock forward."""
+        self._offset += seconds
+
+    def _pick(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Return the recorded response to answer a request with."""
+        responses = self._responses.get(key)
+        if not responses:
+            return None
+        if self._speed is None:
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return responses[min(cursor, len(responses) - 1)]
+        now = self.now
+        picked = responses[0]
+        for record in responses:
+            if record["t"] > now:
+                break
+            picked = record
+        return picked
+
+    def request(self, method: str, url: str, params=None, **kwargs) -> _ReplayResponse:
+        """Return the recorded response to a request."""
+        self.request_count += 1
+        path = url[len(self._base_url) :] if url.startswith(self._base_url) else url
+        record = self._pick(_request_key(method, path, params))
+        if record is None:
+            status = 404 if method.lower() == "get" else 200
+            return _ReplayResponse(status, {}, "")
+        return _ReplayResponse(
+            record["s"], record.get("h", {}), self._bodies[record["b"]]
+        )
@@ -1,39 +1,132 @@
 """ Support for SleepIQ sensors """
+import time
+
 from homeassistant import config_entries
-from homeassistant.const import ATTR_ATTRIBUTION
+from homeassistant.const import (
+    ATTR_ATTRIBUTION,
+    DATA_BYTES,
+    DEVICE_CLASS_TIMESTAMP,
+    ENTITY_CATEGORY_DIAGNOSTIC,
+    TIME_MILLISECONDS,
+    TIME_MINUTES,
+)
+from homeassistant.core import callback
 from homeassistant.helpers.entity import Entity
 from homeassistant.helpers import entity_platform
 import voluptuous as vol
 
 from . import SleepIQDataUpdateCoordinator, SleepIQDevice
-from .const import ATTRIBUTION_TEXT, DOMAIN, ICON, LEFT, RIGHT
+from .const import (
+    ATTRIBUTION_TEXT,
+    DIAGNOSTIC_BYTES,
+    DIAGNOSTIC_ERRORS,
+    DIAGNOSTIC_LAST_SUCCESS,
+    DIAGNOSTIC_LATENCY,
+    DIAGNOSTIC_REQUESTS,
+    DIAGNOSTIC_WRITE_INTERVAL,
+    DOMAIN,
+    ICON,
+    LEFT,
+    NIGHTLY_BED_EXITS,
+    NIGHTLY_LONGEST_SLEEP,
+    NIGHTLY_TIME_IN_BED,
+    RIGHT,
+    TIER_CONTROLS,
+    TIER_PROFILE,
+    TIER_STATUS,
+)
+from .models import Sleeper
+
+# Sleeper fields shown on the profile sensor rather than the busy entities.
+PROFILE_ATTRIBUTES = [
+    "firstName",
+    "sleeperId",
+    "bedId",
+    "accountId",
+    "side",
+    "active",
+    "isAccountOwner",
+    "isChild",
+    "gender",
+    "birthMonth",
+    "birthYear",
+    "height",
+    "weight",
+    "sleepGoal",
+    "timezone",
+    "zipCode",
+    "email",
+    "emailValidated",
+    "username",
+    "duration",
+    "firstSessionRecorded",
+    "lastLogin",
+    "licenseVersion",
+    "privacyPolicyVersion",
+]
 
 
 async def async_setup_entry(
     hass, config_entry: config_entries.ConfigEntry, async_add_entities
 ):
 
-    coordinator: SleepIQDataUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    coordinators = hass.data[DOMAIN][config_entry.entry_id]
+    tiers = (
+        coordinators[TIER_STATUS],
+        coordinators[TIER_CONTROLS],
+        coordinators[TIER_PROFILE],
+    )
 
     """Set up sensors from a config entry."""
     sensors = []
-    sensors.append(SleeperSensor(LEFT, coordinator))
-    sensors.append(SleeperSensor(RIGHT, coordinator))
+    for bed_id in coordinators[TIER_STATUS].data:
+        sensors.append(SleeperSensor(bed_id, LEFT, *tiers))
+        sensors.append(SleeperSensor(bed_id, RIGHT, *tiers))
+        sensors.append(SleeperProfileSensor(bed_id, LEFT, coordinators[TIER_PROFILE]))
+        sensors.append(SleeperProfileSensor(bed_id, RIGHT, coordinators[TIER_PROFILE]))
+        for side in (LEFT, RIGHT):
+            for kind in NIGHTLY_SENSORS:
+                sensors.append(
+                    SleeperNightlySensor(bed_id, side, kind, coordinators[TIER_STATUS])
+                )
+    # The counters are per account; they go on the account's first bed.
+    bed_ids = list(coordinators[TIER_STATUS].data)
+    if bed_ids:
+        for kind in DIAGNOSTIC_SENSORS:
+            sensors.append(
+                SleepIQDiagnosticSensor(
+                    config_entry.entry_id, bed_ids[0], kind, coordinators[TIER_STATUS]
+                )
+            )
     async_add_entities(sensors)
 
 
 class SleeperSensor(SleepIQDevice, Entity):
     """Implementation of a SleepIQ sensor."""
 
-    def __init__(self, side: str, coordinator: SleepIQDataUpdateCoordinator):
-        super().__init__(coordinator)
+    def __init__(
+        self,
+        bed_id: str,
+        side: str,
+        coordinator: SleepIQDataUpdateCoordinator,
+        *extra_coordinators: SleepIQDataUpdateCoordinator,
+    ):
+        super().__init__(bed_id, coordinator, *extra_coordinators)
         self._state = None
         self._side = side
+        self.coordinator_fields = [
+            f"{side}_side.isInBed",
+            f"{side}_side.sleepNumber",
+            f"{side}_side.sleeper.firstName",
+            f"{side}_side.sleeper.favorite",
+            f"responsive_air.{side}SideEnabled",
+            f"foot_warming.footWarmingStatus{side.capitalize()}",
+        ]
         self._coordinator = coordinator
         self._unique_id = (
             DOMAIN
             + "_"
-            + self.coordinator.data.bedId
+            + self.bed.bedId
             + "_"
             + side
             + "_sleep_number_sensor"
@@ -42,18 +135,12 @@ class SleeperSensor(SleepIQDevice, Entity):
     @property
     def name(self):
         """ The name of the device """
-        if self._side is LEFT:
-            return self._coordinator.data.left_side.sleeper.firstName + " Sleep Number"
-        else:
-            return self._coordinator.data.right_side.sleeper.firstName + " Sleep Number"
+        return self.view.name + " Sleep Number"
 
     @property
     def state(self):
         """Return the state of the sensor."""
-        if self._side is LEFT:
-            return self._coordinator.data.left_side.sleepNumber
-        else:
-            return self._coordinator.data.right_side.sleepNumber
+        return self.view.sleep_number
 
     @property
     def icon(self):
@@ -68,64 +155,89 @@ class SleeperSensor(SleepIQDevice, Entity):
     @property
     def device_state_attributes(self):
         """Return the state attributes of the device."""
+        return self.view.sleeper_attributes
+
+
+class SleeperProfileSensor(SleepIQDevice, Entity):
+    """The rarely changing profile of the sleeper on one side of a bed."""
+
+    def __init__(
+        self, bed_id: str, side: str, coordinator: SleepIQDataUpdateCoordinator
+    ):
+        super().__init__(bed_id, coordinator)
+        self._side = side
+        self.coordinator_fields = [f"{side}_side.sleeper"]
+        self._coordinator = coordinator
+        self._unique_id = DOMAIN + "_" + bed_id + "_" + side + "_sleeper_profile"
+
+    @property
+    def sleeper(self) -> Sleeper:
+        """Return the sleeper on this side."""
         if self._side is LEFT:
-            return {
-                "sleeper": self._coordinator.data.left_side.sleeper.firstName,
-                "isInBed": self._coordinator.data.left_side.isInBed,
-                "favorite": self._coordinator.data.left_side.sleeper.favorite,
-                "responsive_air": "on"
-                if self._coordinator.data.responsive_air.leftSideEnabled
-                else "off",
-                "foot_warming": "off"
-                if self._coordinator.data.foot_warming.footWarmingStatusLeft == 0
-                else "on",
-                "side": self._coordinator.data.left_side.sleeper.side,
-                "sleepGoal": self._coordinator.data.left_side.sleeper.sleepGoal,
-                "birthMonth": self._coordinator.data.left_side.sleeper.birthMonth,
-                "birthYear": self._coordinator.data.left_side.sleeper.birthYear,
-                "height": self._coordinator.data.left_side.sleeper.height,
-                "weight": self._coordinator.data.left_side.sleeper.weight,
-                "firstSessionRecorded": self._coordinator.data.left_side.sleeper.firstSessionRecorded,
-                "lastLogin": self._coordinator.data.left_side.sleeper.lastLogin,
-                "sleeperID": self._coordinator.data.sleeperLeftId,
-                ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
-            }
-        else:
-            return {
-                "sleeper": self._coordinator.data.right_side.sleeper.firstName,
-                "isInBed": self._coordinator.data.right_side.isInBed,
-                "favorite": self._coordinator.data.right_side.sleeper.favorite,
-                "responsive_air": "on"
-                if self._coordinator.data.responsive_air.rightSideEnabled
-                else "off",
-                "foot_warming": "off"
-                if self._coordinator.data.foot_warming.footWarmingStatusRight == 0
-                else "on",
-                "side": self._coordinator.data.right_side.sleeper.side,
-                "sleepGoal": self._coordinator.data.right_side.sleeper.sleepGoal,
-                "birthMonth": self._coordinator.data.right_side.sleeper.birthMonth,
-                "birthYear": self._coordinator.data.right_side.sleeper.birthYear,
-                "height": self._coordinator.data.right_side.sleeper.height,
-                "weight": self._coordinator.data.right_side.sleeper.weight,
-                "firstSessionRecorded": self._coordinator.data.right_side.sleeper.firstSessionRecorded,
-                "lastLogin": self._coordinator.data.right_side.sleeper.lastLogin,
-                "sleeperID": self._coordinator.data.sleeperRightId,
-                ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
-            }
+            return self.bed.left_side.sleeper
+        return self.bed.right_side.sleeper
+
+    @property
+    def name(self):
+        """ The name of the device """
+        if self.sleeper.firstName is None:
+            return self._side.capitalize() + " sleeper profile"
+        return self.sleeper.firstName + " sleeper profile"
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._unique_id
+
+    @property
+    def state(self):
+        """Return the sleep goal."""
+        return self.sleeper.sleepGoal
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return TIME_MINUTES
+
+    @property
+    def icon(self):
+        """Icon to use in the frontend, if any."""
+        return "mdi:account"
+
+    @property
+    def entity_category(self):
+        """Return the category of the entity."""
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes of the device."""
+        attributes = {
+            name: getattr(self.sleeper, name) for name in PROFILE_ATTRIBUTES
+        }
+        attributes[ATTR_ATTRIBUTION] = ATTRIBUTION_TEXT
+        return attributes
 
 
 class SleepNumberSensor(SleepIQDevice, Entity):
     """Implementation of a SleepIQ sensor."""
 
-    def __init__(self, side: str, coordinator: SleepIQDataUpdateCoordinator):
-        super().__init__(coordinator)
+    def __init__(
+        self, bed_id: str, side: str, coordinator: SleepIQDataUpdateCoordinator
+    ):
+        super().__init__(bed_id, coordinator)
         self._state = None
         self._side = side
+        self.coordinator_fields = [
+            f"{side}_side.sleepNumber",
+            f"{side}_side.sleeper.firstName",
+            f"sleeper{side.capitalize()}Id",
+        ]
         self._coordinator = coordinator
         self._unique_id = (
             DOMAIN
             + "_"
-            + self.coordinator.data.bedId
+            + self.bed.bedId
             + "_"
             + side
             + "_sleep_number_sensor"
@@ -134,18 +246,12 @@ class SleepNumberSensor(SleepIQDevice, Entity):
     @property
     def name(self):
         """ The name of the device """
-        if self._side is LEFT:
-            return self._coordinator.data.left_side.sleeper.firstName + " Sleep Number"
-        else:
-            return self._coordinator.data.right_side.sleeper.firstName + " Sleep Number"
+        return self.view.name + " Sleep Number"
 
     @property
     def state(self):
         """Return the state of the sensor."""
-        if self._side is LEFT:
-            return self._coordinator.data.left_side.sleepNumber
-        else:
-            return self._coordinator.data.right_side.sleepNumber
+        return self.view.sleep_number
 
     @property
     def icon(self):
@@ -160,13 +266,192 @@ class SleepNumberSensor(SleepIQDevice, Entity):
     @property
     def device_state_attributes(self):
         """Return the state attributes of the device."""
-        if self._side is LEFT:
+        return self.view.sleep_number_attributes
+
+
+NIGHTLY_SENSORS = {
+    NIGHTLY_TIME_IN_BED: ("time in bed", TIME_MINUTES, "mdi:bed-clock"),
+    NIGHTLY_BED_EXITS: ("bed exits", "exits", "mdi:exit-run"),
+    NIGHTLY_LONGEST_SLEEP: ("longest sleep", TIME_MINUTES, "mdi:sleep"),
+}
+
+
+class SleeperNightlySensor(SleepIQDevice, Entity):
+    """A running total of the current night for one side of a bed."""
+
+    def __init__(
+        self,
+        bed_id: str,
+        side: str,
+        kind: str,
+        coordinator: SleepIQDataUpdateCoordinator,
+    ):
+        super().__init__(bed_id, coordinator)
+        self._side = side
+        self._kind = kind
+        self._coordinator = coordinator
+        self._suffix, self._unit, self._icon = NIGHTLY_SENSORS[kind]
+        self._unique_id = DOMAIN + "_" + bed_id + "_" + side + "_nightly_" + kind
+        self._written = None
+
+    @callback
+    def _handle_tier_update(self, coordinator: SleepIQDataUpdateCoordinator) -> None:
+        """Write state only when the rounded total changes."""
+        written = (self.available, self.state)
+        if written != self._written:
+            self._written = written
+            self.async_write_ha_state()
+
+    @property
+    def name(self):
+        """ The name of the device """
+        return self.view.name + " " + self._suffix
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._unique_id
+
+    @property
+    def state(self):
+        """Return tonight's total."""
+        return self._coordinator.nightly.value(self._bed_id, self._side, self._kind)
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return self._unit
+
+    @property
+    def icon(self):
+        """Icon to use in the frontend, if any."""
+        return self._icon
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes of the device."""
+        return {"night": self._coordinator.nightly.night}
+
+
+DIAGNOSTIC_SENSORS = {
+    DIAGNOSTIC_LATENCY: ("poll latency", TIME_MILLISECONDS, None, "mdi:timer-outline"),
+    DIAGNOSTIC_REQUESTS: ("API requests", "requests", None, "mdi:counter"),
+    DIAGNOSTIC_BYTES: ("bytes received", DATA_BYTES, None, "mdi:download"),
+    DIAGNOSTIC_ERRORS: ("API errors", "errors", None, "mdi:alert-circle-outline"),
+    DIAGNOSTIC_LAST_SUCCESS: ("last update", None, DEVICE_CLASS_TIMESTAMP, None),
+}
+
+
+class SleepIQDiagnosticSensor(SleepIQDevice, Entity):
+    """Counters and timings of an account, shown on its first bed.
+
+    The per-tier breakdown of the polls is left to the diagnostics download.
+    """
+
+    def __init__(
+        self,
+        entry_id: str,
+        bed_id: str,
+        kind: str,
+        coordinator: SleepIQDataUpdateCoordinator,
+    ):
+        super().__init__(bed_id, coordinator)
+        self._kind = kind
+        self._coordinator = coordinator
+        self._metrics = coordinator.metrics
+        name, self._unit, self._device_class, self._icon = DIAGNOSTIC_SENSORS[kind]
+        self._name = "Sleep Number " + name
+        self._unique_id = DOMAIN + "_" + entry_id + "_diagnostic_" + kind
+        self._written_state = None
+        self._next_write = 0.0
+
+    @callback
+    def _handle_tier_update(self, coordinator: SleepIQDataUpdateCoordinator) -> None:
+        """Write state when the shown value changed, at most every interval.
+
+        A new error count is written straight away.
+        """
+        state = self.state
+        if state == self._written_state:
+            return
+        now = time.monotonic()
+        if self._kind != DIAGNOSTIC_ERRORS and now < self._next_write:
+            return
+        self._written_state = state
+        self._next_write = now + DIAGNOSTIC_WRITE_INTERVAL.total_seconds()
+        self.async_write_ha_state()
+
+    @property
+    def entity_category(self):
+        """Return the category of the entity."""
+        return ENTITY_CATEGORY_DIAGNOSTIC
+
+    @property
+    def name(self):
+        """ The name of the device """
+        return self._name
+
+    @property
+    def unique_id(self):
+        """Return a unique ID."""
+        return self._unique_id
+
+    @property
+    def available(self) -> bool:
+        """Stay available so failures can be seen while the cloud is down."""
+        return True
+
+    @property
+    def state(self):
+        """Return the state of the sensor."""
+        metrics = self._metrics
+        if self._kind == DIAGNOSTIC_LATENCY:
+            last_poll = metrics.last_poll.get(self._coordinator.tier)
+            return int(round(last_poll["total"] * 1000, -1)) if last_poll else None
+        if self._kind == DIAGNOSTIC_REQUESTS:
+            return metrics.request_count
+        if self._kind == DIAGNOSTIC_BYTES:
+            return metrics.bytes_received
+        if self._kind == DIAGNOSTIC_ERRORS:
+            return metrics.error_count
+        if metrics.last_success is None:
+            return None
+        return metrics.last_success.isoformat()
+
+    @property
+    def unit_of_measurement(self):
+        """Return the unit of measurement."""
+        return self._unit
+
+    @property
+    def device_class(self):
+        """Return the class of this sensor."""
+        return self._device_class
+
+    @property
+    def icon(self):
+        """Icon to use in the frontend, if any."""
+        return self._icon
+
+    @property
+    def device_state_attributes(self):
+        """Return the state attributes of the device."""
+        metrics = self._metrics
+        if self._kind == DIAGNOSTIC_REQUESTS:
             return {
-                "sleeperID": self._coordinator.data.sleeperLeftId,
-                ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+                "logins": metrics.login_count,
+                "requests_per_hour": metrics.requests_per_hour,
+                "queue_waits": metrics.queue_waits,
+                "queue_wait_ms": round(metrics.queue_wait_time * 1000, 1),
+                "update_interval": self._coordinator.update_interval.total_seconds(),
             }
-        else:
+        if self._kind == DIAGNOSTIC_ERRORS:
+            failures = self._coordinator.failures
             return {
-                "sleeperID": self._coordinator.data.sleeperRightId,
-                ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+                "retries": metrics.retry_count,
+                "consecutive_failures": failures.failures,
+                "circuit_open": failures.is_open,
+                "last_error": failures.last_error,
+                **metrics.errors,
             }
+        return None
@@ -0,0 +1,67 @@
+"""Persisted bed snapshots for the SleepIQ Custom integration."""
+import logging
+from typing import Any, Dict, Optional
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_SAVE_DELAY, STORAGE_VERSION
+from .models import Bed, to_dict
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class SleepIQSnapshotStore:
+    """Keep the last good beds of an entry in Home Assistant storage.
+
+    The stored format is the beds keyed by bed id, each written with
+    to_dict so empty fields take no space. A save is scheduled only when
+    none is pending, so the polls of every tier within the save delay share
+    one write and frequent polls cannot keep pushing it back.
+    """
+
+    def __init__(self, hass: HomeAssistant, entry_id: str):
+        """Initialize the store."""
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}")
+        self._beds: Dict[str, Bed] = {}
+        self._save_pending = False
+        # Nightly statistics saved along with the beds, and what was restored.
+        self.nightly = None
+        self.restored_nightly: Optional[Dict[str, Any]] = None
+
+    async def async_load(self) -> Optional[Dict[str, Bed]]:
+        """Return the stored beds, or None if there are none."""
+        try:
+            data = await self._store.async_load()
+            if not data:
+                return None
+            self.restored_nightly = data.get("nightly")
+            return {bed_id: Bed.from_dict(bed) for bed_id, bed in data["beds"].items()}
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.warning("Ignoring unreadable SleepIQ snapshot: %s", err)
+            return None
+
+    @callback
+    def async_schedule_save(self, beds: Dict[str, Bed]) -> None:
+        """Save the beds at the end of the pending save delay.
+
+        Store.async_delay_save restarts its timer on every call, so it is
+        only called when no save is pending.
+        """
+        self._beds = beds
+        if not self._save_pending:
+            self._save_pending = True
+            self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Serialize the beds at save time."""
+        self._save_pending = False
+        data = {"beds": {bed_id: to_dict(bed) for bed_id, bed in self._beds.items()}}
+        if self.nightly is not None:
+            data["nightly"] = self.nightly.as_dict()
+        return data
+
+    async def async_remove(self) -> None:
+        """Delete the stored snapshot."""
+        await self._store.async_remove()
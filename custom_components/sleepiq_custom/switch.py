@@ -4,7 +4,13 @@ from homeassistant.const import ATTR_ATTRIBUTION
 from homeassistant.components.switch import SwitchEntity, DEVICE_CLASS_SWITCH
 
 from . import SleepIQDataUpdateCoordinator, SleepIQDevice
-from .const import ATTRIBUTION_TEXT, DOMAIN
+from .const import (
+    ATTRIBUTION_TEXT,
+    COMMAND_PRIVACY_MODE,
+    COMMAND_RESPONSIVE_AIR,
+    DOMAIN,
+    TIER_CONTROLS,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -13,13 +19,16 @@ async def async_setup_entry(
     hass, config_entry: config_entries.ConfigEntry, async_add_entities
 ):
     """Set up a bed from a config entry."""
-    coordinator: SleepIQDataUpdateCoordinator = hass.data[DOMAIN][config_entry.entry_id]
+    coordinator: SleepIQDataUpdateCoordinator = hass.data[DOMAIN][
+        config_entry.entry_id
+    ][TIER_CONTROLS]
 
     switches = []
-    # if coordinator.data.light1 is not None:
-    switches.append(ResponsiveAirSwitch(coordinator, "left"))
-    switches.append(ResponsiveAirSwitch(coordinator, "right"))
-    switches.append(PrivacyModeSwitch(coordinator))
+    for bed_id, bed in coordinator.data.items():
+        switches.append(ResponsiveAirSwitch(bed_id, coordinator, "left"))
+        switches.append(ResponsiveAirSwitch(bed_id, coordinator, "right"))
+        if bed.privacy_mode is not None:
+            switches.append(PrivacyModeSwitch(bed_id, coordinator))
 
     async_add_entities(switches)
 
@@ -27,12 +36,13 @@ async def async_setup_entry(
 class PrivacyModeSwitch(SleepIQDevice, SwitchEntity):
     """Representation of a SleepIQ responsive air switch."""
 
-    def __init__(self, coordinator: SleepIQDataUpdateCoordinator):
+    def __init__(self, bed_id: str, coordinator: SleepIQDataUpdateCoordinator):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(bed_id, coordinator)
         self._coordinator = coordinator
-        self._unique_id = DOMAIN + "_" + self._coordinator.data.bedId + "_privacy_mode"
+        self._unique_id = DOMAIN + "_" + self.bed.bedId + "_privacy_mode"
         self._name = "Sleep Number privacy mode"
+        self.coordinator_fields = ["privacy_mode"]
 
     @property
     def name(self):
@@ -47,10 +57,13 @@ class PrivacyModeSwitch(SleepIQDevice, SwitchEntity):
     @property
     def device_state_attributes(self):
         """Return the state attributes of the device."""
+        privacy_mode = self.bed.privacy_mode
+        if privacy_mode is None:
+            return {ATTR_ATTRIBUTION: ATTRIBUTION_TEXT}
         return {
-            "accountId": self._coordinator.data.privacy_mode.accountId,
-            "bedId": self._coordinator.data.privacy_mode.bedId,
-            "pauseMode": self._coordinator.data.privacy_mode.pauseMode,
+            "accountId": privacy_mode.accountId,
+            "bedId": privacy_mode.bedId,
+            "pauseMode": privacy_mode.pauseMode,
             ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
         }
 
@@ -62,55 +75,60 @@ class PrivacyModeSwitch(SleepIQDevice, SwitchEntity):
     async def async_turn_on(self):
         """Send the on command."""
         _LOGGER.debug("Turning on privacy mode")
-        self._coordinator.data.privacy_mode.pauseMode = "on"
-        await self._coordinator.sleepiq.turn_on_privacy_mode()
+        await self._coordinator.async_send_command(
+            self._bed_id,
+            {"privacy_mode.pauseMode": "on"},
+            self.async_write_ha_state,
+            COMMAND_PRIVACY_MODE,
+            None,
+            "on",
+        )
 
     async def async_turn_off(self, **kwargs):
         """Send the off command."""
         _LOGGER.debug("Turning off privacy mode")
-        self._coordinator.data.privacy_mode.pauseMode = "off"
-        await self._coordinator.sleepiq.turn_off_privacy_mode()
+        await self._coordinator.async_send_command(
+            self._bed_id,
+            {"privacy_mode.pauseMode": "off"},
+            self.async_write_ha_state,
+            COMMAND_PRIVACY_MODE,
+            None,
+            "off",
+        )
 
     @property
     def is_on(self):
         """Get whether the switch is in on state."""
-        if self._coordinator.data.privacy_mode.pauseMode == "off":
+        if self.bed.privacy_mode is None:
+            return None
+        if self.bed.privacy_mode.pauseMode == "off":
             return False
-        elif self._coordinator.data.privacy_mode.pauseMode == "on":
+        elif self.bed.privacy_mode.pauseMode == "on":
             return True
 
 
 class ResponsiveAirSwitch(SleepIQDevice, SwitchEntity):
     """Representation of a SleepIQ responsive air switch."""
 
-    def __init__(self, coordinator: SleepIQDataUpdateCoordinator, side):
+    def __init__(self, bed_id: str, coordinator: SleepIQDataUpdateCoordinator, side):
         """Initialize the sensor."""
-        super().__init__(coordinator)
+        super().__init__(bed_id, coordinator)
         self._coordinator = coordinator
         self._side = side
+        self.coordinator_fields = ["responsive_air"]
         self._unique_id = (
             DOMAIN
             + "_"
-            + self._coordinator.data.bedId
+            + self.bed.bedId
             + "_"
             + self._side
             + "responsive_air"
         )
 
-        if self._side.lower() == "left":
-            self._name = (
-                self._coordinator.data.left_side.sleeper.firstName + " responsive air"
-            )
-        elif self._side.lower() == "right":
-            self._name = (
-                self._coordinator.data.right_side.sleeper.firstName + " responsive air"
-            )
-
     @property
     def name(self):
         """Return the name of the sensor."""
-
-        return self._name
+        return self.view.name + " responsive air"
 
     @property
     def unique_id(self):
@@ -120,16 +138,7 @@ class ResponsiveAirSwitch(SleepIQDevice, SwitchEntity):
     @property
     def device_state_attributes(self):
         """Return the state attributes of the device."""
-        return {
-            "adjustmentThreshold": self._coordinator.data.responsive_air.adjustmentThreshold,
-            "inBedTimeout": self._coordinator.data.responsive_air.inBedTimeout,
-            "leftSideEnabled": self._coordinator.data.responsive_air.leftSideEnabled,
-            "outOfBedTimeout": self._coordinator.data.responsive_air.outOfBedTimeout,
-            "pollFrequency": self._coordinator.data.responsive_air.pollFrequency,
-            "prefSyncState": self._coordinator.data.responsive_air.prefSyncState,
-            "rightSideEnabled": self._coordinator.data.responsive_air.rightSideEnabled,
-            ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
-        }
+        return self.view.responsive_air_attributes
 
     @property
     def device_class(self):
@@ -138,35 +147,29 @@ class ResponsiveAirSwitch(SleepIQDevice, SwitchEntity):
 
     async def async_turn_on(self, **kwargs):
         """Send the on command."""
-        _LOGGER.debug("Turning on %s", self._name)
-
-        if self._side.lower() == "left":
-            self._coordinator.data.responsive_air.leftSideEnabled = True
-        elif self._side.lower() == "right":
-            self._coordinator.data.responsive_air.leftSideEnabled = True
-
-        await self._coordinator.sleepiq.turn_on_responsive_air(self._side)
+        _LOGGER.debug("Turning on %s", self.name)
+        await self._coordinator.async_send_command(
+            self._bed_id,
+            {f"responsive_air.{self._side.lower()}SideEnabled": True},
+            self.async_write_ha_state,
+            COMMAND_RESPONSIVE_AIR,
+            self._side.lower(),
+            True,
+        )
 
     async def async_turn_off(self, **kwargs):
         """Send the off command."""
-        _LOGGER.debug("Turning off %s", self._name)
-        if self._side.lower() == "left":
-            self._coordinator.data.responsive_air.leftSideEnabled = False
-        elif self._side.lower() == "right":
-            self._coordinator.data.responsive_air.leftSideEnabled = False
-        await self._coordinator.sleepiq.turn_off_responsive_air(self._side)
-        # await self.tesla_device.stop_charge()
-        # self.async_write_ha_state()
+        _LOGGER.debug("Turning off %s", self.name)
+        await self._coordinator.async_send_command(
+            self._bed_id,
+            {f"responsive_air.{self._side.lower()}SideEnabled": False},
+            self.async_write_ha_state,
+            COMMAND_RESPONSIVE_AIR,
+            self._side.lower(),
+            False,
+        )
 
     @property
     def is_on(self):
         """Get whether the switch is in on state."""
-        if self._side.lower() == "left":
-            return self._coordinator.data.responsive_air.leftSideEnabled
-        elif self._side.lower() == "right":
-            return self._coordinator.data.responsive_air.rightSideEnabled
-        else:
-            return None
-        # if self.tesla_device.is_charging() is None:
-        #     return None
-        # return self.tesla_device.is_charging()
\ No newline at end of file
+        return self.view.responsive_air
@@ -0,0 +1,148 @@
+"""Per-side views of the beds for the SleepIQ Custom entities."""
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from homeassistant.const import ATTR_ATTRIBUTION
+
+from .const import ATTRIBUTION_TEXT, LEFT, RIGHT
+from .models import Bed
+
+_RESPONSIVE_AIR_FIELDS = {LEFT: "leftSideEnabled", RIGHT: "rightSideEnabled"}
+_FOOT_WARMING_FIELDS = {LEFT: "footWarmingStatusLeft", RIGHT: "footWarmingStatusRight"}
+
+
+def _air_attributes(responsive_air) -> Dict[str, Any]:
+    """Return the responsive air settings shown on both sides' switches."""
+    attributes = {}
+    if responsive_air is not None:
+        attributes = {
+            "adjustmentThreshold": responsive_air.adjustmentThreshold,
+            "inBedTimeout": responsive_air.inBedTimeout,
+            "leftSideEnabled": responsive_air.leftSideEnabled,
+            "outOfBedTimeout": responsive_air.outOfBedTimeout,
+            "pollFrequency": responsive_air.pollFrequency,
+            "prefSyncState": responsive_air.prefSyncState,
+            "rightSideEnabled": responsive_air.rightSideEnabled,
+        }
+    attributes[ATTR_ATTRIBUTION] = ATTRIBUTION_TEXT
+    return attributes
+
+
+class SideView:
+    """What the entities of one side of a bed show.
+
+    Every value and attribute mapping is worked out once, when the view is
+    built for a bed, and a view is never changed afterwards: a replaced bed
+    gets new views. The attribute mappings are shared by every write of the
+    entities that show them and must not be changed.
+    """
+
+    __slots__ = (
+        "side",
+        "sleeper",
+        "name",
+        "sleep_number",
+        "occupied",
+        "responsive_air",
+        "foot_warming",
+        "sleeper_attributes",
+        "presence_attributes",
+        "sleep_number_attributes",
+        "responsive_air_attributes",
+    )
+
+    def __init__(
+        self,
+        bed: Bed,
+        side: str,
+        air_attributes: Optional[Dict[str, Any]] = None,
+    ):
+        """Initialize the view of a side of a bed.
+
+        Both sides show the same responsive air attributes, so the caller
+        can build them once for the bed.
+        """
+        part = bed.left_side if side == LEFT else bed.right_side
+        sleeper = part.sleeper
+        responsive_air = None
+        if bed.responsive_air is not None:
+            responsive_air = getattr(bed.responsive_air, _RESPONSIVE_AIR_FIELDS[side])
+        foot_warming = None
+        if bed.foot_warming is not None:
+            foot_warming = getattr(bed.foot_warming, _FOOT_WARMING_FIELDS[side])
+
+        self.side = side
+        self.sleeper: Optional[str] = sleeper.firstName
+        self.name: str = sleeper.firstName or f"{side.capitalize()} side"
+        self.sleep_number: Optional[int] = part.sleepNumber
+        # isInBed after the occupancy filter.
+        self.occupied: Optional[bool] = (
+            part.isInBed if part.occupied is None else part.occupied
+        )
+        self.responsive_air: Optional[bool] = responsive_air
+        self.foot_warming: Optional[int] = foot_warming
+        self.sleeper_attributes: Dict[str, Any] = {
+            "sleeper": sleeper.firstName,
+            "isInBed": part.isInBed,
+            "favorite": sleeper.favorite,
+            "responsive_air": "on" if responsive_air else "off",
+            "foot_warming": "on" if foot_warming else "off",
+            ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+        }
+        self.presence_attributes: Dict[str, Any] = {
+            "sleeper": sleeper.firstName,
+            "last_transition": part.occupied_changed,
+            ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+        }
+        self.sleep_number_attributes: Dict[str, Any] = {
+            "sleeperID": bed.sleeperLeftId if side == LEFT else bed.sleeperRightId,
+            ATTR_ATTRIBUTION: ATTRIBUTION_TEXT,
+        }
+        if air_attributes is None:
+            air_attributes = _air_attributes(bed.responsive_air)
+        self.responsive_air_attributes: Dict[str, Any] = air_attributes
+
+
+class SideViews(Dict[Tuple[str, str], SideView]):
+    """The views of every side of an account's beds, keyed by (bed id, side).
+
+    The tiers of an entry share one instance and update it after every
+    refresh. Beds and their parts are replaced rather than changed in
+    place, so an unchanged bed keeps its views and a replaced one gets new
+    views in their place, except for a side whose part, responsive air,
+    foot warming and sleeper id are all the same as before. Entities look
+    theirs up on every write.
+    """
+
+    def __init__(self):
+        """Initialize the views."""
+        super().__init__()
+        self._beds: Dict[str, Bed] = {}
+
+    def update(self, beds: Optional[Mapping[str, Bed]]) -> None:
+        """Build the views of the beds that were replaced."""
+        known = self._beds
+        for bed_id, bed in (beds or {}).items():
+            old = known.get(bed_id)
+            if old is bed:
+                continue
+            known[bed_id] = bed
+            controls_kept = (
+                old is not None
+                and old.responsive_air is bed.responsive_air
+                and old.foot_warming is bed.foot_warming
+            )
+            if controls_kept:
+                air_attributes = self[(bed_id, LEFT)].responsive_air_attributes
+            else:
+                air_attributes = _air_attributes(bed.responsive_air)
+            for side, part, sleeper_id in (
+                (LEFT, "left_side", "sleeperLeftId"),
+                (RIGHT, "right_side", "sleeperRightId"),
+            ):
+                if (
+                    controls_kept
+                    and getattr(old, part) is getattr(bed, part)
+                    and getattr(old, sleeper_id) == getattr(bed, sleeper_id)
+                ):
+                    continue
+                self[(bed_id, side)] = SideView(bed, side, air_attributes)
@@ -0,0 +1 @@
+"""Tests for the SleepIQ Custom integration."""
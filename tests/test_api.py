@@ -0,0 +1,208 @@
+"""Tests for the SleepIQ session and client against a local server."""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+from homeassistant.core import HomeAssistant
+import pytest
+
+from custom_components.sleepiq_custom import api, create_coordinators, light, switch
+from custom_components.sleepiq_custom.const import (
+    DOMAIN,
+    SESSION_REFRESH_MARGIN,
+    SESSION_TTL,
+    TIER_CONTROLS,
+)
+from custom_components.sleepiq_custom.coordinator import SleepIQPollingEngine
+
+PASSWORD = "secret"
+BED = {"bedId": "bed", "sleeperLeftId": "1", "sleeperRightId": "2"}
+
+
+class FakeSleepIQ:
+    """A SleepIQ API with one bed that has two outlets but no foundation."""
+
+    def __init__(self):
+        self.keys = set()
+        self.logins = 0
+        self.app = web.Application()
+        self.app.router.add_put("/login", self.login)
+        self.app.router.add_get("/bed", self.answer({"beds": [BED]}))
+        self.app.router.add_get("/sleeper", self.answer({"sleepers": []}))
+        self.app.router.add_get("/bed/bed/foundation/outlet", self.outlet)
+        self.app.router.add_get(
+            "/bed/bed/responsiveAir",
+            self.answer({"leftSideEnabled": True, "rightSideEnabled": False}),
+        )
+        self.app.router.add_get("/bed/bed/{missing:.*}", self.answer(None))
+
+    async def login(self, request):
+        body = await request.json()
+        if body["password"] != PASSWORD:
+            return web.Response(status=401)
+        self.logins += 1
+        key = f"key{self.logins}"
+        self.keys.add(key)
+        return web.json_response({"key": key, "userId": "-42"})
+
+    def answer(self, payload):
+        """Return a handler answering a valid key with the payload, or 404."""
+
+        async def handler(request):
+            if request.query.get("_k") not in self.keys:
+                return web.Response(status=401)
+            if payload is None:
+                return web.Response(status=404)
+            return web.json_response(payload)
+
+        return handler
+
+    async def outlet(self, request):
+        outlet = int(request.query["outletId"])
+        payload = {"bedId": "bed", "outlet": outlet, "setting": 0}
+        return await self.answer(payload if outlet <= 2 else None)(request)
+
+
+class Clock:
+    """A monotonic clock the test moves by hand."""
+
+    def __init__(self, monkeypatch):
+        self.now = 0.0
+        monkeypatch.setattr(
+            api,
+            "time",
+            SimpleNamespace(monotonic=lambda: self.now, perf_counter=time.perf_counter),
+        )
+
+
+def _run(test, password=PASSWORD):
+    """Run a test coroutine with a session talking to a fresh server."""
+    fake = FakeSleepIQ()
+
+    async def run():
+        server = TestServer(fake.app)
+        await server.start_server()
+        session = api.SleepIQSession(
+            "user",
+            password,
+            ClientSession(),
+            base_url=f"http://{server.host}:{server.port}",
+        )
+        try:
+            return await test(fake, session)
+        finally:
+            await session.async_close()
+            await server.close()
+
+    return asyncio.run(run())
+
+
+def test_login_is_reused(monkeypatch):
+    """Requests log in once and then reuse the key."""
+    Clock(monkeypatch)
+
+    async def test(fake, session):
+        client = api.SleepIQClient(session)
+        await client.get_beds()
+        await client.get_sleepers()
+        return fake.logins, session.login_count, session.is_valid
+
+    assert _run(test) == (1, 1, True)
+
+
+def test_rejected_login(monkeypatch):
+    """Wrong credentials raise an auth error and cache nothing."""
+    Clock(monkeypatch)
+
+    async def test(fake, session):
+        with pytest.raises(api.SleepIQAuthError):
+            await session.async_request("get", "/bed")
+        return session.is_valid
+
+    assert _run(test, password="wrong") is False
+
+
+def test_session_refreshes_before_it_expires(monkeypatch):
+    """A login is renewed once it is within the margin of its lifetime."""
+    clock = Clock(monkeypatch)
+    renew = (SESSION_TTL - SESSION_REFRESH_MARGIN).total_seconds()
+
+    async def test(fake, session):
+        await session.async_request("get", "/bed")
+        clock.now = renew - 1
+        await session.async_request("get", "/bed")
+        before = fake.logins
+        clock.now = renew
+        await session.async_request("get", "/bed")
+        return before, fake.logins
+
+    assert _run(test) == (1, 2)
+
+
+def test_expired_session_logs_in_once(monkeypatch):
+    """Concurrent requests rejected with a stale key share one new login."""
+    Clock(monkeypatch)
+
+    async def test(fake, session):
+        await session.async_request("get", "/bed")
+        fake.keys.clear()
+        results = await asyncio.gather(
+            *(session.async_request("get", "/bed") for _ in range(3))
+        )
+        return fake.logins, session.metrics.retry_count, results
+
+    logins, retries, results = _run(test)
+    assert logins == 2
+    assert retries == 3
+    assert all(result["beds"][0]["bedId"] == "bed" for result in results)
+
+
+def test_missing_parts(monkeypatch):
+    """A bed without a foundation or privacy mode still sets up."""
+    Clock(monkeypatch)
+
+    async def test(fake, session):
+        hass = HomeAssistant()
+        client = api.SleepIQClient(session)
+        coordinators = create_coordinators(hass, client, SleepIQPollingEngine(hass))
+        await coordinators[TIER_CONTROLS].async_refresh()
+        assert coordinators[TIER_CONTROLS].last_update_success
+        hass.data[DOMAIN] = {"entry": coordinators}
+        entities = []
+        entry = SimpleNamespace(entry_id="entry")
+        for platform in (light, switch):
+            await platform.async_setup_entry(hass, entry, entities.extend)
+        for coordinator in coordinators.values():
+            coordinator.cancel_commands()
+        return client.beds["bed"], entities
+
+    bed, entities = _run(test)
+    assert bed.foundation is None
+    assert bed.privacy_mode is None
+    assert bed.foot_warming is None
+    lights = [
+        entity for entity in entities if isinstance(entity, light.SleepIQNightLight)
+    ]
+    assert sorted(entity._outletid for entity in lights) == [1, 2]
+    assert all(entity.brightness is None for entity in lights)
+    assert not any(isinstance(entity, switch.PrivacyModeSwitch) for entity in entities)
+    assert [
+        entity.is_on
+        for entity in entities
+        if isinstance(entity, switch.ResponsiveAirSwitch)
+    ] == [True, False]
+
+
+def test_close(monkeypatch):
+    """Closing the session closes its web session."""
+    Clock(monkeypatch)
+
+    async def test(fake, session):
+        await session.async_request("get", "/bed")
+        websession = session._websession
+        await session.async_close()
+        return websession.closed
+
+    assert _run(test) is True
@@ -0,0 +1,141 @@
+"""Tests for the coalescing SleepIQ command queue."""
+import asyncio
+from datetime import timedelta
+import time
+
+import pytest
+
+from custom_components.sleepiq_custom.api import SleepIQNetworkError
+from custom_components.sleepiq_custom.commands import SUPERSEDED, SleepIQCommandQueue
+from custom_components.sleepiq_custom.const import (
+    COMMAND_RESPONSIVE_AIR,
+    COMMAND_SLEEP_NUMBER,
+    LEFT,
+    RIGHT,
+)
+
+DEBOUNCE = timedelta(seconds=0.05)
+SPACING = timedelta(seconds=0.1)
+
+
+class FakeClient:
+    """Record the commands that reach the API, and when."""
+
+    def __init__(self):
+        self.sent = []
+        self.release = None
+        self.error = None
+
+    async def _send(self, *call):
+        self.sent.append((time.monotonic(), call))
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+        if self.release is not None:
+            await self.release.wait()
+
+    async def set_sleepnumber(self, bed_id, side, number):
+        await self._send("sleep_number", side, number)
+
+    async def set_responsive_air(self, bed_id, sides):
+        await self._send("responsive_air", sides)
+
+
+def _queue(client):
+    return SleepIQCommandQueue(client, "bed", debounce=DEBOUNCE, spacing=SPACING)
+
+
+def test_same_target_is_coalesced():
+    """Only the last command for a target is sent."""
+    client = FakeClient()
+
+    async def run():
+        queue = _queue(client)
+        start = time.monotonic()
+        first = queue.submit(COMMAND_SLEEP_NUMBER, LEFT, 30)
+        second = queue.submit(COMMAND_SLEEP_NUMBER, LEFT, 40)
+        results = await asyncio.gather(first, second)
+        return queue, start, results
+
+    queue, start, results = asyncio.run(run())
+
+    assert results == [SUPERSEDED, None]
+    assert [call for _, call in client.sent] == [("sleep_number", LEFT, 40)]
+    # The queue waited for the burst to finish before sending.
+    assert client.sent[0][0] - start >= DEBOUNCE.total_seconds()
+    assert (queue.submitted_count, queue.sent_count) == (2, 1)
+
+
+def test_different_targets_are_spaced():
+    """Commands for different targets are all sent, spaced apart."""
+    client = FakeClient()
+
+    async def run():
+        queue = _queue(client)
+        return await asyncio.gather(
+            queue.submit(COMMAND_SLEEP_NUMBER, LEFT, 30),
+            queue.submit(COMMAND_SLEEP_NUMBER, RIGHT, 50),
+        )
+
+    assert asyncio.run(run()) == [None, None]
+    assert [call for _, call in client.sent] == [
+        ("sleep_number", LEFT, 30),
+        ("sleep_number", RIGHT, 50),
+    ]
+    assert client.sent[1][0] - client.sent[0][0] >= SPACING.total_seconds()
+
+
+def test_responsive_air_sides_share_a_request():
+    """Responsive air for both sides goes out as one request."""
+    client = FakeClient()
+
+    async def run():
+        queue = _queue(client)
+        return await asyncio.gather(
+            queue.submit(COMMAND_RESPONSIVE_AIR, LEFT, True),
+            queue.submit(COMMAND_RESPONSIVE_AIR, RIGHT, False),
+        )
+
+    assert asyncio.run(run()) == [None, None]
+    assert [call for _, call in client.sent] == [
+        ("responsive_air", {LEFT: True, RIGHT: False})
+    ]
+
+
+def test_cancel_fails_in_flight_commands():
+    """Cancelling the queue during a send cancels the waiting callers."""
+    client = FakeClient()
+
+    async def run():
+        client.release = asyncio.Event()
+        queue = _queue(client)
+        sending = queue.submit(COMMAND_SLEEP_NUMBER, LEFT, 30)
+        queued = queue.submit(COMMAND_SLEEP_NUMBER, RIGHT, 50)
+        while not client.sent:
+            await asyncio.sleep(0.01)
+        queue.cancel()
+        for future in (sending, queued):
+            with pytest.raises(asyncio.CancelledError):
+                await future
+
+    asyncio.run(run())
+    assert [call for _, call in client.sent] == [("sleep_number", LEFT, 30)]
+
+
+def test_send_failure_reaches_the_callers():
+    """A failed request fails its callers and the queue moves on."""
+    client = FakeClient()
+    client.error = SleepIQNetworkError("Bed unreachable")
+
+    async def run():
+        queue = _queue(client)
+        return await asyncio.gather(
+            queue.submit(COMMAND_SLEEP_NUMBER, LEFT, 30),
+            queue.submit(COMMAND_SLEEP_NUMBER, RIGHT, 50),
+            return_exceptions=True,
+        )
+
+    failed, sent = asyncio.run(run())
+    assert isinstance(failed, SleepIQNetworkError)
+    assert sent is None
+    assert len(client.sent) == 2
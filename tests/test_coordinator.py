@@ -0,0 +1,381 @@
+"""Tests for the SleepIQ coordinators."""
+import asyncio
+from dataclasses import replace
+from datetime import timedelta
+import random
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+import pytest
+
+from custom_components.sleepiq_custom import coordinator, create_coordinators
+from custom_components.sleepiq_custom.api import ERROR_AUTH, ERROR_NETWORK
+from custom_components.sleepiq_custom.const import (
+    BACKOFF_INITIAL,
+    BACKOFF_JITTER,
+    BACKOFF_MAX,
+    BURST_STATUS,
+    CIRCUIT_PROBE_INTERVAL,
+    CIRCUIT_THRESHOLD,
+    COMMAND_BOOST_WINDOW,
+    COMMAND_SLEEP_NUMBER,
+    IDLE_BACKOFF_FACTOR,
+    LEFT,
+    TIER_CONTROLS,
+    TIER_STATUS,
+    TRANSITION_BOOST_WINDOW,
+)
+from custom_components.sleepiq_custom.models import (
+    Bed,
+    BedSnapshot,
+    PrivacyMode,
+    Side,
+    with_path,
+)
+
+BASE = timedelta(seconds=10)
+MIN = timedelta(seconds=3)
+MAX = timedelta(seconds=60)
+
+
+class Clock:
+    """A monotonic clock the test moves by hand."""
+
+    def __init__(self, monkeypatch):
+        self.now = 0.0
+        monkeypatch.setattr(
+            coordinator, "time", SimpleNamespace(monotonic=lambda: self.now)
+        )
+
+
+def _occupied(left, right=False, pause="off"):
+    """Return one bed with the in-bed readings and pause mode."""
+    return {
+        "bed": Bed(
+            bedId="bed",
+            left_side=Side(isInBed=left),
+            right_side=Side(isInBed=right),
+            privacy_mode=PrivacyMode(pauseMode=pause),
+        )
+    }
+
+
+def test_base_interval_while_in_bed(monkeypatch):
+    """Someone in bed keeps the tier at its base interval."""
+    Clock(monkeypatch)
+    scheduler = coordinator.AdaptiveScheduler(BASE, MIN, MAX)
+    assert scheduler.next_interval(_occupied(True)) == BASE
+    assert scheduler.next_interval(_occupied(True)) == BASE
+    # Without beds there is nothing to adapt to.
+    assert scheduler.next_interval({}) == BASE
+
+
+def test_idle_backoff_up_to_the_maximum(monkeypatch):
+    """An empty bed backs off by the idle factor until the maximum."""
+    Clock(monkeypatch)
+    scheduler = coordinator.AdaptiveScheduler(BASE, MIN, MAX)
+    intervals = [scheduler.next_interval(_occupied(False)) for _ in range(6)]
+    assert intervals[:3] == [
+        BASE * IDLE_BACKOFF_FACTOR,
+        BASE * IDLE_BACKOFF_FACTOR**2,
+        BASE * IDLE_BACKOFF_FACTOR**3,
+    ]
+    assert intervals[-1] == MAX
+    assert max(intervals) == MAX
+
+
+def test_paused_bed_polls_at_the_maximum(monkeypatch):
+    """A bed in privacy mode goes straight to the maximum interval."""
+    Clock(monkeypatch)
+    scheduler = coordinator.AdaptiveScheduler(BASE, MIN, MAX)
+    assert scheduler.next_interval(_occupied(True, pause="on")) == MAX
+
+
+def test_transition_boost(monkeypatch):
+    """A change of occupancy polls at the minimum for the boost window."""
+    clock = Clock(monkeypatch)
+    scheduler = coordinator.AdaptiveScheduler(BASE, MIN, MAX)
+    for _ in range(4):
+        scheduler.next_interval(_occupied(False))
+    assert scheduler.next_interval(_occupied(True)) == MIN
+
+    clock.now = TRANSITION_BOOST_WINDOW.total_seconds() - 1
+    assert scheduler.next_interval(_occupied(True)) == MIN
+    clock.now = TRANSITION_BOOST_WINDOW.total_seconds()
+    assert scheduler.next_interval(_occupied(True)) == BASE
+
+
+def test_command_boost(monkeypatch):
+    """A command polls at the minimum for the command window, even idle."""
+    clock = Clock(monkeypatch)
+    scheduler = coordinator.AdaptiveScheduler(BASE, MIN, MAX)
+    scheduler.next_interval(_occupied(False, pause="on"))
+    scheduler.note_command()
+    assert scheduler.next_interval(_occupied(False, pause="on")) == MIN
+
+    clock.now = COMMAND_BOOST_WINDOW.total_seconds()
+    assert scheduler.next_interval(_occupied(False, pause="on")) == MAX
+
+
+def test_intervals_are_clamped(monkeypatch):
+    """The interval stays within the minimum and maximum."""
+    Clock(monkeypatch)
+    scheduler = coordinator.AdaptiveScheduler(
+        timedelta(seconds=2), timedelta(seconds=5), timedelta(seconds=6)
+    )
+    # 2 s backed off to 3 s is still below the minimum, 7.5 s above the max.
+    assert scheduler.next_interval(_occupied(False)) == timedelta(seconds=5)
+    assert scheduler.next_interval(_occupied(False)) == timedelta(seconds=6)
+    # The base interval of an occupied bed is below the minimum as well.
+    scheduler = coordinator.AdaptiveScheduler(
+        timedelta(seconds=2), timedelta(seconds=5), timedelta(seconds=6)
+    )
+    assert scheduler.next_interval(_occupied(True)) == timedelta(seconds=5)
+
+
+def _no_jitter(monkeypatch, factor=1.0):
+    """Replace the jitter with a fixed factor."""
+    monkeypatch.setattr(
+        coordinator, "random", SimpleNamespace(uniform=lambda low, high: factor)
+    )
+
+
+def test_backoff_doubles_up_to_the_cap(monkeypatch):
+    """Each failure doubles the delay until the circuit opens."""
+    _no_jitter(monkeypatch)
+    policy = coordinator.FailurePolicy("test")
+    delays = [
+        policy.record_failure(ERROR_NETWORK) for _ in range(CIRCUIT_THRESHOLD - 1)
+    ]
+    assert delays == [
+        min(BACKOFF_INITIAL * 2**attempt, BACKOFF_MAX)
+        for attempt in range(CIRCUIT_THRESHOLD - 1)
+    ]
+    assert not policy.is_open
+
+
+def test_backoff_is_capped(monkeypatch):
+    """The delay never grows past the maximum backoff."""
+    _no_jitter(monkeypatch)
+    monkeypatch.setattr(coordinator, "CIRCUIT_THRESHOLD", 100)
+    policy = coordinator.FailurePolicy("test")
+    delays = [policy.record_failure(ERROR_NETWORK) for _ in range(20)]
+    assert max(delays) == BACKOFF_MAX
+    assert delays[-1] == BACKOFF_MAX
+
+
+def test_jitter_bounds(monkeypatch):
+    """The jitter stays within its fraction of the delay."""
+    monkeypatch.setattr(coordinator, "random", random.Random(1))
+    for _ in range(200):
+        policy = coordinator.FailurePolicy("test")
+        delay = policy.record_failure(ERROR_NETWORK)
+        assert BACKOFF_INITIAL * (1 - BACKOFF_JITTER) <= delay
+        assert delay <= BACKOFF_INITIAL * (1 + BACKOFF_JITTER)
+
+    _no_jitter(monkeypatch, 1 - BACKOFF_JITTER)
+    policy = coordinator.FailurePolicy("test")
+    assert policy.record_failure(ERROR_NETWORK) == BACKOFF_INITIAL * (
+        1 - BACKOFF_JITTER
+    )
+
+
+def test_circuit_opens_at_threshold(monkeypatch):
+    """The circuit opens on the threshold failure and then only probes."""
+    _no_jitter(monkeypatch)
+    policy = coordinator.FailurePolicy("test")
+    for _ in range(CIRCUIT_THRESHOLD - 1):
+        policy.record_failure(ERROR_NETWORK)
+    assert not policy.is_open
+
+    assert policy.record_failure(ERROR_NETWORK) == CIRCUIT_PROBE_INTERVAL
+    assert policy.is_open
+    assert policy.failures == CIRCUIT_THRESHOLD
+    assert policy.last_error == ERROR_NETWORK
+    # Further failures keep probing at the same interval.
+    assert policy.record_failure(ERROR_NETWORK) == CIRCUIT_PROBE_INTERVAL
+
+
+def test_circuit_opens_on_auth_rejection(monkeypatch):
+    """Rejected credentials open the circuit on the first failure."""
+    _no_jitter(monkeypatch)
+    policy = coordinator.FailurePolicy("test")
+    assert policy.record_failure(ERROR_AUTH) == CIRCUIT_PROBE_INTERVAL
+    assert policy.is_open
+    assert policy.last_error == ERROR_AUTH
+
+
+def test_retry_after_stretches_the_delay(monkeypatch):
+    """A Retry-After longer than the backoff is honored."""
+    _no_jitter(monkeypatch)
+    policy = coordinator.FailurePolicy("test")
+    delay = policy.record_failure(ERROR_NETWORK, retry_after=120)
+    assert delay.total_seconds() == 120
+    # A shorter one does not shorten the backoff.
+    delay = policy.record_failure(ERROR_NETWORK, retry_after=1)
+    assert delay == BACKOFF_INITIAL * 2
+
+
+def test_success_resets(monkeypatch):
+    """A successful poll closes the circuit and restarts the backoff."""
+    _no_jitter(monkeypatch)
+    policy = coordinator.FailurePolicy("test")
+    for _ in range(CIRCUIT_THRESHOLD):
+        policy.record_failure(ERROR_NETWORK)
+    assert policy.is_open
+
+    policy.record_success()
+    assert not policy.is_open
+    assert policy.failures == 0
+    assert policy.last_error is None
+    assert policy.record_failure(ERROR_NETWORK) == BACKOFF_INITIAL
+
+
+def _coordinator(hass, beds, tier=TIER_STATUS):
+    """Return a tier of an entry whose client holds the beds."""
+    client = SimpleNamespace(
+        beds=BedSnapshot(beds), session=SimpleNamespace(), metrics=SimpleNamespace()
+    )
+    return coordinator.SleepIQDataUpdateCoordinator(
+        hass, client, tier, coordinator.SleepIQPollingEngine(hass)
+    )
+
+
+def test_cancelled_command_releases_its_override():
+    """A command cancelled before it is sent stops showing its value."""
+    shown = []
+
+    async def run():
+        tier = _coordinator(
+            HomeAssistant(), {"bed": Bed(bedId="bed", left_side=Side(sleepNumber=40))}
+        )
+
+        def write_state():
+            shown.append(tier.data["bed"].left_side.sleepNumber)
+
+        command = asyncio.ensure_future(
+            tier.async_send_command(
+                "bed",
+                {"left_side.sleepNumber": 60},
+                write_state,
+                COMMAND_SLEEP_NUMBER,
+                LEFT,
+                60,
+            )
+        )
+        await asyncio.sleep(0)
+        tier.cancel_commands()
+        with pytest.raises(asyncio.CancelledError):
+            await command
+        return tier
+
+    tier = asyncio.run(run())
+    assert shown == [60, 40]
+    assert len(tier.overrides) == 0
+
+
+def test_settle_burst_only_for_unseen_adjustments():
+    """A sleep number another tier already followed starts no settle burst."""
+    started = []
+
+    async def run():
+        hass = HomeAssistant()
+        client = SimpleNamespace(
+            beds=BedSnapshot({"bed": Bed(bedId="bed", left_side=Side(sleepNumber=40))}),
+            session=SimpleNamespace(),
+            metrics=SimpleNamespace(),
+        )
+        tiers = create_coordinators(
+            hass, client, coordinator.SleepIQPollingEngine(hass)
+        )
+        status, controls = tiers[TIER_STATUS], tiers[TIER_CONTROLS]
+        status.async_start_burst = lambda bed_id, resource, done: started.append(
+            resource
+        )
+        status._diff(status.beds)
+
+        # A burst of the controls tier follows the bed to 60.
+        client.beds = client.beds.with_beds(
+            {"bed": with_path(client.beds["bed"], "left_side.sleepNumber", 60)}
+        )
+        controls.async_notify_changes()
+        status._detect_adjustments(status.beds)
+        assert started == []
+
+        # Nobody followed the change to 70.
+        client.beds = client.beds.with_beds(
+            {"bed": with_path(client.beds["bed"], "left_side.sleepNumber", 70)}
+        )
+        status._detect_adjustments(status.beds)
+        assert started == [BURST_STATUS]
+
+    asyncio.run(run())
+
+
+def test_diff_records_changed_fields():
+    """Only the leaves that differ from the last refresh are recorded."""
+
+    async def run():
+        bed = Bed(bedId="bed", left_side=Side(sleepNumber=40))
+        tier = _coordinator(HomeAssistant(), {"bed": bed})
+        first = BedSnapshot({"bed": bed})
+        tier._diff(first)
+        # Everything counts as changed on the first refresh.
+        assert tier.changed_fields is None
+        assert tier.fields_changed("bed", ["right_side"])
+
+        second = first.with_beds({"bed": with_path(bed, "left_side.sleepNumber", 50)})
+        tier._diff(second)
+        assert tier.changed_fields == {"bed.left_side.sleepNumber"}
+
+        # The same snapshot again changes nothing.
+        tier._diff(second)
+        assert tier.changed_fields == set()
+
+        # An equal part that was rebuilt is not a change.
+        tier._diff(
+            second.with_beds(
+                {"bed": replace(second["bed"], right_side=Side(), status=None)}
+            )
+        )
+        assert tier.changed_fields == set()
+
+    asyncio.run(run())
+
+
+def test_diff_added_and_failed():
+    """A new bed changes all its fields; a failed refresh changes everything."""
+
+    async def run():
+        bed = Bed(bedId="bed")
+        tier = _coordinator(HomeAssistant(), {"bed": bed})
+        first = BedSnapshot({"bed": bed})
+        tier._diff(first)
+        tier._diff(first.with_beds({"other": Bed(bedId="other")}))
+        assert "other.bedId" in tier.changed_fields
+        assert "other.left_side.sleepNumber" in tier.changed_fields
+        assert not any(path.startswith("bed.") for path in tier.changed_fields)
+
+        tier.last_update_success = False
+        tier._diff(first)
+        assert tier.changed_fields is None
+
+    asyncio.run(run())
+
+
+def test_fields_changed_matches_whole_path_parts():
+    """A path matches itself and what is below it, not longer names."""
+
+    async def run():
+        tier = _coordinator(HomeAssistant(), {})
+        tier.changed_fields = {"bed.left_side.sleeper.favorite"}
+        assert tier.fields_changed("bed", ["left_side.sleeper"])
+        assert tier.fields_changed("bed", ["right_side", "left_side"])
+        assert tier.fields_changed("bed", ["left_side.sleeper.favorite"])
+        assert not tier.fields_changed("bed", ["left_side.sleeper.fav"])
+        assert not tier.fields_changed("bed", ["right_side"])
+        assert not tier.fields_changed("other", ["left_side"])
+        # Entities without paths always update.
+        assert tier.fields_changed("bed", None)
+
+    asyncio.run(run())
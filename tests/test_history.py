@@ -0,0 +1,103 @@
+"""Tests for importing the sleep history into long-term statistics."""
+import asyncio
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+from homeassistant.components.recorder.const import DATA_INSTANCE
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+from custom_components.sleepiq_custom import history
+from custom_components.sleepiq_custom.models import Bed, Side, Sleeper
+
+TODAY = datetime(2021, 3, 10, 12, tzinfo=timezone.utc)
+
+
+class FakeStore:
+    """A Store that keeps the saved data."""
+
+    def __init__(self, hass, version, key):
+        self.saved = None
+
+    async def async_load(self):
+        return None
+
+    def async_delay_save(self, data_func, delay):
+        self.saved = data_func()
+
+
+class FakeRecorder:
+    """The recorder's queue of external statistics."""
+
+    def __init__(self, fail=()):
+        self.fail = fail
+        self.statistics = {}
+
+    def async_external_statistics(self, metadata, statistics):
+        if any(sleeper in metadata["statistic_id"] for sleeper in self.fail):
+            raise HomeAssistantError("Recorder rejected the statistics")
+        self.statistics[metadata["statistic_id"]] = statistics
+
+
+def _client(*sleeper_ids):
+    """Return a client whose bed has the sleepers, each with one night."""
+
+    async def get_sleep_data(sleeper_id, month):
+        if month != "2021-03-01":
+            return {"sleepDataDays": []}
+        return {
+            "sleepDataDays": [
+                {
+                    "date": "2021-03-08",
+                    "sessions": [{"longest": True, "sleepIQScore": 80, "inBed": 28800}],
+                }
+            ]
+        }
+
+    sides = [Side(sleeper=Sleeper(sleeperId=sleeper_id)) for sleeper_id in sleeper_ids]
+    bed = Bed(bedId="bed", left_side=sides[0], right_side=sides[-1])
+    return SimpleNamespace(beds={"bed": bed}, get_sleep_data=get_sleep_data)
+
+
+def _import(monkeypatch, client, recorder):
+    """Run an import and return the importer."""
+    monkeypatch.setattr(history, "Store", FakeStore)
+    monkeypatch.setattr(dt_util, "now", lambda: TODAY)
+
+    async def run():
+        hass = HomeAssistant()
+        hass.config.components.add("recorder")
+        hass.data[DATA_INSTANCE] = recorder
+        importer = history.SleepIQHistoryImporter(hass, client, "entry")
+        await importer.async_import()
+        return importer
+
+    return asyncio.run(run())
+
+
+def test_negative_sleeper_id(monkeypatch):
+    """A negative sleeper id still makes a valid statistic id."""
+    recorder = FakeRecorder()
+    importer = _import(monkeypatch, _client("-1001"), recorder)
+
+    assert set(recorder.statistics) == {
+        "sleepiq_custom:1001_sleep_score",
+        "sleepiq_custom:1001_time_in_bed",
+    }
+    (row,) = recorder.statistics["sleepiq_custom:1001_time_in_bed"]
+    assert row["mean"] == 480
+    assert row["start"] == dt_util.start_of_local_day(date(2021, 3, 8))
+    assert importer._store.saved == {"cursors": {"-1001": "2021-03-09"}}
+
+
+def test_recorder_error_keeps_other_cursors(monkeypatch):
+    """A sleeper the recorder rejects does not lose the others' progress."""
+    recorder = FakeRecorder(fail=("1001",))
+    importer = _import(monkeypatch, _client("-1001", "-1002"), recorder)
+
+    assert set(recorder.statistics) == {
+        "sleepiq_custom:1002_sleep_score",
+        "sleepiq_custom:1002_time_in_bed",
+    }
+    assert importer._store.saved == {"cursors": {"-1002": "2021-03-09"}}
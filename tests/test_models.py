@@ -0,0 +1,61 @@
+"""Tests for the immutable bed models."""
+from custom_components.sleepiq_custom.models import (
+    Bed,
+    BedSnapshot,
+    Foundation,
+    Side,
+    Sleeper,
+    get_path,
+    with_path,
+)
+
+
+def _bed():
+    return Bed(
+        bedId="bed",
+        left_side=Side(sleepNumber=40, sleeper=Sleeper(firstName="Alex")),
+        right_side=Side(sleepNumber=55),
+    )
+
+
+def test_with_path_does_not_mutate():
+    """Only the parts along the path are copied; the original is unchanged."""
+    bed = _bed()
+    left, right, sleeper = bed.left_side, bed.right_side, bed.left_side.sleeper
+
+    new = with_path(bed, "left_side.sleepNumber", 60)
+
+    assert get_path(new, "left_side.sleepNumber") == 60
+    assert bed.left_side is left
+    assert left.sleepNumber == 40
+    assert new is not bed
+    assert new.left_side is not left
+    assert new.right_side is right
+    assert new.left_side.sleeper is sleeper
+
+
+def test_with_path_unchanged_or_missing():
+    """The model itself comes back when nothing would change."""
+    bed = _bed()
+    assert with_path(bed, "left_side.sleepNumber", 40) is bed
+    # The bed has no foundation to set a value on.
+    assert with_path(bed, "foundation.fsIsMoving", True) is bed
+    assert get_path(bed, "foundation.fsIsMoving") is None
+
+
+def test_snapshot_with_beds():
+    """Replacing beds gives a new version that shares the other beds."""
+    other = Bed(bedId="other", foundation=Foundation())
+    snapshot = BedSnapshot({"bed": _bed(), "other": other})
+
+    assert snapshot.with_beds({"other": other}) is snapshot
+    changed = snapshot.with_beds(
+        {"bed": with_path(snapshot["bed"], "left_side.sleepNumber", 60)}
+    )
+    assert changed.version > snapshot.version
+    assert changed["other"] is other
+    assert get_path(snapshot["bed"], "left_side.sleepNumber") == 40
+
+    replaced = snapshot.with_beds({"other": other}, replace_all=True)
+    assert list(replaced) == ["other"]
+    assert list(snapshot) == ["bed", "other"]
@@ -0,0 +1,327 @@
+"""Tests for the occupancy filter and the nightly occupancy totals."""
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util import dt as dt_util
+import pytest
+
+from custom_components.sleepiq_custom import (
+    _apply_options,
+    coordinator,
+    create_coordinators,
+)
+from custom_components.sleepiq_custom.const import (
+    BURST_STATUS,
+    CONF_ENTER_DELAY,
+    CONF_EXIT_DELAY,
+    EVENT_BED_TRANSITION,
+    LEFT,
+    NIGHTLY_BED_EXITS,
+    NIGHTLY_LONGEST_SLEEP,
+    NIGHTLY_MAX_GAP,
+    NIGHTLY_TIME_IN_BED,
+    TIER_CONTROLS,
+    TIER_STATUS,
+)
+from custom_components.sleepiq_custom.coordinator import SleepIQPollingEngine
+from custom_components.sleepiq_custom.metrics import SleepIQMetrics
+from custom_components.sleepiq_custom.models import (
+    Bed,
+    BedSnapshot,
+    Side,
+    Sleeper,
+    with_path,
+)
+from custom_components.sleepiq_custom.occupancy import (
+    NightlyOccupancyStats,
+    OccupancyFilter,
+)
+
+START = datetime(2021, 1, 1, 22, tzinfo=timezone.utc)
+
+
+def _beds(left, right=False):
+    """Return a snapshot of one bed with the raw in-bed readings."""
+    return BedSnapshot(
+        {
+            "bed": Bed(
+                bedId="bed",
+                left_side=Side(isInBed=left, sleeper=Sleeper(sleeperId="1")),
+                right_side=Side(isInBed=right),
+            )
+        }
+    )
+
+
+class Readings:
+    """Feed in-bed readings through a filter, carrying its state over."""
+
+    def __init__(self, occupancy):
+        self.occupancy = occupancy
+        self.beds = None
+        self.transitions = []
+
+    def read(self, seconds, left, right=False):
+        """Filter the readings taken some seconds after START."""
+        if self.beds is None:
+            beds = _beds(left, right)
+        else:
+            bed = with_path(self.beds["bed"], "left_side.isInBed", left)
+            bed = with_path(bed, "right_side.isInBed", right)
+            beds = self.beds.with_beds({"bed": bed})
+        self.beds, transitions = self.occupancy.update(
+            beds, START + timedelta(seconds=seconds)
+        )
+        self.transitions.extend(transitions)
+        return self.beds["bed"].left_side.occupied
+
+
+def test_short_blip_is_ignored():
+    """Readings that flip back within the delay never change the state."""
+    readings = Readings(OccupancyFilter())
+    assert readings.read(0, True) is True
+    assert readings.read(10, False) is True
+    assert readings.read(20, True) is True
+    assert readings.read(90, True) is True
+    # An enter blip on an empty side is ignored the same way.
+    assert readings.read(100, True, right=True) is True
+    assert readings.read(105, True, right=False) is True
+    assert readings.beds["bed"].right_side.occupied is False
+    assert readings.transitions == []
+
+
+def test_enter_after_enter_delay():
+    """A side is entered once the reading holds for the enter delay."""
+    readings = Readings(OccupancyFilter(enter_delay=timedelta(seconds=30)))
+    assert readings.read(0, False) is False
+    assert readings.read(100, True) is False
+    assert readings.read(120, True) is False
+    assert readings.read(130, True) is True
+
+    (transition,) = readings.transitions
+    assert transition["bed_id"] == "bed"
+    assert transition["side"] == LEFT
+    assert transition["sleeper_id"] == "1"
+    assert transition["in_bed"] is True
+    # Dated between the last empty reading and the first in-bed one.
+    assert transition["at"] == (START + timedelta(seconds=50)).isoformat()
+    assert readings.beds["bed"].left_side.occupied_changed == transition["at"]
+
+
+def test_exit_after_exit_delay():
+    """A side is left once the reading holds for the exit delay."""
+    readings = Readings(OccupancyFilter(exit_delay=timedelta(seconds=60)))
+    assert readings.read(0, True) is True
+    assert readings.read(10, True) is True
+    assert readings.read(20, False) is True
+    assert readings.read(70, False) is True
+    assert readings.read(80, False) is False
+    assert [t["in_bed"] for t in readings.transitions] == [False]
+    assert readings.transitions[0]["at"] == (START + timedelta(seconds=15)).isoformat()
+
+
+class FakeClient:
+    """A client whose status polls return scripted in-bed readings."""
+
+    def __init__(self):
+        self.beds = _beds(False)
+        self.session = SimpleNamespace(login_count=1)
+        self.metrics = SleepIQMetrics()
+        self.left = False
+
+    def set_concurrency(self, concurrency):
+        pass
+
+    async def fetch_tier(self, tier):
+        return await self.fetch_status()
+
+    async def fetch_status(self):
+        bed = with_path(self.beds["bed"], "left_side.isInBed", self.left)
+        self.beds = self.beds.with_beds({"bed": bed})
+        return self.beds
+
+
+class Night:
+    """An entry's status tier polled on a virtual clock."""
+
+    def __init__(self, hass):
+        self.client = FakeClient()
+        self.coordinators = create_coordinators(
+            hass, self.client, SleepIQPollingEngine(hass)
+        )
+        self.status = self.coordinators[TIER_STATUS]
+        self.events = []
+        hass.bus.async_listen(
+            EVENT_BED_TRANSITION, callback(lambda event: self.events.append(event))
+        )
+
+    async def poll(self, seconds, left):
+        """Poll the status tier some seconds after START."""
+        self.client.left = left
+        with patch(
+            "homeassistant.util.dt.utcnow",
+            return_value=START + timedelta(seconds=seconds),
+        ):
+            await self.status.async_refresh()
+        await asyncio.sleep(0)
+        return self.status.data["bed"].left_side.occupied
+
+
+def test_options_change_the_delays():
+    """New delays from the options apply to the next readings."""
+
+    async def run():
+        night = Night(HomeAssistant())
+        _apply_options(night.coordinators, {CONF_ENTER_DELAY: 5, CONF_EXIT_DELAY: 10})
+        assert night.status.occupancy.enter_delay == timedelta(seconds=5)
+        assert night.status.occupancy.exit_delay == timedelta(seconds=10)
+        return [
+            await night.poll(0, False),
+            await night.poll(10, True),
+            await night.poll(15, True),
+            await night.poll(20, False),
+            await night.poll(30, False),
+        ]
+
+    assert asyncio.run(run()) == [False, False, True, True, False]
+
+
+def test_transition_fires_an_event():
+    """A completed transition fires an event with the side and sleeper."""
+
+    async def run():
+        night = Night(HomeAssistant())
+        for seconds, left in ((0, False), (5, True), (30, True), (40, True)):
+            await night.poll(seconds, left)
+        return night.events
+
+    (event,) = asyncio.run(run())
+    assert event.event_type == EVENT_BED_TRANSITION
+    assert event.data == {
+        "bed_id": "bed",
+        "side": LEFT,
+        "sleeper_id": "1",
+        "sleeper": None,
+        "in_bed": True,
+        "at": (START + timedelta(seconds=2.5)).isoformat(),
+    }
+
+
+def test_burst_readings_are_filtered(monkeypatch):
+    """A status burst of another tier completes transitions like a poll."""
+    monkeypatch.setattr(coordinator, "BURST_INTERVAL", timedelta(0))
+
+    async def run():
+        night = Night(HomeAssistant())
+        await night.poll(0, False)
+        await night.poll(5, True)
+        controls = night.coordinators[TIER_CONTROLS]
+        with patch(
+            "homeassistant.util.dt.utcnow", return_value=START + timedelta(seconds=40)
+        ):
+            controls.async_start_burst("bed", BURST_STATUS, lambda bed: True)
+            await controls.bursts[("bed", BURST_STATUS)]
+        await asyncio.sleep(0)
+        return night
+
+    night = asyncio.run(run())
+    (event,) = night.events
+    assert event.data["in_bed"] is True
+    # The in bed sensors read the shared side views.
+    assert night.status.views[("bed", LEFT)].occupied is True
+
+
+@pytest.fixture
+def chicago():
+    """Run a test in a time zone with daylight saving time."""
+    default = dt_util.DEFAULT_TIME_ZONE
+    time_zone = dt_util.get_time_zone("America/Chicago")
+    dt_util.set_default_time_zone(time_zone)
+    yield time_zone
+    dt_util.set_default_time_zone(default)
+
+
+class Totals:
+    """Poll the nightly totals of a bed's left side on a virtual clock."""
+
+    def __init__(self, start):
+        self.stats = NightlyOccupancyStats()
+        # Step in UTC; adding to a local time would follow the wall clock.
+        self.now = start.astimezone(timezone.utc)
+
+    def poll(self, occupied, minutes=5):
+        """Poll after some minutes with the filtered occupancy."""
+        self.now += timedelta(minutes=minutes)
+        side = Side(isInBed=occupied, occupied=occupied)
+        self.stats.update({"bed": Bed(bedId="bed", left_side=side)}, self.now)
+
+    def __getitem__(self, kind):
+        return self.stats.value("bed", LEFT, kind)
+
+
+def test_totals_reset_at_night_start(chicago):
+    """The totals restart at the night start; a sleeper in bed carries on."""
+    totals = Totals(datetime(2021, 1, 1, 11, 40, tzinfo=chicago))
+    for _ in range(3):
+        totals.poll(True)
+    assert totals.stats.night == "2020-12-31"
+    assert totals[NIGHTLY_TIME_IN_BED] == 10
+
+    # The poll at noon starts the next night.
+    for _ in range(3):
+        totals.poll(True)
+    assert totals.stats.night == "2021-01-01"
+    assert totals[NIGHTLY_TIME_IN_BED] == 10
+    assert totals[NIGHTLY_LONGEST_SLEEP] == 10
+    assert totals[NIGHTLY_BED_EXITS] == 0
+
+
+@pytest.mark.parametrize("night, hours", [((2021, 11, 6), 25), ((2021, 3, 13), 23)])
+def test_night_across_dst(chicago, night, hours):
+    """A night with a clock change counts the hours that really passed."""
+    totals = Totals(datetime(*night, 12, tzinfo=chicago))
+    totals.poll(True, minutes=0)
+    for _ in range(hours * 12 - 1):
+        totals.poll(True)
+    assert totals.stats.night == date(*night).isoformat()
+    assert totals[NIGHTLY_TIME_IN_BED] == hours * 60 - 5
+    assert totals[NIGHTLY_LONGEST_SLEEP] == hours * 60 - 5
+
+    # The next poll is at noon local time, which starts the next night.
+    totals.poll(True)
+    assert totals.stats.night != date(*night).isoformat()
+    assert totals[NIGHTLY_TIME_IN_BED] == 0
+
+
+def test_long_gaps_are_not_counted(chicago):
+    """Time between polls further apart than the maximum gap is skipped."""
+    totals = Totals(datetime(2021, 1, 1, 22, tzinfo=chicago))
+    totals.poll(True)
+    totals.poll(True)
+    gap = NIGHTLY_MAX_GAP.total_seconds() / 60 + 20
+    totals.poll(True, minutes=gap)
+    assert totals[NIGHTLY_TIME_IN_BED] == 5
+    totals.poll(True)
+    assert totals[NIGHTLY_TIME_IN_BED] == 10
+    # The stretch restarted after the gap.
+    assert totals[NIGHTLY_LONGEST_SLEEP] == 5
+
+
+def test_bed_exits_and_longest_sleep(chicago):
+    """Leaving the bed counts an exit and ends a stretch of sleep."""
+    totals = Totals(datetime(2021, 1, 1, 22, tzinfo=chicago))
+    totals.poll(False)
+    for _ in range(6):
+        totals.poll(True)
+    totals.poll(False)
+    totals.poll(False)
+    for _ in range(3):
+        totals.poll(True)
+    totals.poll(False)
+
+    assert totals[NIGHTLY_BED_EXITS] == 2
+    assert totals[NIGHTLY_LONGEST_SLEEP] == 30
+    assert totals[NIGHTLY_TIME_IN_BED] == 30 + 15
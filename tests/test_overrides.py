@@ -0,0 +1,81 @@
+"""Tests for the command overrides laid over the beds."""
+from types import SimpleNamespace
+
+from custom_components.sleepiq_custom import overrides
+from custom_components.sleepiq_custom.models import Bed, BedSnapshot, Side
+
+
+class Clock:
+    """A monotonic clock the test moves by hand."""
+
+    def __init__(self, monkeypatch):
+        self.now = 0.0
+        monkeypatch.setattr(
+            overrides, "time", SimpleNamespace(monotonic=lambda: self.now)
+        )
+
+
+def _beds(number):
+    return BedSnapshot({"bed": Bed(bedId="bed", left_side=Side(sleepNumber=number))})
+
+
+def _number(beds):
+    return beds["bed"].left_side.sleepNumber
+
+
+def test_stale_poll_keeps_the_held_value(monkeypatch):
+    """Polls that predate the command keep showing the expected value."""
+    Clock(monkeypatch)
+    held = overrides.LocalOverrides()
+    held.hold("bed", "left_side.sleepNumber", 60, deadline=30)
+
+    base = _beds(40)
+    shown = held.apply(base)
+    assert _number(shown) == 60
+    # The fetched beds are never changed in place.
+    assert _number(base) == 40
+    assert shown.version != base.version
+    assert held.apply(base) is shown
+
+    shown = held.apply(_beds(40))
+    assert _number(shown) == 60
+    assert len(held) == 1
+
+
+def test_matching_poll_clears_the_override(monkeypatch):
+    """Once the bed reports the expected value the override is dropped."""
+    Clock(monkeypatch)
+    held = overrides.LocalOverrides()
+    held.hold("bed", "left_side.sleepNumber", 60, deadline=30)
+    held.apply(_beds(40))
+
+    base = _beds(60)
+    assert held.apply(base) is base
+    assert len(held) == 0
+    # A later poll that disagrees again shows what the bed reports.
+    assert _number(held.apply(_beds(45))) == 45
+
+
+def test_deadline_releases_the_override(monkeypatch):
+    """The bed's value shows again once the override's deadline passes."""
+    clock = Clock(monkeypatch)
+    held = overrides.LocalOverrides()
+    held.hold("bed", "left_side.sleepNumber", 60, deadline=30)
+
+    base = _beds(40)
+    assert _number(held.apply(base)) == 60
+    clock.now = 31
+    assert held.apply(base) is base
+    assert len(held) == 0
+
+
+def test_release(monkeypatch):
+    """Released paths show what the bed reports straight away."""
+    Clock(monkeypatch)
+    held = overrides.LocalOverrides()
+    held.hold("bed", "left_side.sleepNumber", 60, deadline=30)
+    base = _beds(40)
+    assert _number(held.apply(base)) == 60
+
+    held.release("bed", ["left_side.sleepNumber"])
+    assert held.apply(base) is base
@@ -0,0 +1,167 @@
+"""Tests for the shared SleepIQ request scheduler."""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from custom_components.sleepiq_custom import api, ratelimit
+from custom_components.sleepiq_custom.const import (
+    PRIORITY_COMMAND,
+    PRIORITY_POLL,
+    RATE_LIMIT_PAUSE,
+)
+
+
+class Clock:
+    """A monotonic clock the test moves by hand."""
+
+    def __init__(self, monkeypatch):
+        self.now = 0.0
+        clock = SimpleNamespace(monotonic=lambda: self.now)
+        monkeypatch.setattr(ratelimit, "time", clock)
+        monkeypatch.setattr(api, "time", clock)
+
+
+def test_refill_math(monkeypatch):
+    """Tokens come back at the rate, up to the capacity."""
+    clock = Clock(monkeypatch)
+    bucket = ratelimit.TokenBucket(rate=2.0, capacity=4)
+    for _ in range(4):
+        assert bucket.wait_time(clock.now) == 0
+        bucket.take(clock.now)
+    assert bucket.wait_time(clock.now) == 0.5
+
+    clock.now = 0.25
+    assert bucket.wait_time(clock.now) == 0.25
+    clock.now = 0.5
+    assert bucket.wait_time(clock.now) == 0
+
+    # A long idle spell refills no further than the capacity.
+    clock.now = 100
+    for _ in range(4):
+        bucket.take(clock.now)
+    assert bucket.wait_time(clock.now) == 0.5
+
+
+def test_burst_limit(monkeypatch):
+    """An account gets its burst straight away and then has to wait."""
+    clock = Clock(monkeypatch)
+    scheduler = ratelimit.SleepIQRequestScheduler(account_rate=0.001, account_burst=3)
+
+    async def run():
+        waits = [await scheduler.acquire("a", PRIORITY_POLL) for _ in range(3)]
+        queued = asyncio.ensure_future(scheduler.acquire("a", PRIORITY_POLL))
+        await asyncio.sleep(0)
+        # Another account still has its own burst.
+        other = await scheduler.acquire("b", PRIORITY_POLL)
+        assert not queued.done()
+        assert scheduler.queue_depth == 1
+
+        clock.now = 1000
+        scheduler._dispatch()
+        return waits, other, await queued
+
+    waits, other, queued = asyncio.run(run())
+    assert waits == [0.0, 0.0, 0.0]
+    assert other == 0.0
+    assert queued == 1000
+
+
+def test_commands_go_before_polls(monkeypatch):
+    """A queued command gets the next token ahead of an older poll."""
+    clock = Clock(monkeypatch)
+    scheduler = ratelimit.SleepIQRequestScheduler(account_rate=0.001, account_burst=1)
+
+    async def run():
+        await scheduler.acquire("a", PRIORITY_POLL)
+        poll = asyncio.ensure_future(scheduler.acquire("a", PRIORITY_POLL))
+        await asyncio.sleep(0)
+        command = asyncio.ensure_future(scheduler.acquire("a", PRIORITY_COMMAND))
+        await asyncio.sleep(0)
+
+        clock.now = 1000
+        scheduler._dispatch()
+        await asyncio.sleep(0)
+        order = [command.done(), poll.done()]
+        clock.now = 2000
+        scheduler._dispatch()
+        await asyncio.gather(poll, command)
+        return order
+
+    assert asyncio.run(run()) == [True, False]
+
+
+def test_pause_holds_back_the_account(monkeypatch):
+    """A paused account waits for the pause; the others carry on."""
+    clock = Clock(monkeypatch)
+    scheduler = ratelimit.SleepIQRequestScheduler()
+
+    async def run():
+        scheduler.pause("a", 30)
+        assert scheduler.paused_for("a") == 30
+        waiting = asyncio.ensure_future(scheduler.acquire("a", PRIORITY_COMMAND))
+        await asyncio.sleep(0)
+        assert await scheduler.acquire("b", PRIORITY_POLL) == 0.0
+        assert not waiting.done()
+
+        clock.now = 30
+        scheduler._dispatch()
+        return await waiting
+
+    assert asyncio.run(run()) == 30
+    assert scheduler.pause_count == 1
+
+
+class Response:
+    """A canned aiohttp response."""
+
+    def __init__(self, status, headers=None, body=b"{}"):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+
+    async def read(self):
+        return self.body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+
+class WebSession:
+    """Answer the requests with canned responses, in order."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+
+    def request(self, method, url, **kwargs):
+        return self.responses.pop(0)
+
+
+@pytest.mark.parametrize(
+    "headers, pause",
+    [({"Retry-After": "120"}, 120), ({}, RATE_LIMIT_PAUSE.total_seconds())],
+)
+def test_throttled_account_is_paused(monkeypatch, headers, pause):
+    """A 429 pauses the account for its Retry-After, or a default pause."""
+    Clock(monkeypatch)
+    scheduler = ratelimit.SleepIQRequestScheduler()
+
+    async def run():
+        session = api.SleepIQSession(
+            "user",
+            "password",
+            WebSession(Response(200, body=b'{"key": "k"}'), Response(429, headers)),
+            scheduler=scheduler,
+        )
+        with pytest.raises(api.SleepIQRateLimitError):
+            await session.async_request("get", "/bed")
+        # Polls fail straight away while the account is paused.
+        with pytest.raises(api.SleepIQRateLimitError) as err:
+            await session.async_request("get", "/bed")
+        return err.value.retry_after
+
+    assert asyncio.run(run()) == pause
+    assert scheduler.paused_for("user") == pause
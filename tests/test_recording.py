@@ -0,0 +1,221 @@
+"""Tests for recording SleepIQ traffic and replaying it."""
+import asyncio
+from datetime import datetime, timezone
+import gzip
+import json
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+
+from benchmarks.replay_night import ReplayNight
+from custom_components.sleepiq_custom import recording
+from custom_components.sleepiq_custom.binary_sensor import IsInBedBinarySensor
+from custom_components.sleepiq_custom.const import (
+    LEFT,
+    REDACTED,
+    REDACTED_KEYS,
+    RIGHT,
+)
+from custom_components.sleepiq_custom.diagnostics import _redact
+from custom_components.sleepiq_custom.sensor import SleeperSensor
+
+BED_ID = "-9000001"
+SLEEPER_IDS = {LEFT: "-1001", RIGHT: "-1002"}
+
+
+class Night:
+    """Record a night of SleepIQ traffic on a virtual clock."""
+
+    def __init__(self, monkeypatch):
+        self.clock = 0.0
+        monkeypatch.setattr(
+            recording, "time", SimpleNamespace(monotonic=lambda: self.clock)
+        )
+        self.recorder = recording.SleepIQRecorder()
+
+    def add(self, at, method, path, payload, params=None):
+        self.clock = at
+        self.recorder.record(
+            method,
+            path,
+            {"params": {**(params or {}), "_k": "key"}},
+            200,
+            {},
+            json.dumps(payload).encode(),
+        )
+
+    def status(self, at, left, right, left_number=40):
+        self.add(
+            at,
+            "get",
+            "/bed/familyStatus",
+            {
+                "beds": [
+                    {
+                        "bedId": BED_ID,
+                        "status": 1,
+                        "leftSide": {"isInBed": left, "sleepNumber": left_number},
+                        "rightSide": {"isInBed": right, "sleepNumber": 55},
+                    }
+                ]
+            },
+        )
+
+    def start(self):
+        self.add(0, "put", "/login", {"key": "secret", "userId": "-42"})
+        self.add(
+            0,
+            "get",
+            "/bed",
+            {
+                "beds": [
+                    {
+                        "bedId": BED_ID,
+                        "accountId": "-42",
+                        "name": "Bed",
+                        "macAddress": "00:00:00:00:00:01",
+                        "sleeperLeftId": SLEEPER_IDS[LEFT],
+                        "sleeperRightId": SLEEPER_IDS[RIGHT],
+                    }
+                ]
+            },
+        )
+        self.add(
+            0,
+            "get",
+            "/sleeper",
+            {
+                "sleepers": [
+                    {"sleeperId": SLEEPER_IDS[LEFT], "firstName": "Alex", "side": 0},
+                    {"sleeperId": SLEEPER_IDS[RIGHT], "firstName": "Sam", "side": 1},
+                ]
+            },
+        )
+
+
+def _distinct(states):
+    """Return the states without repeats of the one before."""
+    return [
+        state
+        for index, state in enumerate(states)
+        if not index or state != states[index - 1]
+    ]
+
+
+def test_query_params_are_scrubbed(monkeypatch, tmp_path):
+    """Sleeper ids in query strings are aliased like those in the bodies."""
+    night = Night(monkeypatch)
+    night.start()
+    night.add(
+        10,
+        "get",
+        "/sleepData",
+        {"sleepDataDays": []},
+        params={"date": "2021-01-01", "interval": "M1", "sleeper": SLEEPER_IDS[LEFT]},
+    )
+    path = tmp_path / "night.jsonl.gz"
+    night.recorder.save(str(path))
+
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        text = file.read()
+    for raw in (BED_ID, "-42", *SLEEPER_IDS.values(), "Alex", "Sam", "secret"):
+        assert raw not in text
+    records, _ = recording.load_recording(str(path))
+    assert records[-1]["q"] == {
+        "date": "2021-01-01",
+        "interval": "M1",
+        "sleeper": "sleeper0",
+    }
+
+
+def test_replayed_night_through_the_entities(monkeypatch, tmp_path):
+    """A recorded night goes through the refreshes, filter and entities."""
+    night = Night(monkeypatch)
+    night.start()
+    night.status(0, False, False)
+    night.status(600, True, False)
+    # A single reading on the right is shorter than the enter delay.
+    night.status(1800, True, True)
+    night.status(1805, True, False)
+    night.status(2000, True, False, left_number=45)
+    night.status(3000, False, False, left_number=45)
+    night.status(3500, False, False, left_number=45)
+    path = tmp_path / "night.jsonl.gz"
+    night.recorder.save(str(path))
+
+    async def run():
+        replay = ReplayNight(
+            HomeAssistant(),
+            recording.ReplayWebSession.from_file(str(path), speed=0),
+            start=datetime(2021, 1, 1, 22, tzinfo=timezone.utc),
+        )
+        await replay.async_run()
+        return replay
+
+    replay = asyncio.run(run())
+
+    assert replay.failures == 0
+    assert [
+        (transition["side"], transition["in_bed"], transition["sleeper_id"])
+        for transition in replay.transitions
+    ] == [(LEFT, True, "sleeper0"), (LEFT, False, "sleeper0")]
+
+    in_bed = {
+        entity._side: entity.name
+        for entity in replay.entities
+        if isinstance(entity, IsInBedBinarySensor)
+    }
+    assert in_bed[LEFT] == "Sleeper0 is in bed"
+    assert _distinct(replay.states(in_bed[LEFT])) == ["off", "on", "off"]
+    assert _distinct(replay.states(in_bed[RIGHT])) == ["off"]
+
+    sleep_number = next(
+        entity.name
+        for entity in replay.entities
+        if isinstance(entity, SleeperSensor) and entity._side == LEFT
+    )
+    assert _distinct(replay.states(sleep_number)) == [40, 45]
+
+
+PROFILE = {
+    "sleeperId": SLEEPER_IDS[LEFT],
+    "accountId": "-42",
+    "firstName": "Alex",
+    "lastName": "Example",
+    "email": "alex@example.com",
+    "username": "alex@example.com",
+    "birthYear": "1980",
+    "birthMonth": 7,
+    "zipCode": "55401",
+    "gender": 1,
+    "height": 70,
+    "weight": 150,
+    "timezone": "US/Central",
+    "sleepGoal": 480,
+    "side": 0,
+}
+
+
+def test_personal_values_are_scrubbed(monkeypatch, tmp_path):
+    """No personal value of a sleeper profile reaches a recording."""
+    night = Night(monkeypatch)
+    night.add(0, "get", "/sleeper", {"sleepers": [PROFILE]})
+    path = tmp_path / "night.jsonl.gz"
+    night.recorder.save(str(path))
+
+    _, bodies = recording.load_recording(str(path))
+    (sleeper,) = json.loads(bodies[0])["sleepers"]
+    assert sleeper == {
+        **{key: REDACTED for key in PROFILE if key in REDACTED_KEYS},
+        "sleeperId": "sleeper0",
+        "accountId": "account0",
+        "firstName": "Sleeper0",
+        "side": 0,
+    }
+
+
+def test_diagnostics_redact_the_same_keys():
+    """Diagnostics hide every value a recording scrubs."""
+    assert _redact({"sleepers": [PROFILE]}) == {
+        "sleepers": [{key: REDACTED if key != "side" else 0 for key in PROFILE}]
+    }
@@ -0,0 +1,48 @@
+"""Tests for the persisted bed snapshots."""
+from types import SimpleNamespace
+
+from custom_components.sleepiq_custom import storage
+from custom_components.sleepiq_custom.const import STORAGE_SAVE_DELAY
+from custom_components.sleepiq_custom.models import Bed
+
+
+class FakeStore:
+    """Home Assistant's Store on a virtual clock.
+
+    Like the real one, every call to async_delay_save restarts the timer.
+    """
+
+    def __init__(self, hass, version, key):
+        self.clock = hass.clock
+        self.due = None
+        self.data_func = None
+        self.saves = []
+
+    def async_delay_save(self, data_func, delay):
+        self.data_func = data_func
+        self.due = self.clock.now + delay
+
+    def run_due(self):
+        if self.due is not None and self.clock.now >= self.due:
+            self.due = None
+            self.saves.append(self.data_func())
+
+
+def test_saves_happen_under_frequent_polls(monkeypatch):
+    """Polls every 5 s must not keep pushing the save back."""
+    monkeypatch.setattr(storage, "Store", FakeStore)
+    hass = SimpleNamespace(clock=SimpleNamespace(now=0))
+    store = storage.SleepIQSnapshotStore(hass, "entry")
+    fake = store._store
+
+    duration = 10 * 60
+    for now in range(0, duration, 5):
+        hass.clock.now = now
+        fake.run_due()
+        store.async_schedule_save({"bed": Bed(bedId="bed", status=now)})
+
+    assert len(fake.saves) >= duration // (STORAGE_SAVE_DELAY + 5)
+    # Each save writes the latest beds as of the save, not of the first poll.
+    assert fake.saves[-1]["beds"]["bed"]["status"] > fake.saves[0]["beds"]["bed"][
+        "status"
+    ]
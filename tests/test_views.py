@@ -0,0 +1,87 @@
+"""Tests for the per-side views of the beds."""
+from custom_components.sleepiq_custom.const import LEFT, RIGHT
+from custom_components.sleepiq_custom.models import (
+    Bed,
+    BedSnapshot,
+    ResponsiveAir,
+    Side,
+    Sleeper,
+    with_path,
+)
+from custom_components.sleepiq_custom.views import SideViews
+
+
+def _snapshot():
+    return BedSnapshot(
+        {
+            "bed": Bed(
+                bedId="bed",
+                sleeperLeftId="1",
+                left_side=Side(
+                    isInBed=True, sleepNumber=40, sleeper=Sleeper(firstName="Alex")
+                ),
+                right_side=Side(isInBed=False, sleepNumber=55),
+                responsive_air=ResponsiveAir(leftSideEnabled=True),
+            ),
+            "other": Bed(bedId="other"),
+        }
+    )
+
+
+def test_views_show_the_side():
+    """A view holds what the entities of its side show."""
+    views = SideViews()
+    views.update(_snapshot())
+
+    left, right = views[("bed", LEFT)], views[("bed", RIGHT)]
+    assert (left.name, left.sleep_number, left.occupied) == ("Alex", 40, True)
+    assert (right.name, right.sleep_number, right.occupied) == ("Right side", 55, False)
+    assert (left.responsive_air, right.responsive_air) == (True, None)
+    assert left.sleep_number_attributes["sleeperID"] == "1"
+    assert left.sleeper_attributes["responsive_air"] == "on"
+    assert left.responsive_air_attributes is right.responsive_air_attributes
+
+
+def test_replaced_bed_gets_new_views():
+    """Views are rebuilt for replaced beds and never changed in place."""
+    snapshot = _snapshot()
+    views = SideViews()
+    views.update(snapshot)
+    old = views[("bed", LEFT)]
+    right = views[("bed", RIGHT)]
+    other = views[("other", LEFT)]
+
+    views.update(
+        snapshot.with_beds(
+            {"bed": with_path(snapshot["bed"], "left_side.occupied", False)}
+        )
+    )
+
+    new = views[("bed", LEFT)]
+    assert new is not old
+    assert new.occupied is False
+    assert old.occupied is True
+    # An unchanged bed, or side, keeps its views.
+    assert views[("other", LEFT)] is other
+    assert views[("bed", RIGHT)] is right
+    assert not hasattr(new, "bind")
+    assert not hasattr(new, "__dict__")
+
+
+def test_changed_controls_rebuild_both_sides():
+    """Both sides show responsive air, so a new setting rebuilds both."""
+    snapshot = _snapshot()
+    views = SideViews()
+    views.update(snapshot)
+    right = views[("bed", RIGHT)]
+
+    views.update(
+        snapshot.with_beds(
+            {"bed": with_path(snapshot["bed"], "responsive_air.rightSideEnabled", True)}
+        )
+    )
+
+    assert views[("bed", RIGHT)] is not right
+    assert views[("bed", RIGHT)].responsive_air is True
+    assert views[("bed", LEFT)].responsive_air_attributes["rightSideEnabled"] is True
+    assert right.responsive_air is None